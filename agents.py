@@ -1,34 +1,104 @@
 from __future__ import annotations
-import asyncio, re, json, uuid
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer, util
-from providers import create as create_provider
+import asyncio, re, json, uuid, statistics
+from collections import Counter
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+import summaries, profiling
+from providers import get as get_provider, PARTIAL
+from providers.cascade import build as build_cascade
 
-_embedder = SentenceTransformer("all-mpnet-base-v2")
+if TYPE_CHECKING:
+    import embeddings
+
+EMBEDDING_MODEL = "all-mpnet-base-v2"  # embeddings.DEFAULT_MODEL
+_embedder = None
+_embedder_factory = None
+
+def set_embedder(factory):
+    """Route embedder loading through ``factory`` (e.g. a ``st.cache_resource``
+    function) so the model survives module reloads and is shared by sessions."""
+    global _embedder, _embedder_factory
+    _embedder_factory = factory
+    _embedder = None
+
+def get_embedder() -> embeddings.EmbeddingBackend:
+    """Backend picked by EMBEDDING_BACKEND / EMBEDDING_MODEL (see embeddings.py)."""
+    global _embedder
+    if _embedder is None:
+        if _embedder_factory:
+            _embedder = _embedder_factory()
+        else:
+            import embeddings  # numpy / torch / onnxruntime load on first use
+            _embedder = embeddings.load()
+    return _embedder
+
+def embed(texts: List[str]):
+    """Unit-length embeddings (numpy, one row per text) from the shared model."""
+    with profiling.span("embed", texts=len(texts)):
+        return get_embedder().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
 
 class Agent:
-    def __init__(self, name: str, provider_name: str, model: str):
+    use_cache = False  # serve repeated prompts from the shared response cache
+
+    def __init__(self, name: str, provider_name: str, model: str, cascade: Dict[str, Any] = None):
         self.id = str(uuid.uuid4())[:8]
         self.name = name
-        self.provider = create_provider(provider_name, model)
+        self.provider = get_provider(provider_name, model)
+        # phase → cheap-first cascade ending in self.provider
+        self.routes = build_cascade(cascade, self.provider)
         self.transcript: List[Dict[str, Any]] = []  # list of dicts per turn
 
-    async def speak(self, prompt: str, round_type: str) -> str:
-        reply = await self.provider.complete(prompt)
-        self.transcript.append({"round": round_type, "content": reply})
+    async def speak(self, prompt: str, round_type: str, strong: bool = False, prefix: str = "") -> str:
+        """``strong`` skips any cascade and goes straight to the agent's own model.
+        ``prefix`` is prompt text shared with other agents this phase (cacheable)."""
+        route = None if strong else self.routes.get(round_type)
+        streamed: List[str] = []
+        token = PARTIAL.set(streamed)
+        try:
+            if route is not None:
+                reply, model = await route.route(prompt, use_cache=self.use_cache, prefix=prefix)
+            else:
+                reply, model = await self.provider.generate(prompt, use_cache=self.use_cache, prefix=prefix), self.provider.model
+        except asyncio.CancelledError:
+            # Stopped mid-call: keep whatever had been streamed
+            if streamed:
+                self.transcript.append({"round": round_type, "content": "".join(streamed),
+                                        "model": self.provider.model, "partial": True})
+            raise
+        finally:
+            PARTIAL.reset(token)
+        self.transcript.append({"round": round_type, "content": reply, "model": model})
         return reply
 
     def similarity(self, other_content: str) -> float:
-        emb1 = _embedder.encode(self.transcript[-1]["content"], convert_to_tensor=True)
-        emb2 = _embedder.encode(other_content, convert_to_tensor=True)
-        return util.cos_sim(emb1, emb2).item()
+        # One batched encode; for many pairs use analytics.similarity_matrix
+        mine, other = embed([self.transcript[-1]["content"], other_content])
+        return float(mine @ other)
+
+AUDIT_STEP = """2. Audit DEFENSE compliance for **each agent** against ALL FOUR rules.  
+   • **Concede-or-Counter rule** — Exactly one of: a ≤ 10-word concession **or** a ≤ 100-word rebuttal.  
+   • **One fresh citation** — At most ONE new MLA citation appears.  
+   • **Updated Fragility Index** — Index is present, changed only when justified, and the change is explained in ≤ 1 sentence.  
+   • **Roadmap to definitive proof** — Concludes with *exactly* 2 sentences describing decisive future evidence.  
+
+   For any violation, subtract 0.10 from that agent's correctness score (but do not go below 0)."""
 
 class Judge(Agent):
     """Special agent that receives whole debate and returns verdict JSON."""
     async def verdict(self, debate_state_json: str) -> Dict[str, Any]:
-        debate_type = json.loads(debate_state_json).get("config", {}).get("debate_type", "non-binary")
+        state = json.loads(debate_state_json)
+        debate_type = state.get("config", {}).get("debate_type", "non-binary")
+        note = ""
+        if state.get("mode") == "incremental":
+            note = ("Only each agent's newest turn is included, with a precomputed `assessment`. "
+                    "`scorecard` carries your scores from earlier rounds: update them in light of the "
+                    "new turns rather than starting over.\n\n")
         
         if debate_type == "binary":
+            if "rule_checks" in state:
+                audit = ("2. DEFENSE rule compliance has already been checked (`rule_checks`) and its penalties are "
+                         "applied after you answer: do not audit the rules or adjust scores for them.")
+            else:
+                audit = AUDIT_STEP
             prompt = f"""
 🎓 You are the sole adjudicator of a factual debate where the goal is objective correctness.
 
@@ -37,13 +107,7 @@ Your job:
    • Evaluate each position primarily on: factual accuracy, quality of citations, logical consistency
    • Assign a correctness score (0-1) to each agent based on these criteria
 
-2. Audit DEFENSE compliance for **each agent** against ALL FOUR rules.  
-   • **Concede-or-Counter rule** — Exactly one of: a ≤ 10-word concession **or** a ≤ 100-word rebuttal.  
-   • **One fresh citation** — At most ONE new MLA citation appears.  
-   • **Updated Fragility Index** — Index is present, changed only when justified, and the change is explained in ≤ 1 sentence.  
-   • **Roadmap to definitive proof** — Concludes with *exactly* 2 sentences describing decisive future evidence.  
-
-   For any violation, subtract 0.10 from that agent's correctness score (but do not go below 0).  
+{audit}
 
 3. Return a JSON object with **exactly** these keys:  
    {{
@@ -53,7 +117,7 @@ Your job:
      "explanation": "<concise reasoning (≤ 75 words) explaining your decision>"
    }}
 
-DEBATE_STATE_JSON:
+{note}DEBATE_STATE_JSON:
 {debate_state_json}
 """
         else:  # non-binary
@@ -78,16 +142,107 @@ Your job:
      "explanation": "<concise reasoning (≤ 75 words) on the value of the exploration>"
    }}
 
-DEBATE_STATE_JSON:
+{note}DEBATE_STATE_JSON:
 {debate_state_json}
 """
         
-        raw = await self.provider.complete(prompt)
-        try:
-            match = re.search(r"\{.*\}", raw, re.S)
-            if match:
-                return json.loads(match.group())
-            else:
+        raw = await self.provider.generate(prompt, use_cache=self.use_cache)
+        with profiling.span("judge.parse", judge=self.name, chars=len(raw)):
+            try:
+                match = re.search(r"\{.*\}", raw, re.S)
+                if match:
+                    return json.loads(match.group())
+                else:
+                    return {"explanation": raw[:200]}
+            except Exception:
                 return {"explanation": raw[:200]}
-        except Exception:
-            return {"explanation": raw[:200]}
\ No newline at end of file
+
+class JudgePanel:
+    """Several judges called concurrently; their verdicts are merged into one.
+
+    ``aggregate="median"`` takes each agent's median score and the top scorer
+    as leader; ``"majority"`` names the agent most judges picked (ties go to
+    the higher median score).  Once ``quorum`` judges have named the same
+    leader the panel returns without waiting for the rest.
+    """
+    def __init__(self, judges: List[Judge], aggregate: str = "median", quorum: Optional[int] = None):
+        if aggregate not in ("median", "majority"):
+            raise ValueError(f"aggregate must be 'median' or 'majority', not {aggregate!r}")
+        self.judges = judges
+        self.aggregate = aggregate
+        self.quorum = min(quorum or len(judges), len(judges))
+
+    @property
+    def name(self) -> str:
+        return ", ".join(j.name for j in self.judges)
+
+    def _agreed(self, results: List[Dict[str, Any]]) -> bool:
+        votes = Counter(r["leader"] for r in results if r["leader"])
+        return bool(votes) and votes.most_common(1)[0][1] >= self.quorum
+
+    async def verdict(self, debate_state_json: str) -> Dict[str, Any]:
+        state = json.loads(debate_state_json)
+        names = [a["name"] for a in state.get("agents", [])]
+        debate_type = state.get("config", {}).get("debate_type", "non-binary")
+        tasks = {asyncio.ensure_future(j.verdict(debate_state_json)): j for j in self.judges}
+        pending, results, unscored = set(tasks), [], 0
+        try:
+            while pending and not self._agreed(results):
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    judge = tasks[task]
+                    try:
+                        verdict = task.result()
+                    except Exception as e:
+                        print(f"Judge {judge.name} failed: {e}")
+                        continue
+                    # An unparsed reply would score everyone 0.5 and "vote" for the first agent
+                    if not summaries.has_scores(verdict, debate_type):
+                        print(f"Judge {judge.name} returned no scores; not counted")
+                        unscored += 1
+                        continue
+                    scores = summaries.verdict_scores(verdict, names, debate_type)
+                    results.append({"judge": judge.name, "model": judge.provider.model, "verdict": verdict,
+                                    "scores": scores, "leader": summaries.leading_agent(scores)})
+        finally:
+            # Stragglers after a quorum (or after an error) are not waited for
+            for task in pending:
+                task.cancel()
+        return self._merge(results, names, debate_type, skipped=len(pending), unscored=unscored)
+
+    def _merge(self, results, names, debate_type, skipped=0, unscored=0) -> Dict[str, Any]:
+        if not results:
+            return {"explanation": "No judge returned a verdict.",
+                    "panel": {"method": self.aggregate, "responded": 0, "unscored": unscored,
+                              "skipped": skipped, "total": len(self.judges)}}
+        scores = {n: statistics.median(r["scores"][n] for r in results) for n in names}
+        votes = Counter(r["leader"] for r in results if r["leader"])
+        if self.aggregate == "majority" and votes:
+            top = max(votes.values())
+            leader = max((n for n in votes if votes[n] == top), key=lambda n: scores.get(n, 0))
+        else:
+            leader = summaries.leading_agent(scores)
+        merged = {
+            summaries.TOP_AGENT_KEYS.get(debate_type, "most_insightful_agent"): leader,
+            summaries.SCORE_KEYS.get(debate_type, "exploration_scores"): scores,
+        }
+        # Prose (explanation, key facts / insights) from a judge that backs the leader
+        backing = next((r for r in results if r["leader"] == leader), results[0])
+        if isinstance(backing["verdict"], dict):
+            for key, value in backing["verdict"].items():
+                merged.setdefault(key, value)
+        flags = [r["verdict"]["agreement"] for r in results
+                 if isinstance(r["verdict"], dict) and "agreement" in r["verdict"]]
+        if flags:
+            merged["agreement"] = sum(bool(f) for f in flags) > len(flags) / 2
+            levels = [r["verdict"]["mean_agreement"] for r in results
+                      if isinstance(r["verdict"], dict) and isinstance(r["verdict"].get("mean_agreement"), (int, float))]
+            if levels:
+                merged["mean_agreement"] = statistics.median(levels)
+        merged["panel"] = {
+            "method": self.aggregate, "leader": leader, "votes": dict(votes),
+            "responded": len(results), "unscored": unscored, "skipped": skipped, "total": len(self.judges),
+        }
+        merged["judges"] = [{k: r[k] for k in ("judge", "model", "leader", "scores")} for r in results]
+        return merged
+
@@ -0,0 +1,178 @@
+"""Debate-wide similarity analytics in one vectorized pass.
+
+Every turn of one or many debates is embedded in a single batched call
+(``agents.embed``); everything else is NumPy on that matrix:
+
+* ``similarity_matrix``  — turn × turn cosine similarities
+* ``convergence``        — mean pairwise agent similarity per (debate, round, phase)
+* ``stance_drift``       — how far each agent's positions move round to round
+* ``clusters``           — spherical k-means over turns
+
+    python analytics.py debate_*.json corpus.dta --phase position --clusters 4
+"""
+from __future__ import annotations
+import argparse, glob, json
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import agents
+
+class DebateEmbeddings:
+    """Turn metadata columns plus an (n_turns × dim) unit-length embedding matrix."""
+    def __init__(self, sessions: Iterable[Dict[str, Any]]):
+        debate, agent, round_num, phase, texts = [], [], [], [], []
+        for d, session in enumerate(sessions):
+            for a in session.get("agents", []):
+                for i, turn in enumerate(a.get("transcript", [])):
+                    debate.append(d)
+                    agent.append(a["name"])
+                    # Sessions saved before round_num was stamped: three phases per round
+                    round_num.append(turn.get("round_num", i // 3))
+                    phase.append(turn.get("round"))
+                    texts.append(turn.get("content", ""))
+        self.debate = np.array(debate, dtype=np.int64)
+        self.agent = np.array(agent, dtype=object)
+        self.round = np.array(round_num, dtype=np.int64)
+        self.phase = np.array(phase, dtype=object)
+        self.texts = texts
+        self.matrix = (np.asarray(agents.embed(texts), dtype=np.float32) if texts
+                       else np.zeros((0, 0), dtype=np.float32))
+
+    @classmethod
+    def from_orchestrators(cls, orchs) -> "DebateEmbeddings":
+        return cls(o.serialize() for o in orchs)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def mask(self, debate: Optional[int] = None, phase: Optional[str] = None,
+             agent: Optional[str] = None) -> np.ndarray:
+        m = np.ones(len(self), dtype=bool)
+        if debate is not None:
+            m &= self.debate == debate
+        if phase is not None:
+            m &= self.phase == phase
+        if agent is not None:
+            m &= self.agent == agent
+        return m
+
+def similarity_matrix(emb: DebateEmbeddings, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Cosine similarity between every pair of (selected) turns."""
+    m = emb.matrix if mask is None else emb.matrix[mask]
+    return m @ m.T
+
+def _groups(*cols: np.ndarray):
+    """Dense group id per row for the combination of ``cols``, plus the unique keys."""
+    keys = np.rec.fromarrays(cols)
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return uniq, inverse.ravel()
+
+def convergence(emb: DebateEmbeddings, phase: Optional[str] = "position") -> List[Dict[str, Any]]:
+    """Mean pairwise similarity between agents' turns per (debate, round, phase).
+
+    For unit vectors the mean over the n(n-1) ordered pairs of a group is
+    ``(|Σv|² - n) / (n(n-1))``, so every group is scored from per-group sums
+    without building any pairwise matrix.
+    """
+    mask = emb.mask(phase=phase)
+    if not mask.any():
+        return []
+    phases = np.array([str(p) for p in emb.phase[mask]])
+    uniq, gid = _groups(emb.debate[mask], emb.round[mask], phases)
+    sums = np.zeros((len(uniq), emb.matrix.shape[1]), dtype=np.float64)
+    np.add.at(sums, gid, emb.matrix[mask])
+    n = np.bincount(gid, minlength=len(uniq)).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = ((sums ** 2).sum(axis=1) - n) / (n * (n - 1))
+    return [{"debate": int(k[0]), "round": int(k[1]), "phase": k[2], "agents": int(c),
+             "similarity": float(s) if c > 1 else None}
+            for k, c, s in zip(uniq.tolist(), n, score)]
+
+def stance_drift(emb: DebateEmbeddings, phase: str = "position") -> List[Dict[str, Any]]:
+    """Per agent and debate: 1 - cos between consecutive ``phase`` turns, and from the first."""
+    mask = emb.mask(phase=phase)
+    idx = np.flatnonzero(mask)
+    # Sort by (debate, agent, round) so each agent's turns are contiguous and ordered
+    order = np.lexsort((emb.round[idx], emb.agent[idx].astype(str), emb.debate[idx]))
+    idx = idx[order]
+    out = []
+    if not len(idx):
+        return out
+    key = np.char.add(emb.debate[idx].astype(str), np.char.add("\0", emb.agent[idx].astype(str)))
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(idx)]
+    m = emb.matrix[idx]
+    step = np.r_[np.nan, 1.0 - np.einsum("ij,ij->i", m[1:], m[:-1])]
+    for s, e in zip(starts, ends):
+        rows = m[s:e]
+        out.append({
+            "debate": int(emb.debate[idx[s]]),
+            "agent": emb.agent[idx[s]],
+            "rounds": emb.round[idx[s:e]].tolist(),
+            "step_drift": step[s + 1:e].tolist(),
+            "total_drift": (1.0 - rows @ rows[0]).tolist(),
+        })
+    return out
+
+def clusters(emb: DebateEmbeddings, k: int, mask: Optional[np.ndarray] = None,
+             iters: int = 50, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (k-means++ init) over turn embeddings; one label per selected turn."""
+    x = emb.matrix if mask is None else emb.matrix[mask]
+    n = len(x)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    centers = [x[rng.integers(n)]]
+    for _ in range(1, k):
+        dist = np.clip(1.0 - np.max(x @ np.array(centers).T, axis=1), 0, None)
+        total = dist.sum()
+        centers.append(x[rng.choice(n, p=dist / total)] if total > 0 else x[rng.integers(n)])
+    centers = np.array(centers)
+    labels = np.full(n, -1)
+    for _ in range(iters):
+        new = np.argmax(x @ centers.T, axis=1)
+        if np.array_equal(new, labels):
+            break
+        labels = new
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, x)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centers = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centers)
+    return labels
+
+def analyze(sessions: Iterable[Dict[str, Any]], phase: str = "position",
+            n_clusters: int = 0) -> Dict[str, Any]:
+    emb = DebateEmbeddings(sessions)
+    result = {
+        "turns": len(emb),
+        "convergence": convergence(emb, phase),
+        "stance_drift": stance_drift(emb, phase),
+    }
+    if n_clusters:
+        mask = emb.mask(phase=phase)
+        labels = clusters(emb, n_clusters, mask)
+        result["clusters"] = [
+            {"debate": int(d), "agent": a, "round": int(r), "cluster": int(c)}
+            for d, a, r, c in zip(emb.debate[mask], emb.agent[mask], emb.round[mask], labels)
+        ]
+    return result
+
+def main():
+    from storage import Archive, load_session
+    ap = argparse.ArgumentParser(description="Similarity / convergence analytics over saved debates")
+    ap.add_argument("paths", nargs="*", help="session JSON files / .dta archives (default: debate_*.json)")
+    ap.add_argument("--phase", default="position", choices=["position", "critique", "defense"])
+    ap.add_argument("--clusters", type=int, default=0, help="k for k-means over turns (0 = skip)")
+    args = ap.parse_args()
+
+    sessions = []
+    for path in args.paths or sorted(glob.glob("debate_*.json")):
+        if path.endswith(".dta"):
+            with Archive(path) as archive:
+                sessions.extend(archive)
+        else:
+            sessions.append(load_session(path))
+    print(json.dumps(analyze(sessions, args.phase, args.clusters), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare embedding backends against the default model on CPU.
+
+For each candidate it reports cold start (import + load), embeddings per
+second, and accuracy drift versus the reference backend:
+
+* ``cosine``      — mean cosine between the two embeddings of the same text
+                    (only when both models share a vector space / dimension)
+* ``spearman``    — rank correlation of all pairwise similarities
+* ``top5``        — overlap of each text's 5 nearest neighbours
+* ``redundancy``  — agreement on which pairs pass the redundancy threshold
+
+Texts come from saved sessions / archives when given, else a built-in sample.
+
+    python bench_embeddings.py --candidate onnx:all-mpnet-base-v2 \\
+        --candidate onnx:all-MiniLM-L6-v2 --candidate sentence-transformers:all-MiniLM-L6-v2 debate_*.json
+"""
+from __future__ import annotations
+import argparse, glob, json, os, subprocess, sys, time
+from typing import Dict, List
+import numpy as np
+
+SAMPLE = [
+    "Carbon taxes reduce emissions more cheaply than command-and-control regulation.",
+    "A revenue-neutral carbon tax with dividends protects low-income households.",
+    "Emission trading schemes let firms find the cheapest abatement first.",
+    "Nuclear power provides reliable low-carbon baseload electricity.",
+    "Renewables plus storage are now cheaper than new nuclear plants.",
+    "Grid-scale batteries cannot yet cover multi-day wind droughts.",
+    "Universal basic income would reduce poverty without work disincentives.",
+    "Pilot studies of basic income show little change in employment.",
+    "Targeted welfare programs deliver more support per dollar than UBI.",
+    "Remote work raises productivity for focused individual tasks.",
+    "Collaboration and mentoring suffer when teams never meet in person.",
+    "Hybrid schedules capture most benefits of both office and remote work.",
+    "Social media use is correlated with teenage anxiety and depression.",
+    "Correlation studies cannot establish that social media causes depression.",
+    "Minimum wage increases have small effects on overall employment.",
+    "Higher minimum wages push small businesses to automate or close.",
+]
+
+def load_texts(paths: List[str], limit: int) -> List[str]:
+    from storage import Archive, load_session
+    texts = []
+    for path in paths:
+        sessions = list(Archive(path)) if path.endswith(".dta") else [load_session(path)]
+        for session in sessions:
+            for agent in session.get("agents", []):
+                texts.extend(t["content"] for t in agent.get("transcript", []) if t.get("content"))
+    return (texts or SAMPLE)[:limit]
+
+def cold_start(spec: str) -> float:
+    """Import + load time in a fresh interpreter (nothing cached in-process)."""
+    backend, model = spec.split(":", 1)
+    code = ("import time; t = time.perf_counter(); import embeddings; "
+            f"embeddings.load({backend!r}, {model!r}).encode(['warm']); print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(out.stdout.strip().splitlines()[-1])
+
+def run(spec: str, texts: List[str], batch_size: int):
+    import embeddings
+    backend, model = spec.split(":", 1)
+    emb = embeddings.load(backend, model)
+    emb.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    t = time.perf_counter()
+    vecs = emb.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+    return np.asarray(vecs, dtype=np.float32), len(texts) / (time.perf_counter() - t)
+
+def _ranks(x: np.ndarray) -> np.ndarray:
+    r = np.empty(len(x))
+    r[np.argsort(x)] = np.arange(len(x))
+    return r
+
+def drift(ref: np.ndarray, cand: np.ndarray, threshold: float) -> Dict[str, float]:
+    iu = np.triu_indices(len(ref), k=1)
+    s_ref, s_cand = (ref @ ref.T), (cand @ cand.T)
+    out = {"spearman": float(np.corrcoef(_ranks(s_ref[iu]), _ranks(s_cand[iu]))[0, 1])}
+    if ref.shape[1] == cand.shape[1]:
+        out["cosine"] = float(np.mean(np.einsum("ij,ij->i", ref, cand)))
+    k = min(5, len(ref) - 1)
+    np.fill_diagonal(s_ref, -np.inf)
+    np.fill_diagonal(s_cand, -np.inf)
+    nn_ref = np.argsort(-s_ref, axis=1)[:, :k]
+    nn_cand = np.argsort(-s_cand, axis=1)[:, :k]
+    out["top5"] = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(nn_ref, nn_cand)]))
+    same_ref, same_cand = s_ref[iu] >= threshold, s_cand[iu] >= threshold
+    out["redundancy"] = float(np.mean(same_ref == same_cand))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("paths", nargs="*", help="session JSON files / .dta archives for test texts")
+    ap.add_argument("--reference", default="sentence-transformers:all-mpnet-base-v2")
+    ap.add_argument("--candidate", action="append", default=[], help="backend:model (repeatable)")
+    ap.add_argument("--limit", type=int, default=512, help="max texts")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--threshold", type=float, default=0.9, help="redundancy threshold to compare")
+    args = ap.parse_args()
+
+    texts = load_texts(args.paths or sorted(glob.glob("debate_*.json")), args.limit)
+    candidates = args.candidate or ["onnx:all-mpnet-base-v2", "onnx:all-MiniLM-L6-v2"]
+    ref, ref_rate = run(args.reference, texts, args.batch_size)
+    rows = [{"backend": args.reference, "cold_start_s": cold_start(args.reference),
+             "emb_per_s": ref_rate, "dim": ref.shape[1]}]
+    for spec in candidates:
+        try:
+            vecs, rate = run(spec, texts, args.batch_size)
+            rows.append({"backend": spec, "cold_start_s": cold_start(spec), "emb_per_s": rate,
+                         "dim": vecs.shape[1], **drift(ref, vecs, args.threshold)})
+        except Exception as e:
+            rows.append({"backend": spec, "error": str(e)})
+    print(f"{len(texts)} texts")
+    for row in rows:
+        print(json.dumps({k: round(v, 4) if isinstance(v, float) else v for k, v in row.items()}))
+
+if __name__ == "__main__":
+    main()
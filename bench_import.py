@@ -0,0 +1,75 @@
+"""Import-time benchmark and regression budget for the app's startup path.
+
+Each target is imported in a fresh interpreter (median of ``--repeat`` runs,
+measured around the import itself so interpreter start-up is excluded).  A
+target fails if it takes longer than its budget or drags in a module that
+must stay deferred until first use (torch, sentence-transformers, numpy,
+httpx, provider SDKs, ...).  Exits 1 on any failure, so it can gate CI:
+
+    python bench_import.py            # table + pass/fail
+    python bench_import.py --json     # machine-readable
+"""
+from __future__ import annotations
+import argparse, json, os, statistics, subprocess, sys
+
+# target → (statement, budget in ms)
+TARGETS = {
+    "providers": ("import providers", 150),
+    "agents": ("import agents", 200),
+    "orchestrator": ("import orchestrator", 250),
+    # Everything streamlit_app.py imports except streamlit itself
+    "app": ("import providers, agents, summaries, orchestrator, storage, search", 300),
+}
+
+# Must not be loaded by any target: each is imported where it is first needed
+DEFERRED = ["torch", "sentence_transformers", "transformers", "onnxruntime", "numpy",
+            "httpx", "llama_cpp", "openai", "anthropic", "mistralai", "ollama",
+            "tornado", "providers.openai_provider", "providers.anthropic_provider",
+            "providers.mistral_provider", "providers.local_provider",
+            "providers.embedded_provider", "providers.batch"]
+
+_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+{stmt}
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({{"ms": ms, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+def measure(stmt: str, repeat: int):
+    times, loaded = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(stmt=stmt, deferred=DEFERRED)],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(res["ms"])
+        loaded = res["loaded"]
+    return statistics.median(times), loaded
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time benchmark with budgets")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--scale", type=float, default=float(os.getenv("IMPORT_BUDGET_SCALE", "1")),
+                    help="multiply budgets (slow CI hosts)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    rows, failed = [], False
+    for name, (stmt, budget) in TARGETS.items():
+        ms, loaded = measure(stmt, args.repeat)
+        ok = ms <= budget * args.scale and not loaded
+        failed |= not ok
+        rows.append({"target": name, "ms": round(ms, 1), "budget_ms": budget * args.scale,
+                     "eager_heavy_imports": loaded, "ok": ok})
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for r in rows:
+            extra = f"  loaded: {', '.join(r['eager_heavy_imports'])}" if r["eager_heavy_imports"] else ""
+            print(f"{'ok  ' if r['ok'] else 'FAIL'} {r['target']:<14}{r['ms']:>8.1f} ms "
+                  f"(budget {r['budget_ms']:.0f}){extra}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
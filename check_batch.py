@@ -0,0 +1,57 @@
+"""End-to-end check of batch collection against ``LocalBatchBackend``.
+
+Concurrent callers submit prompts through one ``BatchCollector``; they must
+go out as a single job, and each reply (or failure) must reach the caller
+that asked for it.  Exits 1 on any problem, so it can gate CI:
+
+    python check_batch.py
+    python check_batch.py --callers 200
+"""
+from __future__ import annotations
+import argparse, asyncio, sys
+from typing import List
+from providers import Provider
+from providers.batch import BatchCollector, BatchProvider
+
+class Echo(Provider):
+    rate_limited = False
+
+    async def complete(self, prompt: str) -> str:
+        if prompt.startswith("fail"):
+            raise RuntimeError("refused")
+        return f"re: {prompt}"
+
+async def check(callers: int = 24) -> List[str]:
+    """Problems found; empty when the stand-in batches and fans back correctly."""
+    col = BatchCollector(idle=0.05, max_wait=5.0, poll_interval=0.01)
+    provider = BatchProvider("local", Echo("echo"))
+    jobs: List[int] = []
+    submit = provider.backend.submit
+
+    async def _counted(model, requests):
+        jobs.append(len(requests))
+        return await submit(model, requests)
+
+    provider.backend.submit = _counted
+    prompts = [f"fail {i}" if i % 7 == 3 else f"prompt {i}" for i in range(callers)]
+    replies = await asyncio.gather(*(col.submit(provider.backend, provider.model, p) for p in prompts),
+                                   return_exceptions=True)
+    problems = []
+    if jobs != [callers]:
+        problems.append(f"expected one job of {callers} prompts, got {jobs}")
+    for prompt, reply in zip(prompts, replies):
+        want_error = prompt.startswith("fail")
+        if want_error != isinstance(reply, Exception) or (not want_error and reply != f"re: {prompt}"):
+            problems.append(f"{prompt!r} got {reply!r}")
+    return problems
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--callers", type=int, default=24)
+    args = ap.parse_args()
+    problems = asyncio.run(check(args.callers))
+    print("\n".join(problems) or "LocalBatchBackend: ok")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
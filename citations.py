@@ -0,0 +1,284 @@
+"""MLA citation extraction, per-debate index and bibliography checks.
+
+``parse(text)`` pulls MLA-style citations out of a turn and normalizes them
+to a key (author surname | first title words | year), so the same work cited
+with different punctuation or casing is counted once.  Parenthetical in-text
+citations — ``(Smith 45)``, ``(Smith, Jones, and Lee 45)``, ``(Smith et al.
+2019)`` — have no title; their key is ``surname||year`` and ``same_work``
+matches them to any work by that first author (and year, when both give one).  Parsing is cached by
+text, verification by key, so stats for the judge and the UI come from the
+index instead of re-reading transcripts.
+
+``Bibliography`` loads a reference list (``.bib``, CSL / plain ``.json``, or
+one MLA entry per line) and classifies each citation as ``verified``,
+``mismatch`` (author and title found, year differs) or ``unknown``.
+"""
+from __future__ import annotations
+import hashlib, json, re, threading, unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Author, Given. "Title." Container, Year.  /  Author, Given. *Title*. Publisher, Year.
+MLA_PATTERN = re.compile(r"[A-Z][A-Za-z'\-]+,\s+[A-Z][^.\n]{0,60}\.\s+[\"“][^\"”]+[\"”]")
+_CITATION = re.compile(
+    r"(?P<author>[A-Z][\w'’\-]+,\s+[A-Z][^.\"“*_\n]{0,60}?)\.\s+"
+    r"(?:[\"“](?P<title>[^\"”\n]{3,200}?)[\"”]|[*_](?P<book>[^*_\n]{3,200}?)[*_])"
+    r"(?P<rest>[^\n\"“]{0,160}?\b(?P<year>1[5-9]\d\d|20\d\d)\b)?")
+# (Smith 45), (Smith and Lee 12-14), (Smith, Jones, and Lee p. 45), (Smith et al. 2019); ";" separates several
+_PAREN = re.compile(r"\(([^()\n]{3,200})\)")
+_NAME = r"[A-Z][a-z][\w'’\-]*"
+_IN_TEXT = re.compile(rf"(?P<names>{_NAME}(?:(?:\s*,\s*(?:and\s+)?|\s+and\s+|\s*&\s*){_NAME})*(?:\s+et\s+al\.?)?)"
+                      r",?\s+(?:pp?\.\s*)?(?P<loc>\d{1,4}(?:\s*[-–]\s*\d{1,4})?)")
+# Capitalized words that precede numbers in parentheses without being authors
+_NOT_AUTHORS = {"agent", "appendix", "chapter", "eq", "fig", "figure", "grade", "index", "item", "level",
+                "no", "page", "part", "phase", "point", "round", "rule", "section", "step", "table",
+                "version", "vol", "volume", "year", "january", "february", "march", "april", "may", "june",
+                "july", "august", "september", "october", "november", "december"}
+_YEAR = re.compile(r"1[5-9]\d\d|20\d\d")
+TITLE_WORDS = 6
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+class Citation:
+    __slots__ = ("author", "title", "container", "year", "raw", "key")
+
+    def __init__(self, author: str, title: str, container: str = "", year: Optional[str] = None, raw: str = ""):
+        self.author = author.strip()
+        self.title = title.strip().rstrip(".,")
+        self.container = container.strip(" .,")
+        self.year = year
+        self.raw = raw or f"{self.author}. \"{self.title}.\""
+        self.key = make_key(self.author, self.title, year)
+
+    @property
+    def surname(self) -> str:
+        return normalize(self.author.split(",")[0])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        return f"Citation({self.key!r})"
+
+def make_key(author: str, title: str, year: Optional[str] = None) -> str:
+    surname = normalize(author.split(",")[0])
+    words = normalize(title).split()[:TITLE_WORDS]
+    return f"{surname}|{' '.join(words)}|{year or ''}"
+
+# Parse results keyed by a digest of the text, so the cache doesn't pin turn text in memory
+_PARSED: "OrderedDict[bytes, Tuple[Citation, ...]]" = OrderedDict()
+_PARSED_MAX = 4096
+_lock = threading.Lock()
+
+def parse(text: str) -> Tuple[Citation, ...]:
+    """Unique citations in ``text`` in order of first appearance (cached)."""
+    key = hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).digest()
+    with _lock:
+        if key in _PARSED:
+            _PARSED.move_to_end(key)
+            return _PARSED[key]
+    result = _parse(text)
+    with _lock:
+        _PARSED[key] = result
+        while len(_PARSED) > _PARSED_MAX:
+            _PARSED.popitem(last=False)
+    return result
+
+def _parse(text: str) -> Tuple[Citation, ...]:
+    out, seen = [], set()
+    for m in _CITATION.finditer(text or ""):
+        rest = m.group("rest") or ""
+        year = m.group("year")
+        cite = Citation(m.group("author"), m.group("title") or m.group("book"),
+                        rest[:rest.rfind(year)] if year else "", year, m.group(0).strip())
+        if cite.key not in seen:
+            seen.add(cite.key)
+            out.append(cite)
+    # In-text citations of a work already listed (or cited in-text) count once
+    for cite in _in_text(text or ""):
+        if not cited_before(cite.key, seen):
+            seen.add(cite.key)
+            out.append(cite)
+    return tuple(out)
+
+def _in_text(text: str) -> List[Citation]:
+    out = []
+    for paren in _PAREN.finditer(text):
+        for part in paren.group(1).split(";"):
+            m = _IN_TEXT.fullmatch(part.strip())
+            if not m or m.group("names").split()[0].rstrip(",").lower() in _NOT_AUTHORS:
+                continue
+            first = re.split(r"\s*,\s*|\s+and\s+|\s*&\s*|\s+et\s+al", m.group("names"))[0]
+            year = m.group("loc") if _YEAR.fullmatch(m.group("loc")) else None
+            out.append(Citation(first, "", year=year, raw=f"({part.strip()})"))
+    return out
+
+def same_work(a: str, b: str) -> bool:
+    """Whether two keys can name the same work: equal, or one is an in-text key
+    (no title) with the other's first-author surname and a compatible year."""
+    if a == b:
+        return True
+    sa, ta, ya = a.split("|")
+    sb, tb, yb = b.split("|")
+    return sa == sb and (not ta or not tb) and (not ya or not yb or ya == yb)
+
+def cited_before(key: str, seen: Iterable[str]) -> bool:
+    return key in seen or any(same_work(key, k) for k in seen)
+
+def keys(text: str) -> List[str]:
+    return [c.key for c in parse(text)]
+
+# ---------------- Bibliography ----------------
+def _similar(a: str, b: str) -> float:
+    a, b = set(normalize(a).split()), set(normalize(b).split())
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+class Bibliography:
+    """Reference list that citations are checked against."""
+    def __init__(self, entries: Iterable[Citation] = (), title_match: float = 0.6):
+        self.entries = list(entries)
+        self.title_match = title_match
+        self._by_surname: Dict[str, List[Citation]] = {}
+        for e in self.entries:
+            self._by_surname.setdefault(e.surname, []).append(e)
+        self._verdicts: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "Bibliography":
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if path.endswith(".bib"):
+            entries = _bibtex(text)
+        elif path.endswith(".json"):
+            entries = [_json_entry(e) for e in json.loads(text)]
+        else:
+            entries = [c for line in text.splitlines() for c in parse(line)]
+        return cls([e for e in entries if e], **kwargs)
+
+    def verify(self, cite: Citation) -> str:
+        if cite.key not in self._verdicts:
+            self._verdicts[cite.key] = self._verify(cite)
+        return self._verdicts[cite.key]
+
+    def _verify(self, cite: Citation) -> str:
+        # In-text citations only give the author (and maybe the year)
+        candidates = [e for e in self._by_surname.get(cite.surname, [])
+                      if not cite.title or e.key == cite.key or _similar(e.title, cite.title) >= self.title_match]
+        if not candidates:
+            return "unknown"
+        if any(not cite.year or not e.year or e.year == cite.year for e in candidates):
+            return "verified"
+        return "mismatch"
+
+def _bibtex(text: str) -> List[Citation]:
+    entries = []
+    for body in re.split(r"@\w+\s*\{", text)[1:]:
+        fields = dict((k.lower(), re.sub(r"[{}]", "", v).strip())
+                      for k, v in re.findall(r"(\w+)\s*=\s*[{\"](.+?)[}\"]\s*,?\s*$", body, re.M))
+        if fields.get("author") and fields.get("title"):
+            first = fields["author"].split(" and ")[0]
+            entries.append(Citation(first if "," in first else " ".join(first.split()[-1:]) + ", " + first,
+                                    fields["title"], fields.get("journal", fields.get("publisher", "")),
+                                    fields.get("year")))
+    return entries
+
+def _json_entry(e: Dict[str, Any]) -> Optional[Citation]:
+    author = e.get("author")
+    if isinstance(author, list) and author:  # CSL-JSON
+        first = author[0]
+        author = f"{first.get('family', '')}, {first.get('given', '')}" if isinstance(first, dict) else str(first)
+    year = e.get("year") or (e.get("issued", {}).get("date-parts") or [[None]])[0][0]
+    if not author or not e.get("title"):
+        return None
+    return Citation(str(author), e["title"], e.get("container-title", e.get("journal", "")),
+                    str(year) if year else None)
+
+# ---------------- Per-debate index ----------------
+class CitationIndex:
+    """Citations of one debate, deduplicated by key, with who cited what and when."""
+    def __init__(self, bibliography: Optional[Bibliography] = None):
+        self.bibliography = bibliography
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._indexed: Dict[str, int] = {}  # agent → transcript turns already indexed
+
+    def add_turn(self, agent: str, turn: Dict[str, Any]) -> List[str]:
+        """Index one turn; returns the keys it cited for the first time (by that agent)."""
+        fresh = []
+        for cite in parse(turn.get("content", "")):
+            key = cite.key
+            if not cite.title:  # an in-text citation joins the work it refers to, if indexed
+                key = next((k for k in self.entries if same_work(key, k)), key)
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {
+                    "citation": cite, "uses": [],
+                    "status": self.bibliography.verify(cite) if self.bibliography else None,
+                }
+            if not any(u["agent"] == agent for u in entry["uses"]):
+                fresh.append(key)
+            entry["uses"].append({"agent": agent, "round": turn.get("round_num"), "phase": turn.get("round")})
+        return fresh
+
+    def sync(self, agents) -> "CitationIndex":
+        """Index turns added since the last call (re-indexes if a transcript was replaced)."""
+        if any(len(a.transcript) < self._indexed.get(a.name, 0) for a in agents):
+            self.entries, self._indexed = {}, {}
+        for agent in agents:
+            for turn in agent.transcript[self._indexed.get(agent.name, 0):]:
+                self.add_turn(agent.name, turn)
+            self._indexed[agent.name] = len(agent.transcript)
+        return self
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per agent: mentions, unique works, works shared with others, new works per round,
+        and verification counts when a bibliography is loaded."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries.values():
+            citers: Dict[str, List[Dict[str, Any]]] = {}
+            for use in entry["uses"]:
+                citers.setdefault(use["agent"], []).append(use)
+            for agent, uses in citers.items():
+                s = out.setdefault(agent, {"mentions": 0, "unique": 0, "shared": 0,
+                                           "new_by_round": Counter(), "verification": Counter()})
+                s["mentions"] += len(uses)
+                s["unique"] += 1
+                s["shared"] += len(citers) > 1
+                s["new_by_round"][str(min(u["round"] or 0 for u in uses))] += 1
+                if entry["status"]:
+                    s["verification"][entry["status"]] += 1
+        for s in out.values():
+            s["new_by_round"] = dict(sorted(s["new_by_round"].items(), key=lambda x: int(x[0])))
+            if s["verification"]:
+                s["verification"] = dict(s["verification"])
+            else:
+                del s["verification"]
+        return out
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Most-cited works across the debate."""
+        ranked = sorted(self.entries.values(), key=lambda e: -len(e["uses"]))[:n]
+        return [{"citation": e["citation"].raw, "uses": len(e["uses"]),
+                 "agents": sorted({u["agent"] for u in e["uses"]}), "status": e["status"]} for e in ranked]
+
+def main():
+    import argparse
+    from storage import load_session
+    ap = argparse.ArgumentParser(description="Citation stats for saved debate sessions")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--bibliography", help=".bib / .json / MLA-per-line reference list")
+    args = ap.parse_args()
+    bib = Bibliography.load(args.bibliography) if args.bibliography else None
+    for path in args.paths:
+        index = CitationIndex(bib)
+        for agent in load_session(path).get("agents", []):
+            for turn in agent.get("transcript", []):
+                index.add_turn(agent["name"], turn)
+        print(json.dumps({"path": path, "agents": index.stats(), "top": index.top(5)}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Embedding backends behind ``agents.get_embedder()``.
+
+Every backend has a sentence-transformers style ``encode(texts,
+normalize_embeddings=..., batch_size=...)`` returning NumPy rows, so the
+similarity code doesn't care which one is loaded.
+
+* ``sentence-transformers`` (default) — PyTorch, ``all-mpnet-base-v2``.
+* ``onnx`` — onnxruntime + tokenizers only, no torch import.  Loads an
+  exported model (by default the int8-quantized ``onnx/model_quint8_avx2.onnx``
+  that sentence-transformers publishes on the Hub) and mean-pools in NumPy.
+  Needs ``pip install onnxruntime tokenizers``.
+
+Environment: EMBEDDING_BACKEND (``sentence-transformers`` | ``onnx``),
+EMBEDDING_MODEL (Hub id or local directory, e.g. ``all-MiniLM-L6-v2`` for a
+smaller model), EMBEDDING_ONNX_FILE (model file inside that repo / dir).
+``bench_embeddings.py`` measures speed and accuracy drift against the default.
+"""
+from __future__ import annotations
+import abc, os
+from typing import Dict, List, Optional, Union
+import numpy as np
+
+DEFAULT_MODEL = "all-mpnet-base-v2"
+DEFAULT_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+class EmbeddingBackend(abc.ABC):
+    name = ""
+
+    @abc.abstractmethod
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray: ...
+
+    def encode(self, texts: Union[str, List[str]], normalize_embeddings: bool = False,
+               batch_size: int = 32, convert_to_numpy: bool = True, **_) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = self._encode(texts, batch_size) if texts else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(out):
+            out = out / np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+# ---------------- Registry ➜ name→cls map ---------------
+_REG: Dict[str, type] = {}
+
+def register(name: str):
+    def _wrap(cls):
+        cls.name = name
+        _REG[name] = cls
+        return cls
+    return _wrap
+
+@register("sentence-transformers")
+class SentenceTransformerBackend(EmbeddingBackend):
+    def __init__(self, model: str = DEFAULT_MODEL, device: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model, device=device)
+
+    def _encode(self, texts, batch_size):
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+@register("onnx")
+class OnnxBackend(EmbeddingBackend):
+    """Transformer encoder run with onnxruntime, mean-pooled like sentence-transformers."""
+    def __init__(self, model: str = DEFAULT_MODEL, file_name: str = DEFAULT_ONNX_FILE,
+                 max_length: int = 384, threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The 'onnx' embedding backend needs: pip install onnxruntime tokenizers") from e
+        folder = model if os.path.isdir(model) else _download(model, file_name)
+        self.tokenizer = Tokenizer.from_file(os.path.join(folder, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(os.path.join(folder, file_name), opts,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts, batch_size):
+        out = []
+        # Sort by length so each batch pads to a similar length; restore order after
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            enc = self.tokenizer.encode_batch([texts[i] for i in order[start:start + batch_size]])
+            ids = np.array([e.ids for e in enc], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+            feed = {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+            hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+            weights = mask[..., None].astype(np.float32)
+            out.append((hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None))
+        result = np.empty((len(texts), out[0].shape[1]), dtype=np.float32)
+        result[order] = np.concatenate(out)
+        return result
+
+def _download(model: str, file_name: str) -> str:
+    from huggingface_hub import snapshot_download
+    repo = model if "/" in model else f"sentence-transformers/{model}"
+    return snapshot_download(repo, allow_patterns=[file_name, "tokenizer.json", "*.txt"])
+
+def quantize(src: str, dst: str):
+    """Dynamic int8 quantization of an exported fp32 ONNX model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+
+def load(backend: Optional[str] = None, model: Optional[str] = None, **kwargs) -> EmbeddingBackend:
+    """Backend from arguments, falling back to the EMBEDDING_* environment."""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+    model = model or os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL)
+    if backend not in _REG:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Registered: {list(_REG)}")
+    if backend == "onnx" and os.getenv("EMBEDDING_ONNX_FILE"):
+        kwargs.setdefault("file_name", os.getenv("EMBEDDING_ONNX_FILE"))
+    return _REG[backend](model, **kwargs)
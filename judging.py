@@ -0,0 +1,124 @@
+"""Incremental judging: each verdict sees only the new turns plus a scorecard.
+
+Turns never change once spoken, so per-turn assessments (citation counts,
+rule compliance, ...) are computed once and cached by a hash of the turn.
+The judge gets each agent's newest turn with its assessment and a compact
+scorecard carried forward from earlier verdicts, so its prompt stays about
+the size of the default one every round instead of growing with the debate.
+
+Assessors are plain functions ``turn -> dict``; ``register_assessor`` adds
+one (later keys win on collisions).
+"""
+from __future__ import annotations
+import hashlib, re, threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import citations
+
+Assessor = Callable[[Dict[str, Any]], Dict[str, Any]]
+ASSESSORS: List[Assessor] = []
+
+def register_assessor(fn: Assessor) -> Assessor:
+    ASSESSORS.append(fn)
+    return fn
+
+MLA_PATTERN = citations.MLA_PATTERN
+INDEX_PATTERN = re.compile(r"(Fragility|Confidence) Index\W{0,5}(\d+(?:\.\d+)?)", re.I)
+
+@register_assessor
+def basic_assessment(turn: Dict[str, Any]) -> Dict[str, Any]:
+    content = turn.get("content", "")
+    index = INDEX_PATTERN.search(content)
+    return {
+        "words": len(content.split()),
+        "citations": len(citations.parse(content)),
+        "index": float(index.group(2)) if index else None,
+    }
+
+def turn_hash(agent: str, turn: Dict[str, Any]) -> str:
+    key = f"{agent}\0{turn.get('round')}\0{turn.get('content', '')}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+class AssessmentCache:
+    """Thread-safe LRU of turn hash → assessment."""
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def assess(self, agent: str, turn: Dict[str, Any]) -> Dict[str, Any]:
+        key = turn_hash(agent, turn)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        result: Dict[str, Any] = {}
+        for fn in ASSESSORS:
+            try:
+                result.update(fn(turn))
+            except Exception as e:
+                print(f"Assessor {fn.__name__} failed: {e}")
+        with self._lock:
+            self._data[key] = result
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return result
+
+_cache = AssessmentCache()
+
+def assessment_cache() -> AssessmentCache:
+    """Process-wide cache, shared by every debate."""
+    return _cache
+
+def scorecard(history: List[Dict[str, Any]], names: List[str], keep: int = 3) -> Dict[str, Any]:
+    """Carried-forward view of earlier verdicts: latest score, recent trend, rounds led."""
+    card = {}
+    for name in names:
+        trend = [round(item["scores"][name], 2) for item in history if name in item.get("scores", {})]
+        card[name] = {
+            "score": trend[-1] if trend else None,
+            "trend": trend[-keep:],
+            "rounds_led": sum(1 for item in history if item.get("leader") == name),
+        }
+    last = history[-1]["verdict"] if history else None
+    out = {"rounds_judged": len(history), "agents": card}
+    if isinstance(last, dict) and last.get("explanation"):
+        out["last_explanation"] = str(last["explanation"])[:300]
+    return out
+
+def round_state(agents, round_num: int, history: List[Dict[str, Any]], config: Dict[str, Any],
+                cache: Optional[AssessmentCache] = None, text=None) -> Dict[str, Any]:
+    """Judge input for one round: each agent's newest turn (with its cached
+    assessment) plus the scorecard.  Same turns as the default state, so it
+    stays as small as that one; earlier rounds reach the judge only through
+    the scorecard.
+
+    ``text(agent, turn)`` picks what to send for a turn (e.g. the condensed form).
+    """
+    cache = cache or assessment_cache()
+    text = text or (lambda agent, turn: turn["content"])
+    payload = []
+    for agent in agents:
+        # Newest first, stopping at the previous round: older (possibly spilled) turns aren't read
+        turn = None
+        for t in reversed(agent.transcript):
+            if t.get("round_num", 0) < round_num:
+                break
+            if t.get("round_num") == round_num:
+                turn = t
+                break
+        payload.append({
+            "name": agent.name,
+            "last": None if turn is None else {"phase": turn["round"], "content": text(agent, turn),
+                                               "assessment": cache.assess(agent.name, turn)},
+        })
+    return {
+        "mode": "incremental",
+        "round": round_num,
+        "config": config,
+        "scorecard": scorecard(history, [a.name for a in agents]),
+        "agents": payload,
+    }
@@ -1,18 +1,26 @@
 from __future__ import annotations
-import asyncio, json, time
-from typing import List, Dict, Any
-from agents import Agent, Judge
-
-# Import pocketflow components correctly
-try:
-    from pocketflow import AsyncFlow, AsyncNode
-    POCKETFLOW_AVAILABLE = True
-except ImportError:
-    POCKETFLOW_AVAILABLE = False
+import asyncio, json, os, time
+from typing import List, Dict, Any, Callable, Optional
+from agents import Agent, Judge, JudgePanel
+from phases import Phase, debate_graph, is_dense, latest_turn
+import summaries, judging, rules, profiling
+from storage import SpillStore, SpilledList
+
+def shared_prefix(prompts: List[str], min_chars: int = 200) -> str:
+    """Longest common leading text of ``prompts``, cut back to a paragraph
+    break so the split is stable; "" when it is too short to be worth caching."""
+    prefix = os.path.commonprefix(prompts)
+    # rstrip: identical prompts still keep their last paragraph as the per-call part
+    cut = prefix.rstrip().rfind("\n\n")
+    return prefix[:cut + 2] if cut >= 0 and cut + 2 >= min_chars else ""
 
 class DebateConfig:
     def __init__(self, agents_cfg, judge_cfg, auto=False, debate_type="non-binary", 
-                 opposition_mode=False, affirmative_agents=None, negative_agents=None):
+                 opposition_mode=False, affirmative_agents=None, negative_agents=None,
+                 cache_responses=False, max_rounds=None, redundancy_threshold=None,
+                 redundancy_mode="mark", judge_aggregate="median", judge_quorum=None,
+                 incremental_judging=False, bibliography=None, keep_rounds=None,
+                 critique_topology="all", critique_k=2):
         self.agents_cfg = agents_cfg
         self.judge_cfg = judge_cfg
         self.auto = auto
@@ -20,27 +28,26 @@ class DebateConfig:
         self.opposition_mode = opposition_mode
         self.affirmative_agents = affirmative_agents or []
         self.negative_agents = negative_agents or []
-
-# Only define DebateNode if pocketflow is available
-if POCKETFLOW_AVAILABLE:
-    class DebateNode(AsyncNode):
-        def __init__(self, agent: Agent, prompt_template: str, round_type: str):
-            super().__init__()
-            self.agent = agent
-            self.prompt_template = prompt_template
-            self.round_type = round_type
-        
-        async def prep_async(self, shared):
-            # Return empty dict to satisfy AsyncNode contract
-            return {}
-            
-        async def exec_async(self, prep_res):
-            # exec_async should return a string according to pocketflow API
-            return await self.agent.speak(self.prompt_template, round_type=self.round_type)
-            
-        async def post_async(self, shared, prep_res, exec_res):
-            # Return the action for next node (default)
-            return "default"
+        self.cache_responses = cache_responses
+        self.max_rounds = max_rounds  # when set, the debate stops after this many rounds, the last without cascades
+        # Cosine similarity at which a paragraph repeating the agent's earlier
+        # turns is marked / stripped from downstream prompts; None disables it
+        self.redundancy_threshold = redundancy_threshold
+        self.redundancy_mode = redundancy_mode
+        # judge_cfg may be a list of judge cfgs: they vote as a JudgePanel
+        self.judge_aggregate = judge_aggregate
+        self.judge_quorum = judge_quorum
+        # Judge each round's turns + a carried-forward scorecard (see judging.py)
+        self.incremental_judging = incremental_judging
+        # Reference list (.bib / .json / MLA lines) citations are checked against
+        self.bibliography = bibliography or os.getenv("CITATION_BIBLIOGRAPHY")
+        # Rounds kept fully in memory; older turns / verdicts are spilled to
+        # disk and paged back in on access.  None keeps everything
+        self.keep_rounds = keep_rounds
+        # Who critiques whom (phases.TOPOLOGIES); sparse topologies give
+        # each agent critique_k targets and still cover every position
+        self.critique_topology = critique_topology
+        self.critique_k = critique_k
 
 class DebateOrchestrator:
     def __init__(self, config: DebateConfig):
@@ -54,7 +61,7 @@ class DebateOrchestrator:
         for cfg in config.agents_cfg:
             # Create a copy of the config without stance
             agent_cfg = {k: v for k, v in cfg.items() 
-                         if k in ['name', 'provider_name', 'model']}
+                         if k in ['name', 'provider_name', 'model', 'cascade']}
             
             # Create the agent
             agent = Agent(**agent_cfg)
@@ -64,501 +71,375 @@ class DebateOrchestrator:
             if "stance" in cfg:
                 self.agent_stances[agent.name] = cfg["stance"]
     
-        self.judge = Judge(**config.judge_cfg)
+        if isinstance(config.judge_cfg, list):
+            self.judge = JudgePanel([Judge(**cfg) for cfg in config.judge_cfg],
+                                    getattr(config, "judge_aggregate", "median"),
+                                    getattr(config, "judge_quorum", None))
+        else:
+            self.judge = Judge(**config.judge_cfg)
+        if getattr(config, "cache_responses", False):
+            for ag in self.agents + self.judges:
+                ag.use_cache = True
+        self.redundancy = None
+        if getattr(config, "redundancy_threshold", None):
+            from redundancy import RedundancyFilter
+            self.redundancy = RedundancyFilter(config.redundancy_threshold,
+                                               getattr(config, "redundancy_mode", "mark"))
+        self._citations = None
+        self.spill = SpillStore() if getattr(config, "keep_rounds", None) else None
         self.round_num = 0
-        self.phase = "position"  # position, critique, defense
+        self.graph = debate_graph()
+        self.phase = self.graph.first  # position, critique, defense
         self.stopped = False
+        self._loop = None
+        self._tasks: set = set()  # rounds in flight, cancelled by stop()
         self.history: List[Dict[str,Any]] = []
-
-    # ------------------ Pocket Flow DAG ------------------
-    def _build_flow(self, user_topic: str):
-        if not POCKETFLOW_AVAILABLE:
-            raise ImportError("pocketflow not available")
-            
-        flow = AsyncFlow()
-        
-        if self.phase == "position":
-            # Create first node
-            first_node = DebateNode(
-                self.agents[0], 
-                f"Write a scholarly answer to the question, with citations in MLA. Question: {user_topic}",
-                "position"
-            )
-            flow.start(first_node)
-            
-            # Chain remaining agents
-            current_node = first_node
-            for ag in self.agents[1:]:
-                next_node = DebateNode(
-                    ag,
-                    f"Write a scholarly answer to the question, with citations in MLA. Question: {user_topic}",
-                    "position"
-                )
-                # Use operator directly, ignore the result
-                current_node.next(next_node)
-                current_node = next_node
-                
-        elif self.phase == "critique":
-            joined = "\n\n".join(a.transcript[-1]["content"] for a in self.agents)
-            # Create first node
-            first_node = DebateNode(
-                self.agents[0],
-                f"Critique the following peer responses for scholarly rigor and evidence quality. Be concise.\n\n{joined}",
-                "critique"
-            )
-            flow.start(first_node)
-            
-            # Chain remaining agents
-            current_node = first_node
-            for ag in self.agents[1:]:
-                next_node = DebateNode(
-                    ag,
-                    f"Critique the following peer responses for scholarly rigor and evidence quality. Be concise.\n\n{joined}",
-                    "critique"
-                )
-                current_node.next(next_node)
-                current_node = next_node
-                
-        elif self.phase == "defense":
-            critiques = "\n\n".join(a.transcript[-1]["content"] for a in self.agents)
-            # Create first node
-            first_node = DebateNode(
-                self.agents[0],
-                f"Address critiques directed at your prior answer: {critiques}",
-                "defense"
-            )
-            flow.start(first_node)
-            
-            # Chain remaining agents
-            current_node = first_node
-            for ag in self.agents[1:]:
-                next_node = DebateNode(
-                    ag,
-                    f"Address critiques directed at your prior answer: {critiques}",
-                    "defense"
-                )
-                current_node.next(next_node)
-                current_node = next_node
-                
-        return flow
-
-    async def _run_phase(self, topic: str):
-        if POCKETFLOW_AVAILABLE:
+        self._rules_carried: Dict[str, Any] = {}  # agent → rules.Carried, so rule checks read each turn once
+        self.topic = None
+        # Callbacks ``(event, data)`` fired for "turn", "verdict" and "phase"
+        # events; used by the HTTP server to stream debates to clients.
+        self.listeners: List[Callable[[str, Dict[str, Any]], Any]] = []
+
+    @property
+    def judges(self) -> List[Judge]:
+        return list(getattr(self.judge, "judges", [self.judge]))
+
+    @property
+    def citations(self):
+        """Per-debate citation index, brought up to date with the transcripts."""
+        if self._citations is None:
+            from citations import Bibliography, CitationIndex
+            bib, path = None, getattr(self.config, "bibliography", None)
+            if path:
+                try:
+                    bib = Bibliography.load(path)
+                except Exception as e:
+                    print(f"Could not load bibliography {path}: {e}")
+            self._citations = CitationIndex(bib)
+        return self._citations.sync(self.agents)
+
+    def spill_old_rounds(self):
+        """Move rounds older than ``keep_rounds`` out of memory."""
+        if self.spill is None:
+            return
+        cutoff = self.round_num - self.config.keep_rounds
+        for agent in self.agents:
+            # Re-wrap transcripts replaced wholesale (e.g. a loaded session)
+            if not isinstance(agent.transcript, SpilledList):
+                agent.transcript = SpilledList(self.spill, ("content", "condensed", "repeated_paragraphs"),
+                                               agent.transcript)
+            agent.transcript.spill(lambda t: t.get("round_num", 0) < cutoff)
+        if not isinstance(self.history, SpilledList):
+            self.history = SpilledList(self.spill, ("verdict",), self.history)
+        self.history.spill(lambda item: item.get("round", 0) < cutoff)
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        for cb in list(self.listeners):
             try:
-                flow = self._build_flow(topic)
-                shared = {}  # Shared state object required by pocketflow
-                await flow._run_async(shared)  # Use _run_async as per pocketflow API
+                cb(event, data)
             except Exception as e:
-                print(f"Pocketflow error: {e}, falling back to simple execution")
-                await self._run_phase_simple(topic)
-        else:
-            await self._run_phase_simple(topic)
-
-    async def _judge_consensus(self) -> Dict[str,Any]:
-        state_json = json.dumps({
-            "agents": [
-                {"name": a.name, "last": a.transcript[-1]["content"]}
-                for a in self.agents
-            ],
-            "phase": self.phase,
-            "round": self.round_num,
+                print(f"Listener error on {event}: {e}")
+
+    def is_final_round(self) -> bool:
+        max_rounds = getattr(self.config, "max_rounds", None)
+        return max_rounds is not None and self.round_num >= max_rounds - 1
+
+    async def _speak(self, agent: Agent, prompt: str, round_type: str, prefix: str = "") -> str:
+        before = len(agent.transcript)
+        try:
+            reply = await agent.speak(prompt, round_type=round_type, strong=self.is_final_round(), prefix=prefix)
+        except asyncio.CancelledError:
+            if len(agent.transcript) > before:  # partial turn kept by the agent
+                turn = agent.transcript[-1]
+                turn["round_num"] = self.round_num
+                turn["summary"] = summaries.summarize_turn(turn["content"])
+                self._emit("turn", {"agent": agent.name, "round": round_type, "round_num": self.round_num,
+                                    "model": turn.get("model"), "content": turn["content"], "partial": True})
+            raise
+        # The UI keys turns by (agent, round_num, phase) and only reads the digest
+        agent.transcript[-1]["round_num"] = self.round_num
+        with profiling.span("turn.summarize", agent=agent.name):
+            agent.transcript[-1]["summary"] = summaries.summarize_turn(reply)
+        if self.redundancy is not None:
+            with profiling.span("turn.condense", agent=agent.name):
+                await self._condense(agent)
+        self._emit("turn", {
+            "agent": agent.name,
+            "round": round_type,
+            "round_num": self.round_num,
+            "model": agent.transcript[-1].get("model"),
+            "content": reply,
         })
-        return await self.judge.verdict(state_json)
-
-    # ------------------ Public API ------------------
-    async def next_round(self, topic: str):
-        """Run the next round of the debate"""
-        if self.stopped: 
+        return reply
+
+    async def _condense(self, agent: Agent):
+        turn = agent.transcript[-1]
+        try:
+            if not self.redundancy.knows(agent.name) and len(agent.transcript) > 1:
+                await asyncio.to_thread(self.redundancy.seed, agent.name,
+                                        [t["content"] for t in agent.transcript[:-1]])
+            text, dropped = await asyncio.to_thread(self.redundancy.condense, agent.name, turn["content"])
+        except Exception as e:
+            print(f"Redundancy filter failed for {agent.name}: {e}")
             return
-        
-        # Get debate type and opposition mode settings
-        debate_type = getattr(self.config, 'debate_type', 'non-binary')
-        opposition_mode = getattr(self.config, 'opposition_mode', False)
-        
-        # Run the appropriate phase
-        if self.phase == "position":
-            # Prepare position prompts for each agent based on stance
-            prompts = []
-            for agent in self.agents:
-                # Determine agent's stance for opposition mode
-                stance = "neutral"
-                if opposition_mode:
-                    # Get stance from our lookup dictionary
-                    stance = self.agent_stances.get(agent.name, "neutral")
-                
-                print(f"Agent {agent.name} has stance: {stance}")  # Debug print
-                
-                # Select appropriate prompt based on stance
-                if opposition_mode and stance in ["affirmative", "negative"]:
-                    if stance == "affirmative":
-                        prompt = f"""
-🔥 [POSITION ROUND — Affirmative Position]
-You are an expert debater assigned to argue the AFFIRMATIVE position on:
-    "{topic}"
-
-Present the strongest possible case FOR this position, even if you might personally disagree.
-
-▪ Present a clear AFFIRMATIVE position in ≤ 250 words
-▪ Support your position with 3-5 verified facts, each with an MLA citation
-▪ Anticipate and preemptively address key counterarguments
-▪ Use precise, measured language focused on your strongest points
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to be persuasive while maintaining intellectual honesty.
-"""
-                    else:  # negative stance
-                        prompt = f"""
-🔥 [POSITION ROUND — Negative Position]
-You are an expert debater assigned to argue the NEGATIVE position on:
-    "{topic}"
-
-Present the strongest possible case AGAINST this position, even if you might personally agree.
-
-▪ Present a clear NEGATIVE position in ≤ 250 words
-▪ Support your critique with 3-5 verified facts, each with an MLA citation
-▪ Identify and emphasize key flaws in the affirmative position
-▪ Use precise, measured language focused on the weakest points of the opposing view
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to be persuasive while maintaining intellectual honesty.
-"""
-                else:
-                    # Use the standard position prompt for non-opposition or neutral agents
-                    prompt = f"""
-🔥 [POSITION ROUND — Analysis]
-You are a scholarly expert analyzing the topic:
-    "{topic}"
-
-Present a well-reasoned position based on evidence and critical thinking.
-
-▪ Present a clear position in ≤ 250 words
-▪ Support your position with 3-5 verified facts, each with an MLA citation
-▪ Consider multiple perspectives and potential counterarguments
-▪ Use precise, measured language focused on the strongest evidence
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to provide an informed, balanced analysis.
-"""
-            
-                prompts.append((agent, prompt))
-            
-            # Execute position round with customized prompts
-            for agent, prompt in prompts:
-                await agent.speak(prompt, round_type="position")
-                
-        elif self.phase == "critique":
-            # Get all agents' latest positions
-            joined = "\n\n".join(f"AGENT {i+1} ({a.name}):\n{a.transcript[-1]['content']}" 
-                               for i, a in enumerate(self.agents))
-            
-            # Use enhanced critique prompt for all agents
-            critique_prompt = CRITIQUE_PROMPT.format(joined=joined)
-            
+        if dropped:
+            turn["condensed"] = text
+            turn["repeated_paragraphs"] = dropped
+
+    @staticmethod
+    def latest(agent: Agent) -> str:
+        """The agent's last turn as passed downstream (restatements removed)."""
+        turn = agent.transcript[-1]
+        return turn.get("condensed", turn["content"])
+
+    def output(self, agent: Agent, phase: str) -> str:
+        """The agent's latest ``phase`` turn as passed downstream; with
+        pipelined phases it may already have spoken again since."""
+        turn = latest_turn(agent, phase)
+        return turn.get("condensed", turn["content"]) if turn else ""
+
+    # ------------------ Phase scheduling ------------------
+    def _schedule(self, topic: str, stretch: List[Phase]) -> List[asyncio.Future]:
+        """One task per phase of ``stretch``.  Each phase maps agent name → a
+        future set once that agent's turn is in (or it was pruned), which is
+        all later phases wait on."""
+        loop = asyncio.get_running_loop()
+        prev, runs = None, []
+        for phase in stretch:
+            done = {a.name: loop.create_future() for a in self.agents}
+            runs.append(asyncio.ensure_future(self._run_phase(phase, topic, prev, done)))
+            prev = done
+        return runs
+
+    async def _run_phase(self, phase: Phase, topic: str, prev: Optional[Dict[str, asyncio.Future]],
+                         done: Dict[str, asyncio.Future]):
+        if prev is not None and not phase.barrier:
+            await asyncio.gather(*(self._pipelined(phase, agent, topic, prev, done[agent.name])
+                                   for agent in self.agents))
+            return
+        if prev is not None:
+            await asyncio.gather(*prev.values())
+        if phase.setup:
+            await phase.setup(self)
+        jobs = []
+        with profiling.span("prompt.build", phase=phase.name):
             for agent in self.agents:
-                await agent.speak(critique_prompt, round_type="critique")
-                
-        elif self.phase == "defense":
-            # Prepare defense prompts with critiques directed at each agent
-            for i, agent in enumerate(self.agents):
-                # Extract critiques directed at this agent
-                critiques = []
-                for j, critic in enumerate(self.agents):
-                    if i != j:  # Skip self-critique
-                        critiques.append(f"FROM {critic.name}:\n{critic.transcript[-1]['content']}")
-            
-                # Use enhanced defense prompt
-                defense_prompt = DEFENSE_PROMPT.format(critiques="\n\n".join(critiques))
-                await agent.speak(defense_prompt, round_type="defense")
-        
-        # After phase ends: if defense just finished, call judge
-        if self.phase == "defense":
-            verdict = await self._judge_consensus()
-            self.history.append({
-                "round": self.round_num,
-                "verdict": verdict,
-            })
-            if verdict.get("agreement") and verdict.get("mean_agreement", 0) >= 0.75:
-                self.stopped = True
-        
-        # Advance phase / round pointer
-        if self.phase == "position":
-            self.phase = "critique"
-        elif self.phase == "critique":
-            self.phase = "defense"
-        elif self.phase == "defense":
-            self.phase = "position"
-            self.round_num += 1
-
-    def serialize(self) -> Dict[str,Any]:
-        return {
-            "config": self.config.__dict__,
-            "history": self.history,
-            "agents": [
-                {"name": a.name, "provider": type(a.provider).__name__, "transcript": a.transcript}
-                for a in self.agents
-            ]
-        }
+                sources = phase.sees(self, agent) if phase.sees else None
+                if sources == []:  # nothing to answer: pruned
+                    done[agent.name].set_result(None)
+                    continue
+                jobs.append((agent, phase.prompt(self, agent, topic, sources), sources))
+            # Text every prompt shares is passed as a cacheable prefix
+            prefix = shared_prefix([p for _, p, _ in jobs]) if len(jobs) > 1 else ""
+        await asyncio.gather(*(self._turn(phase, agent, prompt[len(prefix):], sources, done[agent.name], prefix)
+                               for agent, prompt, sources in jobs))
+
+    async def _pipelined(self, phase: Phase, agent: Agent, topic: str,
+                         prev: Dict[str, asyncio.Future], done: asyncio.Future):
+        # The agent's own previous turn first: who it sees may depend on that phase
+        await prev[agent.name]
+        sources = phase.sees(self, agent) if phase.sees else None
+        if sources == []:
+            done.set_result(None)
+            return
+        await asyncio.gather(*(prev[a.name] for a in sources or ()))
+        with profiling.span("prompt.build", phase=phase.name, agent=agent.name):
+            prompt = phase.prompt(self, agent, topic, sources)
+        await self._turn(phase, agent, prompt, sources, done)
+
+    async def _turn(self, phase: Phase, agent: Agent, prompt: str, sources: Optional[List[Agent]],
+                    done: asyncio.Future, prefix: str = ""):
+        try:
+            with profiling.span("turn", agent=agent.name, phase=phase.name, chars=len(prefix) + len(prompt)):
+                await self._speak(agent, prompt, phase.name, prefix=prefix)
+        except BaseException:
+            done.cancel()
+            raise
+        if sources is not None and not is_dense(self):
+            agent.transcript[-1]["sources"] = [a.name for a in sources]
+        done.set_result(None)
 
-    def get_debate_state(self):
-        """Get current debate state as JSON for the judge."""
-        # Include opposition mode in the debate state
-        state = {
-            "round": self.round_num,
-            "phase": self.phase,
-            "config": {
-                "debate_type": getattr(self.config, "debate_type", "non-binary"),
-                "opposition_mode": getattr(self.config, "opposition_mode", False)
-            },
-            "agents": [
-                {
-                    "name": agent.name,
-                    "transcript": agent.transcript,
-                    "stance": self.agent_stances.get(agent.name, "neutral")
+    async def _judge_consensus(self) -> Dict[str,Any]:
+        debate_type = getattr(self.config, "debate_type", "non-binary")
+        with profiling.span("judge.state"):
+            if getattr(self.config, "incremental_judging", False):
+                state = judging.round_state(
+                    self.agents, self.round_num, self.history, {"debate_type": debate_type},
+                    text=lambda agent, turn: turn.get("condensed", turn["content"]))
+            else:
+                state = {
+                    "agents": [
+                        {"name": a.name, "last": self.latest(a)}
+                        for a in self.agents
+                    ],
+                    "phase": self.phase,
+                    "round": self.round_num,
+                    "config": {"debate_type": debate_type},
                 }
-                for agent in self.agents
-            ]
+            with profiling.span("citations.stats"):
+                state["citations"] = self.citations.stats()
+            # Binary debates: DEFENSE rules are checked here, not by the judge
+            with profiling.span("rules.check"):
+                checks = rules.check_agents(self.agents, self._rules_carried) if debate_type == "binary" else {}
+            if checks:
+                state["rule_checks"] = {
+                    name: {rule: r["detail"] for rule, r in c["rules"].items() if not r["ok"]} or "all rules met"
+                    for name, c in checks.items()
+                }
+            state_json = json.dumps(state)
+        with profiling.span("judge.verdict", chars=len(state_json)):
+            verdict = await self.judge.verdict(state_json)
+        return self._apply_rules(verdict, checks) if checks else verdict
+
+    def _apply_rules(self, verdict: Any, checks: Dict[str, Any]) -> Any:
+        """Subtract the exact rule penalties from the judge's correctness scores."""
+        if not isinstance(verdict, dict) or not isinstance(verdict.get("correctness_scores"), dict):
+            return verdict
+        try:
+            scores = {n: float(s) for n, s in verdict["correctness_scores"].items()}
+        except (TypeError, ValueError):
+            return verdict
+        verdict["correctness_scores"] = rules.apply_penalties(scores, checks)
+        verdict["rule_penalties"] = {n: c["penalty"] for n, c in checks.items() if c["penalty"]}
+        verdict["rule_checks"] = {n: c["violations"] for n, c in checks.items()}
+        if verdict["rule_penalties"]:
+            leader = summaries.leading_agent(verdict["correctness_scores"]) or verdict.get("most_correct_agent")
+            verdict["most_correct_agent"] = leader
+            panel = verdict.get("panel")
+            if isinstance(panel, dict) and panel.get("method") == "median":
+                panel["leader"] = leader
+        return verdict
+
+    def _history_item(self, round_num: int, verdict: Any) -> Dict[str, Any]:
+        """Verdict plus its normalized per-agent scores and leader, computed once."""
+        previous = self.history[-1].get("scores") if self.history else None
+        scores = summaries.verdict_scores(
+            verdict, [a.name for a in self.agents],
+            getattr(self.config, "debate_type", "non-binary"), previous)
+        # A majority-vote panel names its leader explicitly
+        panel = verdict.get("panel") if isinstance(verdict, dict) else None
+        return {
+            "round": round_num,
+            "verdict": verdict,
+            "scores": scores,
+            "leader": (panel or {}).get("leader") or summaries.leading_agent(scores),
         }
-        return json.dumps(state)
-
-# Replace the existing prompt templates with these enhanced versions
-
-# Define the debate prompt templates
-POSITION_PROMPT = """
-🔥  [POSITION ROUND — Tactical Thesis]
-You are a battle‑hardened domain expert whose reputation is on the line.
-Goal: craft the **boldest, most defensible thesis** on:
-    "{user_topic}"
-
-▪ Present a clear POSITION in ≤ 250 words — lead with the single sentence you would carve in stone.
-▪ Arm your case with 2‑4 bullet‑pointed *primary* facts or data, each tagged with an MLA citation.
-▪ Pre‑emptively flag ONE likely counter‑strike against your view and state, in one line, how you will neutralize it.
-▪ No hedging adjectives ("maybe", "perhaps") — be definitive or concede explicitly.
-▪ End with a 1‑to‑10 "Fragility Index" (how vulnerable your argument still is to refutation).
-
-———  Speak like you're standing at the podium of a championship debate ———
-""".strip()
-
-CRITIQUE_PROMPT = """
-💥  [CRITIQUE ROUND — Target & Destroy]
-Below are your opponents' latest positions.  Your task: **exploit every weakness**.
-{joined}
-
-For EACH opponent, deliver:
-1. **Bullseye Summary** – Rephrase their core claim in ≤ 20 words.
-2. **Critical Hit List** – Up to 3 numbered attacks that expose logical fallacies, stale data, or citation errors.
-   • Quote or paraphrase the exact line you're striking.
-   • Justify the strike with counter‑evidence (MLA‑cite) or logic.
-3. **Damage Assessment** – Rate how badly the hit weakens their case on a 0‑10 scale.
-
-Write in compact battle‑dispatch style: no pleasantries, no filler.  Prioritize precision and lethal accuracy.
-""".strip()
-
-DEFENSE_PROMPT = """
-🛡️  [DEFENSE ROUND — Counter‑Punch]
-The following critiques were leveled at you:
-{critiques}
-
-For EACH critique aimed at your own position:
-▪ **Concede or Counter** – Either concede in ≤ 10 words *or* launch a rebuttal in ≤ 100 words.
-▪ If countering, supply *one* fresh piece of evidence or reasoning (MLA‑cite) not used before.
-▪ Update your Fragility Index (± only if justified) and explain the change in one sentence.
-
-Close with a 2‑sentence *victory path*: what remaining proof would definitively settle the issue in your favor?
-Keep the tone sharp, confident, and ruthlessly factual — no rhetorical fluff.
-""".strip()
-
-# Modify the position prompt to differentiate based on debate type
-
-async def next_round(self, user_topic):
-    """Run the next round of the debate"""
-    # Get debate type and opposition mode settings
-    debate_type = self.config.debate_type
-    opposition_mode = self.config.opposition_mode
-    
-    # Modify position prompt based on opposition mode
-    if self.phase == "position":
-        for i, agent in enumerate(self.agents):
-            # Get agent's assigned stance
-            stance = "neutral"
-            if opposition_mode:
-                # Look up the agent's stance from config
-                agent_cfg = next((cfg for cfg in self.config.agents_cfg if cfg["name"] == agent.name), None)
-                if agent_cfg and "stance" in agent_cfg:
-                    stance = agent_cfg["stance"]
-            
-            # Create stance-specific position prompt
-            if opposition_mode and stance in ["affirmative", "negative"]:
-                if stance == "affirmative":
-                    position_prompt = f"""
-🔥 [POSITION ROUND — Affirmative Position]
-You are an expert debater assigned to argue the AFFIRMATIVE position on:
-    "{user_topic}"
-
-Present the strongest possible case FOR this position, even if you might personally disagree.
-
-▪ Present a clear AFFIRMATIVE position in ≤ 250 words
-▪ Support your position with 3-5 verified facts, each with an MLA citation
-▪ Anticipate and preemptively address key counterarguments
-▪ Use precise, measured language focused on your strongest points
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to be persuasive while maintaining intellectual honesty.
-"""
-                else:  # negative stance
-                    position_prompt = f"""
-🔥 [POSITION ROUND — Negative Position]
-You are an expert debater assigned to argue the NEGATIVE position on:
-    "{user_topic}"
-
-Present the strongest possible case AGAINST this position, even if you might personally agree.
-
-▪ Present a clear NEGATIVE position in ≤ 250 words
-▪ Support your critique with 3-5 verified facts, each with an MLA citation
-▪ Identify and emphasize key flaws in the affirmative position
-▪ Use precise, measured language focused on the weakest points of the opposing view
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to be persuasive while maintaining intellectual honesty.
-"""
-            else:
-                # Use the standard position prompt
-                position_prompt = POSITION_PROMPT.format(user_topic=user_topic)
-            
-            # Rest of the position phase handling remains the same
 
-# Replace the existing next_round method with this implementation that uses the enhanced prompts
-
-async def next_round(self, topic: str):
-    """Run the next round of the debate"""
-    if self.stopped: 
-        return
-    
-    # Get debate type and opposition mode settings
-    debate_type = getattr(self.config, 'debate_type', 'non-binary')
-    opposition_mode = getattr(self.config, 'opposition_mode', False)
-    
-    # Run the appropriate phase
-    if self.phase == "position":
-        # Prepare position prompts for each agent based on stance
-        prompts = []
+    def ensure_summaries(self):
+        """Backfill digests for sessions saved before they were stored."""
         for agent in self.agents:
-            # Determine agent's stance for opposition mode
-            stance = "neutral"
-            if opposition_mode:
-                # Get stance from our lookup dictionary
-                stance = self.agent_stances.get(agent.name, "neutral")
-                
-            print(f"Agent {agent.name} has stance: {stance}")  # Debug print
-            
-            # Select appropriate prompt based on stance
-            if opposition_mode and stance in ["affirmative", "negative"]:
-                if stance == "affirmative":
-                    prompt = f"""
-🔥 [POSITION ROUND — Affirmative Position]
-You are an expert debater assigned to argue the AFFIRMATIVE position on:
-    "{topic}"
-
-Present the strongest possible case FOR this position, even if you might personally disagree.
-
-▪ Present a clear AFFIRMATIVE position in ≤ 250 words
-▪ Support your position with 3-5 verified facts, each with an MLA citation
-▪ Anticipate and preemptively address key counterarguments
-▪ Use precise, measured language focused on your strongest points
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to be persuasive while maintaining intellectual honesty.
-"""
-                else:  # negative stance
-                    prompt = f"""
-🔥 [POSITION ROUND — Negative Position]
-You are an expert debater assigned to argue the NEGATIVE position on:
-    "{topic}"
-
-Present the strongest possible case AGAINST this position, even if you might personally agree.
-
-▪ Present a clear NEGATIVE position in ≤ 250 words
-▪ Support your critique with 3-5 verified facts, each with an MLA citation
-▪ Identify and emphasize key flaws in the affirmative position
-▪ Use precise, measured language focused on the weakest points of the opposing view
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
-
-Your goal is to be persuasive while maintaining intellectual honesty.
-"""
-            else:
-                # Use the standard position prompt for non-opposition or neutral agents
-                prompt = f"""
-🔥 [POSITION ROUND — Analysis]
-You are a scholarly expert analyzing the topic:
-    "{topic}"
-
-Present a well-reasoned position based on evidence and critical thinking.
+            for turn in agent.transcript:
+                if "summary" not in turn:
+                    turn["summary"] = summaries.summarize_turn(turn["content"])
+        history, self.history = self.history, []
+        for item in history:
+            self.history.append(item if "scores" in item else self._history_item(item["round"], item["verdict"]))
+
+    async def _warm_providers(self, judge: bool = False):
+        """Let providers (local models) load before the phase instead of on first call."""
+        provs = {}
+        for agent in self.agents:
+            for p in [agent.provider, *agent.routes.values()]:
+                provs[id(p)] = p
+        if judge:
+            for j in self.judges:
+                provs[id(j.provider)] = j.provider
+        results = await asyncio.gather(*(p.warm() for p in provs.values()), return_exceptions=True)
+        for r in results:
+            if isinstance(r, Exception):
+                print(f"Provider warm-up failed: {r}")
 
-▪ Present a clear position in ≤ 250 words
-▪ Support your position with 3-5 verified facts, each with an MLA citation
-▪ Consider multiple perspectives and potential counterarguments
-▪ Use precise, measured language focused on the strongest evidence
-▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
+    # ------------------ Public API ------------------
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def stop(self):
+        """Stop the debate now.  Safe to call from any thread: the round in
+        flight is cancelled on its loop, which aborts pending provider calls
+        (closing their streams) and keeps any partial output as turns."""
+        self.stopped = True
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            same_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._cancel_tasks()
+        else:
+            loop.call_soon_threadsafe(self._cancel_tasks)
 
-Your goal is to provide an informed, balanced analysis.
-"""
-            
-            prompts.append((agent, prompt))
-        
-        # Execute position round with customized prompts
-        for agent, prompt in prompts:
-            await agent.speak(prompt, round_type="position")
-            
-    elif self.phase == "critique":
-        # Get all agents' latest positions
-        joined = "\n\n".join(f"AGENT {i+1} ({a.name}):\n{a.transcript[-1]['content']}" 
-                           for i, a in enumerate(self.agents))
-        
-        # Use enhanced critique prompt for all agents
-        critique_prompt = CRITIQUE_PROMPT.format(joined=joined)
-        
-        for agent in self.agents:
-            await agent.speak(critique_prompt, round_type="critique")
-            
-    elif self.phase == "defense":
-        # Prepare defense prompts with critiques directed at each agent
-        for i, agent in enumerate(self.agents):
-            # Extract critiques directed at this agent
-            critiques = []
-            for j, critic in enumerate(self.agents):
-                if i != j:  # Skip self-critique
-                    critiques.append(f"FROM {critic.name}:\n{critic.transcript[-1]['content']}")
-            
-            # Use enhanced defense prompt
-            defense_prompt = DEFENSE_PROMPT.format(critiques="\n\n".join(critiques))
-            await agent.speak(defense_prompt, round_type="defense")
-    
-    # After phase ends: if defense just finished, call judge
-    if self.phase == "defense":
-        verdict = await self._judge_consensus()
-        self.history.append({
-            "round": self.round_num,
-            "verdict": verdict,
-        })
-        if verdict.get("agreement") and verdict.get("mean_agreement", 0) >= 0.75:
-            self.stopped = True
-    
-    # Advance phase / round pointer
-    if self.phase == "position":
-        self.phase = "critique"
-    elif self.phase == "critique":
-        self.phase = "defense"
-    elif self.phase == "defense":
-        self.phase = "position"
-        self.round_num += 1
+    def _cancel_tasks(self):
+        for task in list(self._tasks):
+            task.cancel()
 
-    def serialize(self) -> Dict[str,Any]:
+    async def next_round(self, topic: str, phases: int = 1):
+        """Run the next ``phases`` phases of the debate (one by default; several
+        let the scheduler pipeline them); ``stop()`` cancels them mid-phase."""
+        if self.stopped:
+            return
+        self._loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(self._next_round(topic, phases))
+        self._tasks.add(task)
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Re-raise when the caller itself was cancelled rather than stop() (3.11+ can tell)
+            if not self.stopped or getattr(asyncio.current_task(), "cancelling", lambda: 0)():
+                raise
+            self._emit("phase", {"round_num": self.round_num, "phase": self.phase, "stopped": True})
+        finally:
+            self._tasks.discard(task)
+
+    async def _next_round(self, topic: str, phases: int = 1):
+        self.topic = topic
+        while phases > 0 and not self.stopped:
+            stretch = self.graph.stretch(self.phase, phases)
+            phases -= len(stretch)
+            await self._run_stretch(topic, stretch)
+
+    async def _run_stretch(self, topic: str, stretch: List[Phase]):
+        await self._warm_providers(judge=stretch[-1].verdict)
+        runs = self._schedule(topic, stretch)
+        try:
+            for phase, run in zip(stretch, runs):
+                await run
+                if phase.verdict:
+                    verdict = await self._judge_consensus()
+                    self.history.append(self._history_item(self.round_num, verdict))
+                    self._emit("verdict", self.history[-1])
+                    if verdict.get("agreement") and verdict.get("mean_agreement", 0) >= 0.75:
+                        self.stopped = True
+                # Advance phase / round pointer
+                self.phase, new_round = self.graph.following(phase.name)
+                if new_round:
+                    self.round_num += 1
+                    self.spill_old_rounds()
+                    max_rounds = getattr(self.config, "max_rounds", None)
+                    if max_rounds is not None and self.round_num >= max_rounds:
+                        self.stopped = True
+                self._emit("phase", {"round_num": self.round_num, "phase": self.phase, "stopped": self.stopped})
+                if self.stopped:
+                    break  # the rest of the stretch is cancelled below
+        finally:
+            for run in runs:
+                run.cancel()
+
+    def serialize(self, lazy: bool = False) -> Dict[str,Any]:
+        """Session dict.  ``lazy`` leaves spilled transcripts / history as
+        sequences that page turns in on iteration (for streamed saves)."""
+        seq = (lambda items: items) if lazy else list
         return {
+            "topic": self.topic,
             "config": self.config.__dict__,
-            "history": self.history,
+            "history": seq(self.history),
             "agents": [
-                {"name": a.name, "provider": type(a.provider).__name__, "transcript": a.transcript}
+                {"name": a.name, "provider": type(a.provider).__name__, "transcript": seq(a.transcript)}
                 for a in self.agents
-            ]
+            ],
+            "citations": {"agents": self.citations.stats(), "top": self.citations.top(20)},
         }
 
     def get_debate_state(self):
@@ -574,10 +455,11 @@ Your goal is to provide an informed, balanced analysis.
             "agents": [
                 {
                     "name": agent.name,
-                    "transcript": agent.transcript,
+                    "transcript": list(agent.transcript),
                     "stance": self.agent_stances.get(agent.name, "neutral")
                 }
                 for agent in self.agents
             ]
         }
-        return json.dumps(state)
\ No newline at end of file
+        with profiling.span("state.serialize"):
+            return json.dumps(state)
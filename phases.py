@@ -0,0 +1,305 @@
+"""Declarative phase graph for debate rounds.
+
+A round is a list of ``Phase``s, each declaring:
+
+* ``prompt(orch, agent, topic, sources)`` — the agent's prompt, built from the
+  earlier-phase output of ``sources``
+* ``sees(orch, agent)`` — whose output from the previous phase the agent is
+  shown (``None``: nothing, the phase opens the round).  An agent that sees
+  no one is pruned from the phase
+* ``barrier`` — wait for every agent of the previous phase, or let each agent
+  start as soon as its own previous turn and its sources are done
+* ``verdict`` — the judge scores the round once the phase completes
+
+The orchestrator schedules from the graph alone: a phase's agents run
+concurrently, and when several phases are run in one call
+(``next_round(topic, phases=N)``) non-barrier phases are pipelined per agent.
+
+Who critiques whom is a topology: ``"all"`` (every other agent; prompts and
+tokens grow as N²) or a sparse one giving each agent ``critique_k`` targets
+while every position is still critiqued at least once — ``"round_robin"``
+(the next k seats; ``"ring"`` is k = 1), ``"divergent"`` (the peers whose
+positions are least similar) or ``"random"``.  A defense is shown only the
+sections of its critics' critiques that are aimed at it.
+"""
+from __future__ import annotations
+import asyncio, random, re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class Phase:
+    __slots__ = ("name", "prompt", "sees", "barrier", "verdict", "setup")
+
+    def __init__(self, name: str, prompt: Callable, sees: Optional[Callable] = None,
+                 barrier: bool = True, verdict: bool = False,
+                 setup: Optional[Callable[[Any], Awaitable[None]]] = None):
+        self.name = name
+        self.prompt = prompt
+        self.sees = sees
+        self.barrier = barrier
+        self.verdict = verdict
+        self.setup = setup  # awaited once the barrier is passed, before ``sees``
+
+    def __repr__(self):
+        return f"Phase({self.name!r})"
+
+class PhaseGraph:
+    """Phases of one round, in order; the last one wraps to the next round."""
+    def __init__(self, phases: List[Phase]):
+        self.phases = list(phases)
+        self.index = {p.name: i for i, p in enumerate(self.phases)}
+
+    def __getitem__(self, name: str) -> Phase:
+        return self.phases[self.index[name]]
+
+    @property
+    def first(self) -> str:
+        return self.phases[0].name
+
+    def following(self, name: str) -> Tuple[str, bool]:
+        """``(next phase, whether it starts a new round)``."""
+        i = self.index[name] + 1
+        return (self.phases[i].name, False) if i < len(self.phases) else (self.first, True)
+
+    def stretch(self, name: str, count: int) -> List[Phase]:
+        """Up to ``count`` phases from ``name``, ending at the round's verdict."""
+        out = []
+        for phase in self.phases[self.index[name]:]:
+            if len(out) >= count:
+                break
+            out.append(phase)
+            if phase.verdict:
+                break
+        return out
+
+# ---------------- Critique topologies ----------------
+# (orch, names in seat order, k) → {critic: [targets]}; sparse ones cover every name
+def all_others(orch, names: List[str], k: int) -> Dict[str, List[str]]:
+    return {n: [m for m in names if m != n] for n in names}
+
+def round_robin(orch, names: List[str], k: int) -> Dict[str, List[str]]:
+    n = len(names)
+    return {c: [names[(i + j) % n] for j in range(1, k + 1)] for i, c in enumerate(names)}
+
+def ring(orch, names: List[str], k: int) -> Dict[str, List[str]]:
+    return round_robin(orch, names, 1)
+
+def random_k(orch, names: List[str], k: int) -> Dict[str, List[str]]:
+    """A random cycle (covers everyone once), topped up with random peers.
+    Seeded by round and panel, so a reloaded debate draws the same pairs."""
+    rng = random.Random(f"{orch.round_num}|{'|'.join(names)}")
+    order = rng.sample(names, len(names))
+    out = {c: [order[(i + 1) % len(order)]] for i, c in enumerate(order)}
+    for c in names:
+        rest = [m for m in names if m != c and m not in out[c]]
+        out[c] += rng.sample(rest, k - 1)
+    return out
+
+def divergent(orch, names: List[str], k: int) -> Dict[str, List[str]]:
+    """Each agent critiques the peers whose positions are least like its own.
+    Every position is first given its most distant critic with room left
+    (one over ``k`` when none has), then critics fill up by distance."""
+    import agents
+    by_name = {a.name: a for a in orch.agents}
+    try:
+        emb = agents.embed([orch.output(by_name[n], "position") for n in names])
+    except Exception as e:
+        print(f"Divergent pairing failed, using round robin: {e}")
+        return round_robin(orch, names, k)
+    sim = emb @ emb.T
+    idx = {n: i for i, n in enumerate(names)}
+    out: Dict[str, List[str]] = {n: [] for n in names}
+    for target in sorted(names, key=lambda t: -max(sim[idx[t], idx[c]] for c in names if c != t)):
+        critics = sorted((c for c in names if c != target), key=lambda c: sim[idx[c], idx[target]])
+        critic = next((c for c in critics if len(out[c]) < k), critics[0])
+        out[critic].append(target)
+    for c in names:
+        for t in sorted((t for t in names if t != c and t not in out[c]), key=lambda t: sim[idx[c], idx[t]]):
+            if len(out[c]) >= k:
+                break
+            out[c].append(t)
+    return {c: sorted(ts, key=names.index) for c, ts in out.items()}
+
+TOPOLOGIES: Dict[str, Callable[[Any, List[str], int], Dict[str, List[str]]]] = {
+    "all": all_others,
+    "ring": ring,
+    "round_robin": round_robin,
+    "divergent": divergent,
+    "random": random_k,
+}
+
+def assignment(orch) -> Dict[str, List[str]]:
+    """This round's critic → targets map (computed once per round)."""
+    cached = getattr(orch, "_assignment", None)
+    if cached and cached[0] == orch.round_num:
+        return cached[1]
+    name = getattr(orch.config, "critique_topology", "all") or "all"
+    if name not in TOPOLOGIES:
+        print(f"Unknown critique topology {name!r}, using 'all'")
+        name = "all"
+    names = [a.name for a in orch.agents]
+    k = max(1, min(int(getattr(orch.config, "critique_k", 2) or 1), len(names) - 1))
+    targets = TOPOLOGIES[name](orch, names, k) if len(names) > 1 else {}
+    orch._assignment = (orch.round_num, targets)
+    return targets
+
+async def plan_critiques(orch):
+    # Divergent pairing embeds the positions: keep that off the event loop
+    await asyncio.to_thread(assignment, orch)
+
+def is_dense(orch) -> bool:
+    return (getattr(orch.config, "critique_topology", "all") or "all") == "all"
+
+# ---------------- Who sees whom ----------------
+def critique_sources(orch, agent) -> List[Any]:
+    if is_dense(orch):
+        return list(orch.agents)  # own position included: the prompt is shared by everyone
+    targets = set(assignment(orch).get(agent.name, ()))
+    return [a for a in orch.agents if a.name in targets]
+
+def defense_sources(orch, agent) -> List[Any]:
+    # Critique turns record their targets, so a reloaded debate keeps its pairs
+    def targets(critic):
+        turn = latest_turn(critic, "critique")
+        if turn and turn.get("round_num") == orch.round_num and "sources" in turn:
+            return turn["sources"]
+        return assignment(orch).get(critic.name, ())
+    return [a for a in orch.agents if a is not agent and agent.name in targets(a)]
+
+def latest_turn(agent, phase: str) -> Optional[Dict[str, Any]]:
+    for turn in reversed(agent.transcript):
+        if turn.get("round") == phase:
+            return turn
+    return None
+
+# "### AGENT 3 (Name)", "**Agent 3 – Name**", "AGENT 3:" at the start of a line
+_SECTION = re.compile(r"^[ \t>#*_]*AGENT\s+(\d+)\b.*$", re.I | re.M)
+
+def aimed_at(critique: str, seat: int, name: str) -> str:
+    """The sections of ``critique`` addressed to agent ``seat`` / ``name``;
+    the whole critique when it isn't split into per-agent sections."""
+    heads = list(_SECTION.finditer(critique))
+    if len({h.group(1) for h in heads}) < 2:
+        return critique
+    parts = [critique[h.start():heads[i + 1].start() if i + 1 < len(heads) else len(critique)].strip()
+             for i, h in enumerate(heads)
+             if int(h.group(1)) == seat or name.lower() in h.group(0).lower()]
+    return "\n\n".join(parts) or critique
+
+# ---------------- Prompt builders ----------------
+def position_prompt(orch, agent, topic: str, sources=None) -> str:
+    stance = orch.agent_stances.get(agent.name, "neutral") if getattr(orch.config, "opposition_mode", False) else "neutral"
+    return STANCE_PROMPTS.get(stance, ANALYSIS_PROMPT).format(topic=topic)
+
+def critique_prompt(orch, agent, topic: str, sources) -> str:
+    seat = {a.name: i + 1 for i, a in enumerate(orch.agents)}
+    joined = "\n\n".join(f"AGENT {seat[a.name]} ({a.name}):\n{orch.output(a, 'position')}" for a in sources)
+    # Identical instructions + positions first, the per-agent part last,
+    # so every critique after the first reuses the cached prefix
+    tail = CRITIQUE_SELF if agent in sources else CRITIQUE_ASSIGNED
+    return CRITIQUE_PROMPT.format(joined=joined) + "\n\n" + tail.format(index=seat[agent.name], name=agent.name)
+
+def defense_prompt(orch, agent, topic: str, sources) -> str:
+    seat = [a.name for a in orch.agents].index(agent.name) + 1
+    critiques = "\n\n".join(f"FROM {critic.name}:\n{aimed_at(orch.output(critic, 'critique'), seat, agent.name)}"
+                              for critic in sources)
+    return DEFENSE_PROMPT.format(critiques=critiques)
+
+def debate_graph() -> PhaseGraph:
+    """Position → Critique → Defense, judged after the defense."""
+    return PhaseGraph([
+        Phase("position", position_prompt),
+        Phase("critique", critique_prompt, critique_sources, setup=plan_critiques),
+        # A defense only needs the critiques aimed at it
+        Phase("defense", defense_prompt, defense_sources, barrier=False, verdict=True),
+    ])
+
+# ---------------- Prompt templates ----------------
+AFFIRMATIVE_PROMPT = """
+🔥 [POSITION ROUND — Affirmative Position]
+You are an expert debater assigned to argue the AFFIRMATIVE position on:
+    "{topic}"
+
+Present the strongest possible case FOR this position, even if you might personally disagree.
+
+▪ Present a clear AFFIRMATIVE position in ≤ 250 words
+▪ Support your position with 3-5 verified facts, each with an MLA citation
+▪ Anticipate and preemptively address key counterarguments
+▪ Use precise, measured language focused on your strongest points
+▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
+
+Your goal is to be persuasive while maintaining intellectual honesty.
+"""
+
+NEGATIVE_PROMPT = """
+🔥 [POSITION ROUND — Negative Position]
+You are an expert debater assigned to argue the NEGATIVE position on:
+    "{topic}"
+
+Present the strongest possible case AGAINST this position, even if you might personally agree.
+
+▪ Present a clear NEGATIVE position in ≤ 250 words
+▪ Support your critique with 3-5 verified facts, each with an MLA citation
+▪ Identify and emphasize key flaws in the affirmative position
+▪ Use precise, measured language focused on the weakest points of the opposing view
+▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
+
+Your goal is to be persuasive while maintaining intellectual honesty.
+"""
+
+ANALYSIS_PROMPT = """
+🔥 [POSITION ROUND — Analysis]
+You are a scholarly expert analyzing the topic:
+    "{topic}"
+
+Present a well-reasoned position based on evidence and critical thinking.
+
+▪ Present a clear position in ≤ 250 words
+▪ Support your position with 3-5 verified facts, each with an MLA citation
+▪ Consider multiple perspectives and potential counterarguments
+▪ Use precise, measured language focused on the strongest evidence
+▪ End with a 1-to-10 "Confidence Index" based on your supporting evidence
+
+Your goal is to provide an informed, balanced analysis.
+"""
+
+STANCE_PROMPTS = {"affirmative": AFFIRMATIVE_PROMPT, "negative": NEGATIVE_PROMPT}
+
+CRITIQUE_PROMPT = """
+💥  [CRITIQUE ROUND — Target & Destroy]
+Below are the latest positions of every debater.  Your task: **exploit every weakness** in your opponents' positions.
+
+For EACH opponent, under a "### AGENT <number> (<name>)" heading, deliver:
+1. **Bullseye Summary** – Rephrase their core claim in ≤ 20 words.
+2. **Critical Hit List** – Up to 3 numbered attacks that expose logical fallacies, stale data, or citation errors.
+   • Quote or paraphrase the exact line you're striking.
+   • Justify the strike with counter‑evidence (MLA‑cite) or logic.
+3. **Damage Assessment** – Rate how badly the hit weakens their case on a 0‑10 scale.
+
+Write in compact battle‑dispatch style: no pleasantries, no filler.  Prioritize precision and lethal accuracy.
+
+{joined}
+""".strip()
+
+# Per-agent tail, kept after the shared positions so the prefix stays identical
+CRITIQUE_SELF = """
+You are AGENT {index} ({name}).  Do not critique your own position — cover every other agent above.
+""".strip()
+
+# Sparse topologies: the agent is shown only the positions assigned to it
+CRITIQUE_ASSIGNED = """
+You are AGENT {index} ({name}).  The positions above are the ones assigned to you this round — cover each of them; other debaters are critiqued by your peers.
+""".strip()
+
+DEFENSE_PROMPT = """
+🛡️  [DEFENSE ROUND — Counter‑Punch]
+The following critiques were leveled at you:
+{critiques}
+
+For EACH critique aimed at your own position:
+▪ **Concede or Counter** – Either concede in ≤ 10 words *or* launch a rebuttal in ≤ 100 words.
+▪ If countering, supply *one* fresh piece of evidence or reasoning (MLA‑cite) not used before.
+▪ Update your Fragility Index (± only if justified) and explain the change in one sentence.
+
+Close with a 2‑sentence *victory path*: what remaining proof would definitively settle the issue in your favor?
+Keep the tone sharp, confident, and ruthlessly factual — no rhetorical fluff.
+""".strip()
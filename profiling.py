@@ -0,0 +1,304 @@
+"""Opt-in profiling: span tracing of the hot path and a sampling profiler.
+
+``span(name, **attrs)`` times a stage (prompt building, state serialization,
+verdict parsing, embedding, provider calls, rendering).  Spans are exported
+as Chrome trace JSON (chrome://tracing, Perfetto) or as OTLP/JSON that
+OpenTelemetry tools import.  While off, ``span`` returns a shared no-op
+context, so the hooks can stay in place.
+
+The sampler is a thread that snapshots every thread's stack at a fixed
+interval and writes collapsed stacks (``.folded``; flamegraph.pl,
+speedscope).  It covers code that has no spans.
+
+    PROFILE_SPANS=1               record spans from startup
+    PROFILE_SAMPLE=1              start the sampler from startup
+    PROFILE_SAMPLE_INTERVAL=0.005 seconds between samples
+    PROFILE_OUT=trace.json        written at exit (…otlp.json for OTLP); samples go to <out>.folded
+
+``server.py`` / ``tournament.py`` take ``--profile`` / ``--sample``, and the
+app has sidebar toggles.  ``python profiling.py trace.json`` prints the
+slowest stages of an exported trace.
+"""
+from __future__ import annotations
+import asyncio, atexit, contextlib, functools, inspect, itertools, json, os, sys, threading, time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+MAX_EVENTS = 200_000  # oldest spans are dropped past this
+_lock = threading.Lock()
+_events: List[Dict[str, Any]] = []
+_lanes: Dict[int, int] = {}        # live task / thread id → trace lane
+_lane_names: Dict[int, str] = {}
+_lane_ids = itertools.count(1)
+_stacks: Dict[int, List[int]] = {}  # lane → open span ids (OTLP parents)
+_ids = itertools.count(1)
+_spans_on = False
+_sampler: Optional["Sampler"] = None
+_samples: Counter = Counter()  # collapsed stack → samples, kept after the sampler stops
+# perf_counter for durations, anchored to wall-clock time for OTLP timestamps
+_T0_PERF, _T0_WALL = time.perf_counter_ns(), time.time_ns()
+_NOOP = contextlib.nullcontext()
+
+def spans_enabled() -> bool:
+    return _spans_on
+
+def sampling() -> bool:
+    return _sampler is not None
+
+def enable(spans: bool = True, sample: bool = False, interval: Optional[float] = None):
+    global _spans_on, _sampler
+    _spans_on = _spans_on or spans
+    if sample and _sampler is None:
+        _sampler = Sampler(interval or float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005")), _samples)
+        _sampler.start()
+
+def disable(spans: bool = True, sample: bool = True):
+    global _spans_on, _sampler
+    if spans:
+        _spans_on = False
+    if sample and _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+
+def reset():
+    with _lock:
+        _events.clear()
+        _stacks.clear()
+        live = set(_lanes.values())
+        for lane in [n for n in _lane_names if n not in live]:
+            del _lane_names[lane]
+    _samples.clear()
+
+def _lane() -> int:
+    # One lane per asyncio task (tasks interleave on a thread), else per thread
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    key = id(task) if task is not None else threading.get_ident()
+    lane = _lanes.get(key)
+    if lane is None:
+        with _lock:
+            lane = _lanes[key] = next(_lane_ids)
+            _lane_names[lane] = task.get_name() if task is not None else threading.current_thread().name
+        if task is not None:
+            # A finished task's id() can be reused by a new task: retire its lane
+            task.add_done_callback(lambda _, key=key: _retire_lane(key))
+    return lane
+
+def _retire_lane(key: int):
+    with _lock:
+        lane = _lanes.pop(key, None)
+        _stacks.pop(lane, None)
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "lane", "id", "parent")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.lane = _lane()
+        stack = _stacks.setdefault(self.lane, [])
+        self.parent = stack[-1] if stack else 0
+        self.id = next(_ids)
+        stack.append(self.id)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        stack = _stacks.get(self.lane)
+        if stack and stack[-1] == self.id:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        event = {"name": self.name, "start": self.start, "end": end, "lane": self.lane,
+                 "id": self.id, "parent": self.parent, "attrs": self.attrs}
+        with _lock:
+            _events.append(event)
+            if len(_events) > MAX_EVENTS:
+                del _events[:len(_events) - MAX_EVENTS]
+        return False
+
+def span(name: str, **attrs):
+    """Context manager timing ``name``; a no-op unless spans are enabled."""
+    if not _spans_on:
+        return _NOOP
+    return _Span(name, attrs)
+
+def traced(name: Optional[str] = None):
+    """Decorator: run each call of a (sync or async) function inside a span."""
+    def wrap(fn):
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                with span(label):
+                    return await fn(*args, **kwargs)
+            return run_async
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return run
+    return wrap
+
+def _attr(v: Any):
+    return v if isinstance(v, (str, int, float, bool)) or v is None else str(v)
+
+# ---------------- Export ----------------
+def chrome_trace() -> Dict[str, Any]:
+    with _lock:
+        events, names = list(_events), dict(_lane_names)
+    pid = os.getpid()
+    out = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": lane, "args": {"name": n}}
+           for lane, n in names.items()]
+    out += [{"name": e["name"], "ph": "X", "pid": pid, "tid": e["lane"],
+             "ts": (e["start"] - _T0_PERF) / 1000, "dur": (e["end"] - e["start"]) / 1000,
+             "args": {k: _attr(v) for k, v in e["attrs"].items()}} for e in events]
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+def otlp_trace(service: str = "debate-team") -> Dict[str, Any]:
+    with _lock:
+        events = list(_events)
+    trace_id = f"{_T0_WALL:032x}"[-32:]
+    def value(v):
+        v = _attr(v)
+        if isinstance(v, bool):
+            return {"boolValue": v}
+        if isinstance(v, int):
+            return {"intValue": str(v)}
+        if isinstance(v, float):
+            return {"doubleValue": v}
+        return {"stringValue": "" if v is None else v}
+    spans = []
+    for e in events:
+        s = {"traceId": trace_id, "spanId": f"{e['id']:016x}", "name": e["name"], "kind": 1,
+             "startTimeUnixNano": str(_T0_WALL + e["start"] - _T0_PERF),
+             "endTimeUnixNano": str(_T0_WALL + e["end"] - _T0_PERF),
+             "attributes": [{"key": k, "value": value(v)} for k, v in e["attrs"].items()],
+             "status": {"code": 2 if "error" in e["attrs"] else 1}}
+        if e["parent"]:
+            s["parentSpanId"] = f"{e['parent']:016x}"
+        spans.append(s)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+        "scopeSpans": [{"scope": {"name": "profiling"}, "spans": spans}],
+    }]}
+
+def export(path: Optional[str] = None, fmt: Optional[str] = None) -> List[str]:
+    """Write the spans (and samples, when the sampler has run) to ``path``;
+    ``fmt`` is "chrome" or "otlp" (default: by file name).  Returns the files written."""
+    path = path or os.getenv("PROFILE_OUT", "trace.json")
+    fmt = fmt or ("otlp" if path.endswith(".otlp.json") else "chrome")
+    written = []
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(otlp_trace() if fmt == "otlp" else chrome_trace(), f)
+    written.append(path)
+    if _samples:
+        written.append(export_samples(os.path.splitext(path)[0] + ".folded"))
+    return written
+
+def summary(events: Optional[List[Dict[str, Any]]] = None, top: int = 20) -> List[Dict[str, Any]]:
+    """Per span name: count and total / mean / max milliseconds, slowest first."""
+    if events is None:
+        with _lock:
+            events = [{"name": e["name"], "dur": (e["end"] - e["start"]) / 1000} for e in _events]
+    stats: Dict[str, Dict[str, float]] = {}
+    for e in events:
+        s = stats.setdefault(e["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        ms = e["dur"] / 1000
+        s["count"] += 1
+        s["total_ms"] += ms
+        s["max_ms"] = max(s["max_ms"], ms)
+    rows = [{"name": n, **s, "mean_ms": s["total_ms"] / s["count"]} for n, s in stats.items()]
+    return sorted(rows, key=lambda r: -r["total_ms"])[:top]
+
+# ---------------- Sampling profiler ----------------
+class Sampler:
+    """Samples every other thread's Python stack each ``interval`` seconds."""
+    def __init__(self, interval: float = 0.005, counts: Optional[Counter] = None, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.counts = Counter() if counts is None else counts
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+
+def top_samples(n: int = 20) -> List[Dict[str, Any]]:
+    """Functions by samples spent in them (self) and under them (total)."""
+    own, total = Counter(), Counter()
+    for stack, count in list(_samples.items()):
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for f in set(frames):
+            total[f] += count
+    return [{"function": f, "self": c, "total": total[f]} for f, c in own.most_common(n)]
+
+def export_samples(path: str) -> str:
+    """Collapsed stacks, one ``frame;frame;... count`` line each."""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in Counter(_samples).most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+def add_arguments(ap):
+    """``--profile`` / ``--sample`` / ``--profile-out`` for a CLI's argparse parser."""
+    ap.add_argument("--profile", action="store_true", help="record timing spans (Chrome trace / OTLP JSON)")
+    ap.add_argument("--sample", action="store_true", help="run the sampling profiler")
+    ap.add_argument("--profile-out", default=None, help="trace file written at exit (…otlp.json for OTLP)")
+
+def configure(args):
+    """Apply the CLI flags; output is written when the process exits."""
+    if args.profile_out:
+        os.environ["PROFILE_OUT"] = args.profile_out
+    if args.profile or args.sample:
+        enable(spans=args.profile, sample=args.sample)
+        _export_at_exit()
+
+_exit_hook = False
+
+def _export_at_exit():
+    global _exit_hook
+    if not _exit_hook:
+        _exit_hook = True
+        atexit.register(lambda: print("Profile written to " + ", ".join(export())))
+
+if os.getenv("PROFILE_SPANS") == "1" or os.getenv("PROFILE_SAMPLE") == "1":
+    enable(spans=os.getenv("PROFILE_SPANS") == "1", sample=os.getenv("PROFILE_SAMPLE") == "1")
+    _export_at_exit()
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="Slowest stages of an exported Chrome trace")
+    ap.add_argument("path")
+    ap.add_argument("--top", type=int, default=20)
+    args = ap.parse_args()
+    with open(args.path, encoding="utf-8") as f:
+        events = [e for e in json.load(f).get("traceEvents", []) if e.get("ph") == "X"]
+    print(f"{'Stage':<32} {'Count':>7} {'Total ms':>10} {'Mean ms':>9} {'Max ms':>9}")
+    for r in summary(events, args.top):
+        print(f"{r['name']:<32} {r['count']:>7} {r['total_ms']:>10.1f} {r['mean_ms']:>9.2f} {r['max_ms']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,69 @@
 """Provider registry + base classes."""
 from __future__ import annotations
-import abc, os, asyncio, json
-from typing import Any, Dict
-import httpx
+import abc, os, asyncio, json, weakref, hashlib, threading, time, contextlib, importlib, contextvars
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+import profiling
+
+if TYPE_CHECKING:
+    import httpx
+
+# Text streamed so far by the current call.  ``Agent.speak`` sets a fresh
+# list per turn (each asyncio task has its own context), so a cancelled turn
+# can keep what was generated before the stop.
+PARTIAL: "contextvars.ContextVar[Optional[List[str]]]" = contextvars.ContextVar("partial_output", default=None)
+
+def partial(text: str):
+    """Record a streamed chunk for the current turn (no-op outside one)."""
+    buf = PARTIAL.get()
+    if buf is not None:
+        buf.append(text)
 
 class Provider(abc.ABC):
+    rate_limited = True  # subject to the process-wide RateLimiter
+
     def __init__(self, model: str):
         self.model = model
 
     @abc.abstractmethod
     async def complete(self, prompt: str) -> str: ...
 
+    async def warm(self):
+        """Get ready for an upcoming phase (e.g. load a local model). No-op by default."""
+
+    async def complete_shared(self, prefix: str, suffix: str) -> str:
+        """Complete ``prefix + suffix`` where ``prefix`` is sent verbatim by
+        several callers.  Providers with explicit prompt caching mark it;
+        the default relies on automatic prefix / KV-cache reuse."""
+        return await self.complete(prefix + suffix)
+
+    async def generate(self, prompt: str, use_cache: bool = False, prefix: str = "") -> str:
+        """``complete`` behind the process-wide rate limiter and response cache.
+
+        ``prefix`` is prepended to ``prompt`` and passed separately so the
+        provider can cache it.
+        """
+        cache, limiter = _RESOURCES["cache"], _RESOURCES["limiter"]
+        key = None
+        if use_cache and cache is not None:
+            key = cache.key(type(self).__name__, self.model, prefix + prompt)
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        # The coroutine is only created once a slot is held: one made earlier
+        # would leak un-awaited if the caller is cancelled while queued
+        def call():
+            return self.complete_shared(prefix, prompt) if prefix else self.complete(prompt)
+        with profiling.span("provider.call", provider=type(self).__name__, model=self.model):
+            if limiter is not None and self.rate_limited:
+                async with limiter.slot(type(self).__name__):
+                    reply = await call()
+            else:
+                reply = await call()
+        if key is not None:
+            cache.put(key, reply)
+        return reply
+
 # ---------------- Registry ➜ name→cls map ---------------
 _REG: Dict[str, type[Provider]] = {}
 
@@ -20,13 +73,156 @@ def register(name: str):
         return cls
     return _wrap
 
+# Module that registers each built-in provider; only the selected ones are
+# imported, so unused provider stacks never load at startup
+_MODULES = {
+    "openai": "providers.openai_provider",
+    "anthropic": "providers.anthropic_provider",
+    "mistral": "providers.mistral_provider",
+    "local": "providers.local_provider",
+    "embedded": "providers.embedded_provider",
+}
+
 def create(name: str, model: str) -> Provider:
-    # Import here to ensure providers are registered
-    import providers.openai_provider
-    import providers.anthropic_provider
-    import providers.mistral_provider
-    import providers.local_provider
-    
+    # "batch:<provider>" queues prompts into offline batch jobs for that provider
+    if name.startswith("batch:"):
+        from providers.batch import BatchProvider
+        inner = name.split(":", 1)[1]
+        return BatchProvider(inner, create(inner, model))
+
+    if name not in _REG and name in _MODULES:
+        importlib.import_module(_MODULES[name])
     if name not in _REG:
-        raise ValueError(f"Unknown provider '{name}'. Registered: {list(_REG)}")
+        raise ValueError(f"Unknown provider '{name}'. Available: {sorted(set(_MODULES) | set(_REG))}")
     return _REG[name](model)
+
+# ---------------- Shared pool ---------------
+# Providers hold no per-call state, so one instance per (provider, model) is
+# shared by every agent in the process (tournaments run hundreds of debates).
+_SHARED: Dict[Tuple[str, str], Provider] = {}
+
+def get(name: str, model: str) -> Provider:
+    """Return the process-wide provider instance for ``name``/``model``."""
+    key = (name, model)
+    if key not in _SHARED:
+        _SHARED[key] = create(name, model)
+    return _SHARED[key]
+
+# httpx clients are bound to the event loop they were first used on, so keep
+# one keep-alive connection pool per running loop.
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def client() -> httpx.AsyncClient:
+    """Pooled HTTP client for the current event loop."""
+    import httpx  # deferred: ~150 ms, and only needed once a request is made
+    loop = asyncio.get_running_loop()
+    c = _CLIENTS.get(loop)
+    if c is None or c.is_closed:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("PROVIDER_MAX_KEEPALIVE", "20")),
+        )
+        c = httpx.AsyncClient(limits=limits, timeout=60)
+        _CLIENTS[loop] = c
+    return c
+
+async def stream_sse(url: str, headers: Dict[str, str], body: Dict[str, Any],
+                     delta: Callable[[Dict[str, Any]], Optional[str]], timeout: float = 60) -> str:
+    """POST ``body`` with ``"stream": true`` and join the text ``delta`` picks
+    out of each server-sent event.  Cancelling the caller closes the response,
+    so the provider stops generating (and billing) right away."""
+    parts = []
+    async with client().stream("POST", url, headers=headers, json=dict(body, stream=True), timeout=timeout) as r:
+        if r.is_error:
+            await r.aread()
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            text = delta(json.loads(data))
+            if text:
+                parts.append(text)
+                partial(text)
+    return "".join(parts)
+
+def chat_delta(event: Dict[str, Any]) -> Optional[str]:
+    """Text of an OpenAI-style ``chat.completion.chunk`` (also Mistral's)."""
+    if "error" in event:
+        raise RuntimeError(f"Provider error: {event['error']}")
+    choices = event.get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content")
+
+async def aclose():
+    """Close the current loop's pooled client (call before closing the loop)."""
+    c = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if c is not None:
+        await c.aclose()
+
+# ---------------- Shared cache / rate limiting ---------------
+class ResponseCache:
+    """Thread-safe LRU of completions keyed by provider, model and prompt."""
+    def __init__(self, maxsize: int = 2048):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(provider: str, model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{provider}\0{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class RateLimiter:
+    """Caps in-flight calls and call rate per provider class.
+
+    Semaphores are created per event loop, so one limiter can be shared by
+    Streamlit's background loop, the server and tournaments alike.
+    """
+    def __init__(self, max_concurrent: int = 8, min_interval: float = 0.0,
+                 per_provider: Optional[Dict[str, int]] = None):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval  # seconds between call starts, per provider
+        self.per_provider = per_provider or {}
+        self._sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._last: Dict[str, float] = {}
+
+    def _sem(self, provider: str) -> asyncio.Semaphore:
+        sems = self._sems.setdefault(asyncio.get_running_loop(), {})
+        if provider not in sems:
+            sems[provider] = asyncio.Semaphore(self.per_provider.get(provider, self.max_concurrent))
+        return sems[provider]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, provider: str):
+        async with self._sem(provider):
+            if self.min_interval:
+                wait = self._last.get(provider, 0.0) + self.min_interval - time.monotonic()
+                self._last[provider] = time.monotonic() + max(wait, 0.0)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            yield
+
+_RESOURCES: Dict[str, Any] = {"cache": None, "limiter": None}
+
+def configure(cache: Optional[ResponseCache] = None, limiter: Optional[RateLimiter] = None):
+    """Install process-wide resources used by ``Provider.generate``."""
+    _RESOURCES["cache"] = cache
+    _RESOURCES["limiter"] = limiter
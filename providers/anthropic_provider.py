@@ -1,12 +1,19 @@
 from __future__ import annotations
-import os, httpx, asyncio
-from providers import Provider, register
+import os
+from providers import Provider, register, stream_sse
+
+def _delta(event):
+    if event.get("type") == "error":
+        raise RuntimeError(f"Anthropic error: {event.get('error')}")
+    if event.get("type") == "content_block_delta":
+        return event["delta"].get("text")
+    return None
 
 @register("anthropic")
 class AnthropicProvider(Provider):
     _url = "https://api.anthropic.com/v1/messages"
 
-    async def complete(self, prompt: str) -> str:
+    async def _post(self, content) -> str:
         headers = {
             "x-api-key": os.getenv("ANTHROPIC_API_KEY", ""),
             "anthropic-version": "2023-06-01",
@@ -14,11 +21,18 @@ class AnthropicProvider(Provider):
         }
         json_body = {
             "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [{"role": "user", "content": content}],
             "max_tokens": 1024,
             "temperature": 0.2,
         }
-        async with httpx.AsyncClient(timeout=60) as client:
-            r = await client.post(self._url, headers=headers, json=json_body)
-            r.raise_for_status()
-            return r.json()["content"][0]["text"]
\ No newline at end of file
+        return await stream_sse(self._url, headers, json_body, _delta)
+
+    async def complete(self, prompt: str) -> str:
+        return await self._post(prompt)
+
+    async def complete_shared(self, prefix: str, suffix: str) -> str:
+        # Cache breakpoint after the shared block; later calls read it at a fraction of the cost
+        return await self._post([
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": suffix},
+        ])
\ No newline at end of file
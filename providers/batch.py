@@ -0,0 +1,306 @@
+"""Offline batch execution for bulk runs.
+
+``create("batch:openai", model)`` returns a provider whose ``complete`` does
+not call the API directly: prompts from every debate in the process are
+queued on a shared ``BatchCollector``, submitted together as one batch job
+per (provider, model), polled, and each reply is handed back to the caller
+that asked for it.  Batch APIs trade latency (minutes to hours) for price and
+throughput, so this is meant for tournaments and overnight sweeps, not the UI.
+
+Backends: OpenAI (/v1/batches), Anthropic (/v1/messages/batches), Mistral
+(/v1/batch/jobs) and ``LocalBatchBackend``, a stand-in that runs the same
+submit/poll/fetch cycle in-process against the wrapped provider.  Set
+``BATCH_BACKEND=local`` to force the stand-in, and ``OPENAI_BATCH_BASE_URL``
+to point the OpenAI backend at a compatible local endpoint.
+``check_batch.py`` exercises the collector against the stand-in.
+"""
+from __future__ import annotations
+import abc, asyncio, json, os, uuid
+from typing import List, Dict, Any, Optional, Tuple
+from providers import Provider, client
+
+class BatchBackend(abc.ABC):
+    @abc.abstractmethod
+    async def submit(self, model: str, requests: List[Tuple[str, str]]) -> str:
+        """Submit ``(custom_id, prompt)`` pairs; returns a job id."""
+
+    @abc.abstractmethod
+    async def poll(self, job_id: str) -> bool:
+        """True once the job has finished (successfully or not)."""
+
+    @abc.abstractmethod
+    async def fetch(self, job_id: str) -> Dict[str, str]:
+        """custom_id → reply text for every request that succeeded."""
+
+def _jsonl(rows: List[Dict[str, Any]]) -> bytes:
+    return "\n".join(json.dumps(r) for r in rows).encode("utf-8")
+
+def _parse_jsonl(text: str) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self):
+        self.base = os.getenv("OPENAI_BATCH_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY','')}"}
+
+    async def submit(self, model, requests):
+        rows = [{
+            "custom_id": cid,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": 0.2},
+        } for cid, prompt in requests]
+        r = await client().post(f"{self.base}/files", headers=self._headers(),
+                                data={"purpose": "batch"},
+                                files={"file": ("batch.jsonl", _jsonl(rows), "application/jsonl")}, timeout=120)
+        r.raise_for_status()
+        r = await client().post(f"{self.base}/batches", headers=self._headers(), json={
+            "input_file_id": r.json()["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+        }, timeout=60)
+        r.raise_for_status()
+        return r.json()["id"]
+
+    async def poll(self, job_id):
+        r = await client().get(f"{self.base}/batches/{job_id}", headers=self._headers(), timeout=60)
+        r.raise_for_status()
+        return r.json()["status"] in ("completed", "failed", "expired", "cancelled")
+
+    async def fetch(self, job_id):
+        r = await client().get(f"{self.base}/batches/{job_id}", headers=self._headers(), timeout=60)
+        r.raise_for_status()
+        file_id = r.json().get("output_file_id")
+        if not file_id:
+            return {}
+        r = await client().get(f"{self.base}/files/{file_id}/content", headers=self._headers(), timeout=300)
+        r.raise_for_status()
+        out = {}
+        for row in _parse_jsonl(r.text):
+            resp = row.get("response") or {}
+            if resp.get("status_code") == 200:
+                out[row["custom_id"]] = resp["body"]["choices"][0]["message"]["content"]
+        return out
+
+class AnthropicBatchBackend(BatchBackend):
+    _url = "https://api.anthropic.com/v1/messages/batches"
+
+    def _headers(self):
+        return {
+            "x-api-key": os.getenv("ANTHROPIC_API_KEY", ""),
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+
+    async def submit(self, model, requests):
+        r = await client().post(self._url, headers=self._headers(), json={"requests": [{
+            "custom_id": cid,
+            "params": {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 1024,
+                "temperature": 0.2,
+            },
+        } for cid, prompt in requests]}, timeout=120)
+        r.raise_for_status()
+        return r.json()["id"]
+
+    async def poll(self, job_id):
+        r = await client().get(f"{self._url}/{job_id}", headers=self._headers(), timeout=60)
+        r.raise_for_status()
+        return r.json()["processing_status"] == "ended"
+
+    async def fetch(self, job_id):
+        r = await client().get(f"{self._url}/{job_id}/results", headers=self._headers(), timeout=300)
+        r.raise_for_status()
+        out = {}
+        for row in _parse_jsonl(r.text):
+            result = row.get("result") or {}
+            if result.get("type") == "succeeded":
+                out[row["custom_id"]] = result["message"]["content"][0]["text"]
+        return out
+
+class MistralBatchBackend(BatchBackend):
+    _base = "https://api.mistral.ai/v1"
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {os.getenv('MISTRAL_API_KEY','')}"}
+
+    async def submit(self, model, requests):
+        rows = [{"custom_id": cid, "body": {"messages": [{"role": "user", "content": prompt}], "temperature": 0.2}}
+                for cid, prompt in requests]
+        r = await client().post(f"{self._base}/files", headers=self._headers(), data={"purpose": "batch"},
+                                files={"file": ("batch.jsonl", _jsonl(rows), "application/jsonl")}, timeout=120)
+        r.raise_for_status()
+        r = await client().post(f"{self._base}/batch/jobs", headers=self._headers(), json={
+            "input_files": [r.json()["id"]],
+            "model": model,
+            "endpoint": "/v1/chat/completions",
+        }, timeout=60)
+        r.raise_for_status()
+        return r.json()["id"]
+
+    async def poll(self, job_id):
+        r = await client().get(f"{self._base}/batch/jobs/{job_id}", headers=self._headers(), timeout=60)
+        r.raise_for_status()
+        return r.json()["status"] in ("SUCCESS", "FAILED", "TIMEOUT_EXCEEDED", "CANCELLED")
+
+    async def fetch(self, job_id):
+        r = await client().get(f"{self._base}/batch/jobs/{job_id}", headers=self._headers(), timeout=60)
+        r.raise_for_status()
+        file_id = r.json().get("output_file")
+        if not file_id:
+            return {}
+        r = await client().get(f"{self._base}/files/{file_id}/content", headers=self._headers(), timeout=300)
+        r.raise_for_status()
+        out = {}
+        for row in _parse_jsonl(r.text):
+            body = (row.get("response") or {}).get("body") or {}
+            if body.get("choices"):
+                out[row["custom_id"]] = body["choices"][0]["message"]["content"]
+        return out
+
+class LocalBatchBackend(BatchBackend):
+    """In-process stand-in: same job lifecycle, executed with ``inner.complete``."""
+    def __init__(self, inner: Provider, concurrency: int = 8):
+        self.inner = inner
+        self.concurrency = concurrency
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, model, requests):
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _one(cid, prompt):
+            async with sem:
+                try:
+                    return cid, await self.inner.complete(prompt)
+                except Exception as e:
+                    print(f"Local batch request {cid} failed: {e}")
+                    return cid, None
+
+        async def _job():
+            return {cid: text for cid, text in await asyncio.gather(*(_one(c, p) for c, p in requests))
+                    if text is not None}
+
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = asyncio.get_running_loop().create_task(_job())
+        return job_id
+
+    async def poll(self, job_id):
+        return self._jobs[job_id].done()
+
+    async def fetch(self, job_id):
+        return self._jobs.pop(job_id).result()
+
+_BACKENDS = {
+    "openai": OpenAIBatchBackend,
+    "anthropic": AnthropicBatchBackend,
+    "mistral": MistralBatchBackend,
+}
+
+def backend_for(provider_name: str, inner: Provider) -> BatchBackend:
+    if os.getenv("BATCH_BACKEND") == "local" or provider_name not in _BACKENDS:
+        return LocalBatchBackend(inner)
+    return _BACKENDS[provider_name]()
+
+class BatchCollector:
+    """Queues prompts per backend/model and flushes them as batch jobs.
+
+    A queue is flushed once it holds ``max_batch`` prompts, or ``idle``
+    seconds pass without a new prompt (i.e. every debate has submitted its
+    turn for the phase), or ``max_wait`` seconds after its first prompt.
+    """
+    def __init__(self, max_batch: int = 5000, idle: float = 2.0, max_wait: float = 30.0,
+                 poll_interval: float = 30.0):
+        self.max_batch = max_batch
+        self.idle = idle
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self._queues: Dict[Tuple[int, str], Dict[str, Any]] = {}
+
+    async def submit(self, backend: BatchBackend, model: str, prompt: str) -> str:
+        key = (id(backend), model)
+        q = self._queues.get(key)
+        loop = asyncio.get_running_loop()
+        if q is None:
+            q = self._queues[key] = {"backend": backend, "model": model, "items": [],
+                                     "first": loop.time(), "last": 0.0, "timer": None}
+        fut = loop.create_future()
+        q["items"].append((uuid.uuid4().hex, prompt, fut))
+        q["last"] = loop.time()
+        if len(q["items"]) >= self.max_batch:
+            self._flush(key)
+        elif q["timer"] is None:
+            q["timer"] = loop.create_task(self._timer(key))
+        return await fut
+
+    async def _timer(self, key):
+        loop = asyncio.get_running_loop()
+        while key in self._queues:
+            q = self._queues[key]
+            due = min(q["last"] + self.idle, q["first"] + self.max_wait)
+            if loop.time() >= due:
+                q["timer"] = None
+                self._flush(key)
+                return
+            await asyncio.sleep(due - loop.time())
+
+    def _flush(self, key):
+        q = self._queues.pop(key, None)
+        if not q:
+            return
+        if q["timer"] is not None and q["timer"] is not asyncio.current_task():
+            q["timer"].cancel()
+        # Callers that were cancelled (stopped debates) aren't submitted
+        q["items"] = [item for item in q["items"] if not item[2].cancelled()]
+        if not q["items"]:
+            return
+        asyncio.get_running_loop().create_task(self._run_job(q["backend"], q["model"], q["items"]))
+
+    async def _run_job(self, backend: BatchBackend, model: str, items):
+        futures = {cid: fut for cid, _, fut in items}
+        try:
+            job_id = await backend.submit(model, [(cid, prompt) for cid, prompt, _ in items])
+            print(f"Submitted batch {job_id}: {len(items)} prompts for {model}")
+            while not await backend.poll(job_id):
+                await asyncio.sleep(self.poll_interval)
+            results = await backend.fetch(job_id)
+        except Exception as e:
+            for fut in futures.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for cid, fut in futures.items():
+            if fut.done():
+                continue
+            if cid in results:
+                fut.set_result(results[cid])
+            else:
+                fut.set_exception(RuntimeError(f"Batch request {cid} for {model} returned no result"))
+
+_collector: Optional[BatchCollector] = None
+
+def collector() -> BatchCollector:
+    global _collector
+    if _collector is None:
+        _collector = BatchCollector(
+            idle=float(os.getenv("BATCH_IDLE", "2")),
+            max_wait=float(os.getenv("BATCH_MAX_WAIT", "30")),
+            poll_interval=float(os.getenv("BATCH_POLL_INTERVAL", "30")),
+        )
+    return _collector
+
+class BatchProvider(Provider):
+    """Routes ``complete`` through the shared collector instead of a live call."""
+    rate_limited = False  # queued prompts aren't live calls; the batch API meters itself
+
+    def __init__(self, provider_name: str, inner: Provider):
+        super().__init__(inner.model)
+        self.provider_name = provider_name
+        self.inner = inner
+        self.backend = backend_for(provider_name, inner)
+
+    async def complete(self, prompt: str) -> str:
+        return await collector().submit(self.backend, self.model, prompt)
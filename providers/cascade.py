@@ -0,0 +1,75 @@
+"""Per-phase model cascades: cheap models first, escalate on a failed check.
+
+An agent config may declare, per phase, smaller models to try before its own
+(strong) model::
+
+    {"name": "OpenAI", "provider_name": "openai", "model": "gpt-4",
+     "cascade": {"critique": {"models": [{"provider_name": "openai", "model": "gpt-4o-mini"}],
+                              "min_words": 80, "require": ["Damage Assessment"]}}}
+
+A reply is accepted from the first model whose output passes the check;
+otherwise the agent's own model answers.  The orchestrator bypasses the
+cascade entirely for the final round (``DebateConfig.max_rounds``).
+"""
+from __future__ import annotations
+import asyncio, re
+from typing import List, Dict, Any, Tuple, Optional
+from providers import Provider, get, PARTIAL
+
+def _restart_partial():
+    # A stop mid-escalation keeps only the model that was answering
+    buf = PARTIAL.get()
+    if buf:
+        buf.clear()
+
+class Cascade(Provider):
+    def __init__(self, steps: List[Provider], strong: Provider, min_words: int = 0,
+                 max_words: Optional[int] = None, require: Optional[List[str]] = None):
+        super().__init__(strong.model)
+        self.steps = steps
+        self.strong = strong
+        self.min_words = min_words
+        self.max_words = max_words
+        self.require = [r.lower() for r in (require or [])]
+
+    def accepts(self, reply: str) -> bool:
+        """Cheap quality gate: length bounds plus required markers."""
+        words = len(re.findall(r"\S+", reply))
+        if words < self.min_words:
+            return False
+        if self.max_words is not None and words > self.max_words:
+            return False
+        text = reply.lower()
+        return all(marker in text for marker in self.require)
+
+    async def route(self, prompt: str, use_cache: bool = False, prefix: str = "") -> Tuple[str, str]:
+        """Return ``(reply, model)`` from the first step that passes the check."""
+        for step in self.steps:
+            _restart_partial()
+            try:
+                reply = await step.generate(prompt, use_cache=use_cache, prefix=prefix)
+            except Exception as e:
+                print(f"Cascade step {step.model} failed, escalating: {e}")
+                continue
+            if self.accepts(reply):
+                return reply, step.model
+        _restart_partial()
+        return await self.strong.generate(prompt, use_cache=use_cache, prefix=prefix), self.strong.model
+
+    async def warm(self):
+        await asyncio.gather(*(p.warm() for p in self.steps + [self.strong]))
+
+    async def complete(self, prompt: str) -> str:
+        reply, _ = await self.route(prompt)
+        return reply
+
+def build(spec: Dict[str, Any], strong: Provider) -> Dict[str, Cascade]:
+    """phase → Cascade from an agent's ``cascade`` config."""
+    routes = {}
+    for phase, rule in (spec or {}).items():
+        steps = [get(m["provider_name"], m["model"]) for m in rule.get("models", [])]
+        if not steps:
+            continue
+        routes[phase] = Cascade(steps, strong, rule.get("min_words", 0),
+                                rule.get("max_words"), rule.get("require"))
+    return routes
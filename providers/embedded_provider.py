@@ -0,0 +1,118 @@
+"""In-process provider: a quantized GGUF model run with llama.cpp, no server.
+
+``model`` is a path to a .gguf file (or a file name inside
+``EMBEDDED_MODEL_DIR``).  Each model gets one engine with ``EMBEDDED_WORKERS``
+llama.cpp instances (default 1) that split the CPU cores between them.
+Concurrent agents' prompts are queued to the engine; a worker drains whatever
+is waiting and runs it ordered by prompt text, so prompts sharing scaffolding
+run back to back and reuse the evaluated prefix from the KV cache, backed by
+a shared RAM prefix cache (``EMBEDDED_CACHE_MB``) for the rest.
+
+Requires ``llama-cpp-python``; it is only imported when this provider is used.
+"""
+from __future__ import annotations
+import asyncio, os, queue, threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from providers import Provider, register, PARTIAL
+
+def _resolve(model: str) -> str:
+    if os.path.isfile(model):
+        return model
+    path = os.path.join(os.getenv("EMBEDDED_MODEL_DIR", "models"), model)
+    if os.path.isfile(path):
+        return path
+    raise FileNotFoundError(f"No GGUF model at '{model}' or '{path}'")
+
+class _Engine:
+    def __init__(self, path: str):
+        try:
+            from llama_cpp import Llama, LlamaRAMCache
+        except ImportError as e:
+            raise ImportError("The 'embedded' provider needs llama-cpp-python: pip install llama-cpp-python") from e
+        workers = max(1, int(os.getenv("EMBEDDED_WORKERS", "1")))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        cache_bytes = int(os.getenv("EMBEDDED_CACHE_MB", "1024")) * 1024 * 1024
+        self.max_tokens = int(os.getenv("EMBEDDED_MAX_TOKENS", "1024"))
+        self.queue: "queue.Queue[Tuple[str, Future, Optional[List[str]]]]" = queue.Queue()
+        self._threads = []
+        for i in range(workers):
+            llm = Llama(
+                model_path=path,
+                n_ctx=int(os.getenv("EMBEDDED_NUM_CTX", "8192")),
+                n_threads=threads,
+                n_threads_batch=threads,
+                n_batch=int(os.getenv("EMBEDDED_NUM_BATCH", "512")),
+                verbose=False,
+            )
+            llm.set_cache(LlamaRAMCache(capacity_bytes=cache_bytes // workers))
+            t = threading.Thread(target=self._work, args=(llm,), name=f"embedded-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, prompt: str, parts: Optional[List[str]] = None) -> Future:
+        """Queue ``prompt``; generated text is also appended to ``parts`` as it
+        streams.  Setting ``fut.abort`` stops a generation that has started."""
+        fut: Future = Future()
+        fut.abort = threading.Event()
+        self.queue.put((prompt, fut, parts))
+        return fut
+
+    def _drain(self) -> List[Tuple[str, Future, Optional[List[str]]]]:
+        batch = [self.queue.get()]
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        # Lexicographic order puts prompts with a common prefix next to each other
+        batch.sort(key=lambda item: item[0])
+        return batch
+
+    def _work(self, llm):
+        while True:
+            batch = self._drain()
+            for prompt, fut, parts in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    text = []
+                    for chunk in llm.create_chat_completion(
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=self.max_tokens,
+                        temperature=0.2,
+                        stream=True,
+                    ):
+                        if fut.abort.is_set():
+                            break
+                        piece = chunk["choices"][0]["delta"].get("content") or ""
+                        text.append(piece)
+                        if parts is not None:
+                            parts.append(piece)
+                    fut.set_result("".join(text))
+                except Exception as e:
+                    fut.set_exception(e)
+
+_ENGINES: Dict[str, _Engine] = {}
+_LOCK = threading.Lock()
+
+def engine(path: str) -> _Engine:
+    with _LOCK:
+        if path not in _ENGINES:
+            _ENGINES[path] = _Engine(path)
+        return _ENGINES[path]
+
+@register("embedded")
+class EmbeddedProvider(Provider):
+    async def warm(self):
+        # Loading a model reads it from disk; keep that off the event loop
+        await asyncio.to_thread(engine, _resolve(self.model))
+
+    async def complete(self, prompt: str) -> str:
+        eng = await asyncio.to_thread(engine, _resolve(self.model))
+        fut = eng.submit(prompt, PARTIAL.get())
+        try:
+            return await asyncio.wrap_future(fut)
+        except asyncio.CancelledError:
+            fut.abort.set()  # a queued prompt is dropped; a running one stops at the next token
+            raise
@@ -1,17 +1,100 @@
-"""Local provider via Ollama REST API on http://localhost:11434/api/chat"""
+"""Local provider via Ollama REST API on http://localhost:11434/api/chat
+
+Replies are streamed as NDJSON, so a slow CPU generation is bounded by the
+per-chunk read timeout rather than one wall-clock limit.  Requests are queued
+per model (``OLLAMA_PARALLEL`` at a time, matching the server's
+OLLAMA_NUM_PARALLEL) so several local agents don't thrash one CPU, and
+``warm()`` loads the model ahead of a phase and keeps it resident for
+``OLLAMA_KEEP_ALIVE``.
+
+Environment: OLLAMA_HOST, OLLAMA_KEEP_ALIVE (default "30m"), OLLAMA_NUM_CTX,
+OLLAMA_NUM_THREAD, OLLAMA_PARALLEL (default 1), OLLAMA_READ_TIMEOUT (s).
+"""
 from __future__ import annotations
-import os, httpx, asyncio, json
-from providers import Provider, register
+import os, httpx, asyncio, json, time, weakref
+from typing import Dict, Any
+from providers import Provider, register, client, partial
+
+def _options() -> Dict[str, Any]:
+    opts = {}
+    for key, env in (("num_ctx", "OLLAMA_NUM_CTX"), ("num_thread", "OLLAMA_NUM_THREAD")):
+        if os.getenv(env):
+            opts[key] = int(os.getenv(env))
+    return opts
 
 @register("local")
 class LocalProvider(Provider):
-    _url = "http://localhost:11434/api/chat"
-    async def complete(self, prompt: str) -> str:
-        json_body = {"model": self.model, "messages": [{"role": "user", "content": prompt}]}
-        async with httpx.AsyncClient(timeout=120) as client:
-            r = await client.post(self._url, json=json_body)
+    _host = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+    _url = f"{_host}/api/chat"
+    # Model loads can take minutes on CPU; generation between chunks is quick
+    _timeout = httpx.Timeout(connect=10, read=float(os.getenv("OLLAMA_READ_TIMEOUT", "300")), write=60, pool=None)
+    _queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+    _warmed: Dict[str, float] = {}
+    WARM_INTERVAL = 60.0  # seconds before residency is re-checked
+
+    @property
+    def keep_alive(self) -> str:
+        return os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+    def _queue(self) -> asyncio.Semaphore:
+        queues = self._queues.setdefault(asyncio.get_running_loop(), {})
+        if self.model not in queues:
+            queues[self.model] = asyncio.Semaphore(int(os.getenv("OLLAMA_PARALLEL", "1")))
+        return queues[self.model]
+
+    async def warm(self):
+        """Load the model (if it isn't resident) so the phase doesn't start cold."""
+        now = time.monotonic()
+        if now - self._warmed.get(self.model, -self.WARM_INTERVAL) < self.WARM_INTERVAL:
+            return
+        self._warmed[self.model] = now
+        try:
+            r = await client().get(f"{self._host}/api/ps", timeout=10)
+            r.raise_for_status()
+            loaded = {m.get("name") for m in r.json().get("models", [])} | \
+                     {m.get("model") for m in r.json().get("models", [])}
+            if self.model in loaded or f"{self.model}:latest" in loaded:
+                return
+            # A generate call without a prompt just loads the model
+            r = await client().post(f"{self._host}/api/generate", json={
+                "model": self.model, "keep_alive": self.keep_alive, "options": _options(),
+            }, timeout=self._timeout)
             r.raise_for_status()
-            res = r.json()
-            if "message" in res:
-                return res["message"]["content"]
-            return res.get("response", "")
\ No newline at end of file
+        except httpx.HTTPError as e:
+            self._warmed.pop(self.model, None)
+            print(f"Ollama warm-up for {self.model} failed: {e}")
+
+    async def release(self):
+        """Unload the model now instead of waiting for keep_alive to lapse."""
+        r = await client().post(f"{self._host}/api/generate", json={"model": self.model, "keep_alive": 0}, timeout=30)
+        r.raise_for_status()
+        self._warmed.pop(self.model, None)
+
+    async def complete(self, prompt: str) -> str:
+        json_body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        if _options():
+            json_body["options"] = _options()
+        parts = []
+        async with self._queue():
+            async with client().stream("POST", self._url, json=json_body, timeout=self._timeout) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line.strip():
+                        continue
+                    res = json.loads(line)
+                    if "error" in res:
+                        raise RuntimeError(f"Ollama error: {res['error']}")
+                    if "message" in res:
+                        parts.append(res["message"].get("content", ""))
+                    else:
+                        parts.append(res.get("response", ""))
+                    partial(parts[-1])
+                    if res.get("done"):
+                        break
+        self._warmed[self.model] = time.monotonic()
+        return "".join(parts)
@@ -1,6 +1,6 @@
 from __future__ import annotations
-import os, httpx
-from providers import Provider, register
+import os
+from providers import Provider, register, stream_sse, chat_delta
 
 @register("mistral")
 class MistralProvider(Provider):
@@ -12,7 +12,4 @@ class MistralProvider(Provider):
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.2
         }
-        async with httpx.AsyncClient(timeout=60) as client:
-            r = await client.post(self._url, headers=headers, json=json_body)
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
\ No newline at end of file
+        return await stream_sse(self._url, headers, json_body, chat_delta)
\ No newline at end of file
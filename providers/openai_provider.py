@@ -1,13 +1,12 @@
 from __future__ import annotations
-import os, asyncio
-import httpx, json
-from providers import Provider, register
+import os, hashlib
+from providers import Provider, register, stream_sse, chat_delta
 
 @register("openai")
 class OpenAIProvider(Provider):
     _url = "https://api.openai.com/v1/chat/completions"
 
-    async def complete(self, prompt: str) -> str:
+    async def complete(self, prompt: str, cache_key: str = None) -> str:
         headers = {
             "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY','')}",
         }
@@ -18,7 +17,10 @@ class OpenAIProvider(Provider):
             ],
             "temperature": 0.2,
         }
-        async with httpx.AsyncClient(timeout=60) as client:
-            r = await client.post(self._url, headers=headers, json=json_body)
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
\ No newline at end of file
+        if cache_key:
+            json_body["prompt_cache_key"] = cache_key
+        return await stream_sse(self._url, headers, json_body, chat_delta)
+
+    async def complete_shared(self, prefix: str, suffix: str) -> str:
+        # Prefix caching is automatic; a common key routes the calls to the same cache
+        return await self.complete(prefix + suffix, cache_key=hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32])
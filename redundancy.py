@@ -0,0 +1,65 @@
+"""Drop arguments an agent has already made from what gets passed on.
+
+Each turn is split into paragraphs and embedded; a paragraph whose cosine
+similarity to any paragraph from the same agent's earlier turns reaches
+``threshold`` is a restatement.  The turn keeps its full text in the
+transcript, but its ``condensed`` form (restatements marked or stripped) is
+what later critique / defense prompts and the judge see.
+"""
+from __future__ import annotations
+import re, threading
+from typing import Dict, List, Tuple
+import numpy as np
+import agents
+
+MARKER = "[…restates an earlier point]"
+
+def paragraphs(text: str) -> List[str]:
+    return [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+class RedundancyFilter:
+    def __init__(self, threshold: float = 0.9, mode: str = "mark", min_chars: int = 80):
+        if mode not in ("mark", "strip"):
+            raise ValueError(f"mode must be 'mark' or 'strip', not {mode!r}")
+        self.threshold = threshold
+        self.mode = mode
+        self.min_chars = min_chars  # headings / one-liners are never dropped
+        self._seen: Dict[str, np.ndarray] = {}  # agent name → earlier paragraph embeddings
+        self._lock = threading.Lock()  # one encode at a time on the shared model
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            return np.asarray(agents.embed(texts), dtype=np.float32)
+
+    def _remember(self, name: str, embs: np.ndarray):
+        if not len(embs):
+            return
+        seen = self._seen.get(name)
+        self._seen[name] = embs if seen is None or not len(seen) else np.vstack([seen, embs])
+
+    def knows(self, name: str) -> bool:
+        return name in self._seen
+
+    def seed(self, name: str, earlier: List[str]):
+        """Load an agent's earlier turns (e.g. after a session is restored)."""
+        self._seen.pop(name, None)
+        self._remember(name, self._embed([p for text in earlier for p in paragraphs(text)]))
+
+    def condense(self, name: str, text: str) -> Tuple[str, int]:
+        """Return ``(text without restatements, number of paragraphs dropped)``."""
+        paras = paragraphs(text)
+        embs = self._embed(paras)
+        seen = self._seen.get(name)
+        kept, dropped = [], 0
+        for para, emb in zip(paras, embs):
+            if (seen is not None and len(seen) and len(para.strip()) >= self.min_chars
+                    and float(np.max(seen @ emb)) >= self.threshold):
+                dropped += 1
+                if self.mode == "mark":
+                    kept.append(MARKER)
+            else:
+                kept.append(para)
+        self._remember(name, embs)
+        return "\n\n".join(kept), dropped
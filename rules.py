@@ -0,0 +1,153 @@
+"""Deterministic checks of the DEFENSE rules the binary judge used to audit by hand.
+
+Each rule returns ``{"ok": bool, "detail": str}``; ``check_defense`` bundles
+them with the violation count and the exact penalty (0.10 each).  The
+orchestrator passes the results to the judge as facts and applies the
+penalties itself, so the judge no longer spends tokens re-counting words.
+
+Rules (from ``DEFENSE_PROMPT``):
+
+* concede_or_counter — each response is a ≤ 10-word concession or a ≤ 100-word rebuttal
+* one_fresh_citation — at most one MLA citation (works-cited or in-text) not used in the agent's earlier turns
+* fragility_index    — an updated Fragility Index is present; a change comes with a reason
+* victory_path       — the defense closes with exactly two sentences
+"""
+from __future__ import annotations
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+from citations import keys as citation_keys, cited_before
+from judging import INDEX_PATTERN
+
+PENALTY = 0.10
+CONCESSION_WORDS = 10
+REBUTTAL_WORDS = 100
+
+# "**Concede:** ...", "Counter – ...", "Rebuttal: ..." at the start of a line / bullet
+_RESPONSE = re.compile(r"^[\s>*•▪\-\d.)]*\**\s*(concede|concession|counter|rebuttal)\w*\s*\**\s*[:–—\-]?\**",
+                       re.I | re.M)
+_VICTORY = re.compile(r"victory path|roadmap|definitive(?:ly)? (?:proof|settle)", re.I)
+_SENTENCE = re.compile(r"[^.!?]+(?:[.!?]+[\"”')\]]*|$)")
+
+def _words(text: str) -> int:
+    return len(re.findall(r"[\w'’\-]+", text))
+
+def sentences(text: str) -> List[str]:
+    # Don't split on the dots inside citations' abbreviations / numbers
+    text = re.sub(r"\b(e\.g|i\.e|et al|vs|Dr|Mr|Ms|No|Vol|pp?)\.", lambda m: m.group(0).replace(".", "·"), text)
+    text = re.sub(r"(\d)\.(\d)", r"\1·\2", text)
+    return [s.strip() for s in _SENTENCE.findall(text) if _words(s) > 0]
+
+def concede_or_counter(content: str) -> Dict[str, Any]:
+    marks = list(_RESPONSE.finditer(content))
+    if not marks:
+        return {"ok": False, "detail": "no labelled concession or counter found"}
+    problems = []
+    for i, m in enumerate(marks):
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(content)
+        body = content[m.end():end]
+        # The response ends at its paragraph; the Fragility Index and the
+        # closing victory path that follow aren't part of it
+        for tail in (_VICTORY.search(body), INDEX_PATTERN.search(body)):
+            if tail:
+                body = body[:tail.start()]
+        kind = "concession" if m.group(1).lower().startswith("conce") else "rebuttal"
+        limit = CONCESSION_WORDS if kind == "concession" else REBUTTAL_WORDS
+        n = _words(body.strip().split("\n\n")[0])
+        if n > limit:
+            problems.append(f"{kind} #{i + 1} has {n} words (max {limit})")
+    return {"ok": not problems, "detail": "; ".join(problems) or f"{len(marks)} response(s) within limits"}
+
+def one_fresh_citation(content: str, seen: Iterable[str] = ()) -> Dict[str, Any]:
+    """``seen`` are the citation keys of the agent's earlier turns.  An in-text
+    citation ``(Smith 45)`` of a work cited before isn't fresh."""
+    seen = set(seen)
+    fresh = [k for k in citation_keys(content) if not cited_before(k, seen)]
+    return {"ok": len(fresh) <= 1, "detail": f"{len(fresh)} new citation(s)", "new_citations": len(fresh)}
+
+def fragility_index(content: str, previous: Optional[float] = None) -> Dict[str, Any]:
+    hits = [m for m in INDEX_PATTERN.finditer(content) if m.group(1).lower() == "fragility"]
+    if not hits:
+        return {"ok": False, "detail": "no Fragility Index"}
+    value = float(hits[-1].group(2))
+    if previous is None or value == previous:
+        return {"ok": True, "detail": f"index {value:g}", "value": value}
+    # A changed index needs a reason right after it (same paragraph)
+    after = re.split(r"\n\s*\n", content[hits[-1].end():], 1)[0]
+    explained = any(_words(s) >= 3 for s in sentences(after))
+    return {"ok": explained, "value": value,
+            "detail": f"index {previous:g} → {value:g}" + ("" if explained else " without explanation")}
+
+def victory_path(content: str) -> Dict[str, Any]:
+    closing = list(_VICTORY.finditer(content))
+    if closing:
+        tail = content[closing[-1].end():]
+        tail = re.sub(r"^[\s*:–—\-]+", "", tail)
+    else:
+        paras = [p for p in re.split(r"\n\s*\n", content) if p.strip()]
+        tail = paras[-1] if paras else ""
+    n = len(sentences(tail))
+    return {"ok": n == 2, "detail": f"closing has {n} sentence(s)"}
+
+def _fragility(text: str) -> Optional[float]:
+    hits = [m for m in INDEX_PATTERN.finditer(text) if m.group(1).lower() == "fragility"]
+    return float(hits[-1].group(2)) if hits else None
+
+class Carried:
+    """Citation keys and last Fragility Index of an agent's earlier turns,
+    folded in one turn at a time so each check reads only the new ones."""
+    def __init__(self):
+        self.seen: Set[str] = set()
+        self.previous: Optional[float] = None
+        self.count = 0
+        self.transcript = None
+
+    def add(self, turn: Dict[str, Any]):
+        text = turn.get("content", "")
+        self.seen.update(citation_keys(text))
+        index = _fragility(text)
+        self.previous = index if index is not None else self.previous
+        self.count += 1
+
+    def catch_up(self, transcript, upto: int):
+        """Fold in ``transcript[count:upto]`` (by index, so spilled turns
+        already folded in are never paged back)."""
+        if transcript is not self.transcript or upto < self.count:
+            self.__init__()
+            self.transcript = transcript
+        for i in range(self.count, upto):
+            self.add(transcript[i])
+
+def _check(content: str, carried: Carried) -> Dict[str, Any]:
+    rules = {
+        "concede_or_counter": concede_or_counter(content),
+        "one_fresh_citation": one_fresh_citation(content, carried.seen),
+        "fragility_index": fragility_index(content, carried.previous),
+        "victory_path": victory_path(content),
+    }
+    violations = [name for name, r in rules.items() if not r["ok"]]
+    return {"rules": rules, "violations": violations, "penalty": round(PENALTY * len(violations), 2)}
+
+def check_defense(content: str, earlier_turns: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """All rules for one defense turn; ``earlier_turns`` are the agent's previous
+    turns, read once in order (they may be paged in from disk)."""
+    carried = Carried()
+    for turn in earlier_turns:
+        carried.add(turn)
+    return _check(content, carried)
+
+def check_agents(agents, carried: Optional[Dict[str, Carried]] = None) -> Dict[str, Dict[str, Any]]:
+    """Rule results for each agent whose latest turn is a defense.  Pass the
+    same ``carried`` dict on every call so earlier turns are read only once."""
+    carried = {} if carried is None else carried
+    out = {}
+    for agent in agents:
+        if agent.transcript and agent.transcript[-1].get("round") == "defense":
+            state = carried.setdefault(agent.name, Carried())
+            state.catch_up(agent.transcript, len(agent.transcript) - 1)
+            out[agent.name] = _check(agent.transcript[-1]["content"], state)
+    return out
+
+def apply_penalties(scores: Dict[str, float], checks: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Subtract each agent's penalty from its 0-1 score, never below 0."""
+    return {name: round(max(0.0, score - checks.get(name, {}).get("penalty", 0.0)), 4)
+            for name, score in scores.items()}
@@ -0,0 +1,257 @@
+"""Search saved debates by topic, agent, model or content.
+
+A SQLite database (default ``debates.db``) holds one row per debate, turn and
+verdict, with FTS5 full-text indexes over topics, transcripts and verdicts.
+Turn embeddings from the sentence-transformers model (``agents.get_embedder``)
+can be stored alongside for similarity search; they are optional because
+embedding a corpus is far slower than tokenizing it.
+
+    python search.py index debate_*.json corpus.dta --vectors
+    python search.py query "carbon tax" --agent OpenAI --phase critique
+    python search.py similar "nuclear is the cheapest low-carbon baseload"
+"""
+from __future__ import annotations
+import argparse, glob, json, sqlite3
+from typing import Any, Dict, Iterable, List
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS debates (
+    id INTEGER PRIMARY KEY, source TEXT UNIQUE, topic TEXT, debate_type TEXT, agents TEXT, rounds INTEGER);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY, debate_id INTEGER, agent TEXT, model TEXT, provider TEXT,
+    phase TEXT, round_num INTEGER, content TEXT);
+CREATE TABLE IF NOT EXISTS verdicts (
+    id INTEGER PRIMARY KEY, debate_id INTEGER, round INTEGER, leader TEXT, text TEXT);
+CREATE TABLE IF NOT EXISTS turn_vectors (turn_id INTEGER PRIMARY KEY, vec BLOB);
+CREATE INDEX IF NOT EXISTS turns_debate ON turns(debate_id);
+CREATE INDEX IF NOT EXISTS turns_agent ON turns(agent, phase);
+CREATE INDEX IF NOT EXISTS turns_model ON turns(model);
+CREATE INDEX IF NOT EXISTS verdicts_debate ON verdicts(debate_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS debates_fts USING fts5(topic, content='debates', content_rowid='id');
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(content, content='turns', content_rowid='id');
+CREATE VIRTUAL TABLE IF NOT EXISTS verdicts_fts USING fts5(text, content='verdicts', content_rowid='id');
+"""
+
+def _verdict_text(verdict: Any) -> str:
+    """All the prose in a verdict (explanation, key facts / insights, ...)."""
+    if isinstance(verdict, str):
+        return verdict
+    if isinstance(verdict, dict):
+        return "\n".join(filter(None, (_verdict_text(v) for v in verdict.values())))
+    if isinstance(verdict, list):
+        return "\n".join(filter(None, (_verdict_text(v) for v in verdict)))
+    return ""
+
+class SearchIndex:
+    def __init__(self, path: str = "debates.db"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+        self._vectors = None  # (turn ids, normalized matrix) loaded on first similarity query
+
+    # ------------------ Indexing ------------------
+    def add_session(self, session: Dict[str, Any], source: str, vectors: bool = False) -> int:
+        """Index one ``serialize()`` session; re-adding a source replaces it."""
+        self.remove(source)
+        agents = session.get("agents", [])
+        cur = self.db.execute(
+            "INSERT INTO debates (source, topic, debate_type, agents, rounds) VALUES (?, ?, ?, ?, ?)",
+            (source, session.get("topic"), (session.get("config") or {}).get("debate_type"),
+             ", ".join(a["name"] for a in agents), len(session.get("history", []))))
+        debate_id = cur.lastrowid
+        self.db.execute("INSERT INTO debates_fts (rowid, topic) VALUES (?, ?)", (debate_id, session.get("topic") or ""))
+        turn_ids, texts = [], []
+        for agent in agents:
+            for turn in agent.get("transcript", []):
+                cur = self.db.execute(
+                    "INSERT INTO turns (debate_id, agent, model, provider, phase, round_num, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (debate_id, agent["name"], turn.get("model"), agent.get("provider"),
+                     turn.get("round"), turn.get("round_num"), turn.get("content", "")))
+                self.db.execute("INSERT INTO turns_fts (rowid, content) VALUES (?, ?)",
+                                (cur.lastrowid, turn.get("content", "")))
+                if vectors:  # only kept for the one batched encode below
+                    turn_ids.append(cur.lastrowid)
+                    texts.append(turn.get("content", ""))
+        for item in session.get("history", []):
+            text = _verdict_text(item.get("verdict"))
+            cur = self.db.execute("INSERT INTO verdicts (debate_id, round, leader, text) VALUES (?, ?, ?, ?)",
+                                  (debate_id, item.get("round"), item.get("leader"), text))
+            self.db.execute("INSERT INTO verdicts_fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, text))
+        if vectors and texts:
+            from agents import get_embedder
+            embs = get_embedder().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+            self.db.executemany("INSERT INTO turn_vectors (turn_id, vec) VALUES (?, ?)",
+                                [(tid, emb.astype("float32").tobytes()) for tid, emb in zip(turn_ids, embs)])
+            self._vectors = None
+        return debate_id
+
+    def remove(self, source: str):
+        row = self.db.execute("SELECT id, topic FROM debates WHERE source = ?", (source,)).fetchone()
+        if row is None:
+            return
+        debate_id = row["id"]
+        # External-content FTS tables need the old values to delete
+        self.db.execute("INSERT INTO debates_fts (debates_fts, rowid, topic) VALUES ('delete', ?, ?)",
+                        (debate_id, row["topic"] or ""))
+        for t in self.db.execute("SELECT id, content FROM turns WHERE debate_id = ?", (debate_id,)).fetchall():
+            self.db.execute("INSERT INTO turns_fts (turns_fts, rowid, content) VALUES ('delete', ?, ?)",
+                            (t["id"], t["content"]))
+            self.db.execute("DELETE FROM turn_vectors WHERE turn_id = ?", (t["id"],))
+        for v in self.db.execute("SELECT id, text FROM verdicts WHERE debate_id = ?", (debate_id,)).fetchall():
+            self.db.execute("INSERT INTO verdicts_fts (verdicts_fts, rowid, text) VALUES ('delete', ?, ?)",
+                            (v["id"], v["text"]))
+        for table in ("turns", "verdicts"):
+            self.db.execute(f"DELETE FROM {table} WHERE debate_id = ?", (debate_id,))
+        self.db.execute("DELETE FROM debates WHERE id = ?", (debate_id,))
+        self._vectors = None
+
+    def add_paths(self, paths: Iterable[str], vectors: bool = False) -> int:
+        """Index session JSON files and archives (``.dta``); returns debates added."""
+        from storage import Archive, load_session
+        count = 0
+        for path in paths:
+            if path.endswith(".dta"):
+                with Archive(path) as archive:
+                    for i, session in enumerate(archive):
+                        self.add_session(session, f"{path}#{i}", vectors)
+                        count += 1
+            else:
+                self.add_session(load_session(path), path, vectors)
+                count += 1
+            self.db.commit()
+        return count
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    # ------------------ Queries ------------------
+    @staticmethod
+    def _filters(agent=None, model=None, phase=None, debate_type=None):
+        clauses, params = [], []
+        for col, value in (("t.agent", agent), ("t.model", model), ("t.phase", phase), ("d.debate_type", debate_type)):
+            if value is not None:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        return "".join(f" AND {c}" for c in clauses), params
+
+    def search(self, query: str, agent: str = None, model: str = None, phase: str = None,
+               debate_type: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Turns matching an FTS5 ``query``, best first, with a highlighted snippet."""
+        where, params = self._filters(agent, model, phase, debate_type)
+        rows = self.db.execute(
+            "SELECT d.source, d.topic, t.agent, t.model, t.phase, t.round_num, "
+            "snippet(turns_fts, 0, '[', ']', '…', 16) AS snippet, bm25(turns_fts) AS rank "
+            "FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid JOIN debates d ON d.id = t.debate_id "
+            f"WHERE turns_fts MATCH ?{where} ORDER BY rank LIMIT ?",
+            [query, *params, limit])
+        return [dict(r) for r in rows]
+
+    def search_verdicts(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = self.db.execute(
+            "SELECT d.source, d.topic, v.round, v.leader, snippet(verdicts_fts, 0, '[', ']', '…', 16) AS snippet "
+            "FROM verdicts_fts JOIN verdicts v ON v.id = verdicts_fts.rowid JOIN debates d ON d.id = v.debate_id "
+            "WHERE verdicts_fts MATCH ? ORDER BY bm25(verdicts_fts) LIMIT ?", (query, limit))
+        return [dict(r) for r in rows]
+
+    def debates(self, topic: str = None, agent: str = None, model: str = None,
+                limit: int = 50) -> List[Dict[str, Any]]:
+        """Debates whose topic matches ``topic`` (FTS5 query) and that include the agent / model."""
+        sql = "SELECT d.* FROM debates d"
+        clauses, params = [], []
+        if topic:
+            sql += " JOIN debates_fts ON debates_fts.rowid = d.id"
+            clauses.append("debates_fts MATCH ?")
+            params.append(topic)
+        for col, value in (("agent", agent), ("model", model)):
+            if value is not None:
+                clauses.append(f"EXISTS (SELECT 1 FROM turns t WHERE t.debate_id = d.id AND t.{col} = ?)")
+                params.append(value)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return [dict(r) for r in self.db.execute(sql + " LIMIT ?", [*params, limit])]
+
+    def _load_vectors(self):
+        import numpy as np
+        if self._vectors is None:
+            rows = self.db.execute("SELECT turn_id, vec FROM turn_vectors ORDER BY turn_id").fetchall()
+            ids = np.array([r["turn_id"] for r in rows], dtype=np.int64)
+            matrix = np.frombuffer(b"".join(r["vec"] for r in rows), dtype=np.float32)
+            self._vectors = (ids, matrix.reshape(len(rows), -1) if len(rows) else matrix.reshape(0, 0))
+        return self._vectors
+
+    def similar(self, text: str, k: int = 10, agent: str = None, model: str = None,
+                phase: str = None, debate_type: str = None) -> List[Dict[str, Any]]:
+        """Turns closest to ``text`` by cosine similarity (needs an index built with vectors)."""
+        import numpy as np
+        from agents import get_embedder
+        ids, matrix = self._load_vectors()
+        if not len(ids):
+            return []
+        query = get_embedder().encode(text, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+        sims = matrix @ query
+        where, params = self._filters(agent, model, phase, debate_type)
+        candidates = np.arange(len(ids))
+        if params:
+            # Filter in SQL first, so k hits come back whenever k matching turns exist
+            allowed = [r[0] for r in self.db.execute(
+                "SELECT t.id FROM turns t JOIN debates d ON d.id = t.debate_id "
+                f"JOIN turn_vectors v ON v.turn_id = t.id WHERE 1 = 1{where}", params)]
+            candidates = np.flatnonzero(np.isin(ids, np.array(allowed, dtype=np.int64)))
+            if not len(candidates):
+                return []
+        take = min(len(candidates), k)
+        top = candidates[np.argpartition(-sims[candidates], take - 1)[:take]]
+        top = top[np.argsort(-sims[top])]
+        out = []
+        for i in top:
+            row = self.db.execute(
+                "SELECT d.source, d.topic, t.agent, t.model, t.phase, t.round_num, substr(t.content, 1, 200) AS snippet "
+                "FROM turns t JOIN debates d ON d.id = t.debate_id WHERE t.id = ?", (int(ids[i]),)).fetchone()
+            if row is not None:
+                out.append(dict(row, score=float(sims[i])))
+        return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Index and search saved debates")
+    ap.add_argument("--db", default="debates.db")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("index", help="index session JSON files / .dta archives")
+    p.add_argument("paths", nargs="*", help="default: debate_*.json")
+    p.add_argument("--vectors", action="store_true", help="also store turn embeddings")
+    for name in ("query", "similar"):
+        p = sub.add_parser(name)
+        p.add_argument("text")
+        p.add_argument("--agent")
+        p.add_argument("--model")
+        p.add_argument("--phase", choices=["position", "critique", "defense"])
+        p.add_argument("--limit", type=int, default=10)
+    p = sub.add_parser("verdicts")
+    p.add_argument("text")
+    p.add_argument("--limit", type=int, default=10)
+    args = ap.parse_args()
+
+    index = SearchIndex(args.db)
+    try:
+        if args.cmd == "index":
+            paths = args.paths or sorted(glob.glob("debate_*.json"))
+            print(f"Indexed {index.add_paths(paths, vectors=args.vectors)} debates into {args.db}")
+            return
+        if args.cmd == "query":
+            hits = index.search(args.text, args.agent, args.model, args.phase, limit=args.limit)
+        elif args.cmd == "similar":
+            hits = index.similar(args.text, args.limit, args.agent, args.model, args.phase)
+        else:
+            hits = index.search_verdicts(args.text, args.limit)
+        for hit in hits:
+            print(json.dumps(hit, ensure_ascii=False))
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
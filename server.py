@@ -0,0 +1,352 @@
+"""Server mode: REST + SSE/WebSocket API over ``DebateOrchestrator``.
+
+Every debate lives in one process on one event loop, so frontends and batch
+jobs share the pooled provider connections and the loaded embedder.  Built on
+tornado, which streamlit already depends on.
+
+    python server.py --port 8765 [--allow-origin https://app.example]
+
+Request bodies are JSON (``Content-Type: application/json``).  WebSockets
+accept same-origin pages plus the ``--allow-origin`` list.
+
+Routes
+    POST   /debates                  create  {topic, agents, judge? (one cfg or a list), debate_type?, opposition_mode?}
+    GET    /debates                  list ids + status
+    GET    /debates/{id}             snapshot
+    POST   /debates/{id}/advance     run phases {phases?: 1, wait?: false}
+    POST   /debates/{id}/stop        stop and cancel the running phase
+    DELETE /debates/{id}             stop and forget
+    GET    /debates/{id}/events      server-sent events (resume with Last-Event-ID or ?since=)
+    WS     /debates/{id}/ws          events out; {"op": "advance"|"stop"|"snapshot"} in
+"""
+from __future__ import annotations
+import argparse, asyncio, json, uuid
+from typing import List, Dict, Any, Optional, Tuple
+import tornado.web, tornado.websocket, tornado.iostream
+import providers, profiling
+from orchestrator import DebateConfig, DebateOrchestrator
+
+DEFAULT_JUDGE = {"name": "Judge", "provider_name": "openai", "model": "gpt-4o-mini"}
+
+_MODEL_FIELDS = ("name", "provider_name", "model")
+_JUDGE_FIELDS = set(_MODEL_FIELDS) | {"cascade"}
+
+def _model_cfg(cfg: Any, what: str, judge: bool = False) -> Dict[str, Any]:
+    """Reject a malformed agent / judge config with a ValueError (400) rather
+    than letting it fail deep inside the orchestrator (500)."""
+    if not isinstance(cfg, dict):
+        raise ValueError(f"{what} must be an object with {', '.join(_MODEL_FIELDS)}")
+    for field in _MODEL_FIELDS:
+        if not isinstance(cfg.get(field), str) or not cfg[field]:
+            raise ValueError(f"{what}: '{field}' must be a non-empty string")
+    if "cascade" in cfg and not isinstance(cfg["cascade"], dict):
+        raise ValueError(f"{what}: 'cascade' must be an object")
+    if judge and set(cfg) - _JUDGE_FIELDS:
+        raise ValueError(f"{what}: unknown field(s) {sorted(set(cfg) - _JUDGE_FIELDS)}")
+    return cfg
+
+def _int(body: Dict[str, Any], key: str, default: int) -> int:
+    try:
+        return int(body.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be an integer")
+
+class DebateSession:
+    """One debate plus its append-only event log and subscriber wake-up."""
+    def __init__(self, orch: DebateOrchestrator, topic: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.orch = orch
+        self.topic = topic
+        self.events: List[Dict[str, Any]] = []
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+        orch.listeners.append(self._on_event)
+
+    def _on_event(self, event: str, data: Dict[str, Any]):
+        self.events.append({"seq": len(self.events), "event": event, "data": data})
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_events(self, since: int, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """Events with seq >= since; blocks until one arrives or timeout (for keep-alives)."""
+        if since >= len(self.events):
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.events[since:]
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def advance(self, phases: int = 1) -> asyncio.Task:
+        if self.running:
+            raise RuntimeError("A phase is already running")
+
+        # One call, so the orchestrator can pipeline the phases
+        self.task = asyncio.get_running_loop().create_task(self.orch.next_round(self.topic, phases))
+        self.task.add_done_callback(self._on_done)
+        return self.task
+
+    def _on_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        err = task.exception()
+        if err is not None:
+            self._on_event("error", {"error": f"{type(err).__name__}: {err}"})
+
+    def stop(self):
+        self.orch.stop()  # cancels in-flight provider calls, keeps partial turns
+        if self.running:
+            self.task.cancel()
+        self._on_event("stopped", {"round_num": self.orch.round_num, "phase": self.orch.phase})
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "round_num": self.orch.round_num,
+            "phase": self.orch.phase,
+            "stopped": self.orch.stopped,
+            "running": self.running,
+            "events": len(self.events),
+            **self.orch.serialize(),
+        }
+
+class DebateService:
+    def __init__(self):
+        self.sessions: Dict[str, DebateSession] = {}
+
+    def create(self, body: Dict[str, Any]) -> DebateSession:
+        topic = body.get("topic")
+        agents = body.get("agents") or []
+        if not topic or not isinstance(agents, list) or len(agents) < 2:
+            raise ValueError("'topic' and at least two 'agents' are required")
+        for i, cfg in enumerate(agents):
+            _model_cfg(cfg, f"agents[{i}]")
+        judge = body.get("judge") or dict(DEFAULT_JUDGE)
+        if isinstance(judge, list):
+            for i, cfg in enumerate(judge):
+                _model_cfg(cfg, f"judge[{i}]", judge=True)
+        else:
+            _model_cfg(judge, "judge", judge=True)
+        conf = DebateConfig(
+            agents, judge, bool(body.get("auto", False)),
+            body.get("debate_type", "non-binary"), bool(body.get("opposition_mode", False)),
+            body.get("affirmative_agents"), body.get("negative_agents"),
+            redundancy_threshold=body.get("redundancy_threshold"),
+            redundancy_mode=body.get("redundancy_mode", "mark"),
+            judge_aggregate=body.get("judge_aggregate", "median"),
+            judge_quorum=body.get("judge_quorum"),
+            incremental_judging=bool(body.get("incremental_judging", False)),
+            keep_rounds=body.get("keep_rounds"),
+            critique_topology=body.get("critique_topology", "all"),
+            critique_k=_int(body, "critique_k", 2),
+        )
+        sess = DebateSession(DebateOrchestrator(conf), topic)
+        self.sessions[sess.id] = sess
+        return sess
+
+    def get(self, debate_id: str) -> DebateSession:
+        if debate_id not in self.sessions:
+            raise tornado.web.HTTPError(404, reason=f"Unknown debate '{debate_id}'")
+        return self.sessions[debate_id]
+
+    def delete(self, debate_id: str):
+        self.get(debate_id).stop()
+        del self.sessions[debate_id]
+
+# ------------------ Handlers ------------------
+class _Base(tornado.web.RequestHandler):
+    def initialize(self, service: DebateService):
+        self.service = service
+
+    def body_json(self) -> Dict[str, Any]:
+        if not self.request.body:
+            return {}
+        ctype = self.request.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if ctype != "application/json":
+            raise tornado.web.HTTPError(415, reason="Content-Type must be application/json")
+        try:
+            body = json.loads(self.request.body)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise tornado.web.HTTPError(400, reason=f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Expected a JSON object")
+        return body
+
+    def write_json(self, data, status: int = 200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(data))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason}, status_code)
+
+class DebatesHandler(_Base):
+    def get(self):
+        self.write_json([
+            {"id": s.id, "topic": s.topic, "round_num": s.orch.round_num,
+             "phase": s.orch.phase, "stopped": s.orch.stopped, "running": s.running}
+            for s in self.service.sessions.values()
+        ])
+
+    def post(self):
+        try:
+            sess = self.service.create(self.body_json())
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        self.write_json(sess.snapshot(), 201)
+
+class DebateHandler(_Base):
+    def get(self, debate_id):
+        self.write_json(self.service.get(debate_id).snapshot())
+
+    def delete(self, debate_id):
+        self.service.delete(debate_id)
+        self.set_status(204)
+        self.finish()
+
+class AdvanceHandler(_Base):
+    async def post(self, debate_id):
+        sess = self.service.get(debate_id)
+        body = self.body_json()
+        if sess.orch.stopped:
+            raise tornado.web.HTTPError(409, reason="Debate is stopped")
+        try:
+            phases = _int(body, "phases", 1)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        try:
+            task = sess.advance(phases)
+        except RuntimeError as e:
+            raise tornado.web.HTTPError(409, reason=str(e))
+        if body.get("wait"):
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                raise tornado.web.HTTPError(502, reason=f"{type(e).__name__}: {e}")
+            self.write_json(sess.snapshot())
+        else:
+            self.write_json(sess.snapshot(), 202)
+
+class StopHandler(_Base):
+    def post(self, debate_id):
+        sess = self.service.get(debate_id)
+        sess.stop()
+        self.write_json(sess.snapshot())
+
+class EventsHandler(_Base):
+    """Server-sent events; a comment line every 15s keeps proxies from timing out."""
+    async def get(self, debate_id):
+        sess = self.service.get(debate_id)
+        try:
+            since = int(self.request.headers.get("Last-Event-ID", -1)) + 1 \
+                if "Last-Event-ID" in self.request.headers else int(self.get_argument("since", "0"))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Last-Event-ID / 'since' must be an integer")
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        try:
+            while True:
+                batch = await sess.wait_events(since)
+                if not batch:
+                    self.write(": keep-alive\n\n")
+                for ev in batch:
+                    self.write(f"id: {ev['seq']}\nevent: {ev['event']}\ndata: {json.dumps(ev['data'])}\n\n")
+                    since = ev["seq"] + 1
+                await self.flush()
+                if sess.orch.stopped and not sess.running and since >= len(sess.events):
+                    break
+        except tornado.iostream.StreamClosedError:
+            return
+        self.finish()
+
+class DebateSocket(tornado.websocket.WebSocketHandler):
+    def initialize(self, service: DebateService, origins: Tuple[str, ...] = ()):
+        self.service = service
+        self.origins = origins
+        self._pump: Optional[asyncio.Task] = None
+
+    def check_origin(self, origin):
+        # Same-origin (tornado's check) or an explicitly allowed frontend
+        return origin.rstrip("/") in self.origins or super().check_origin(origin)
+
+    def open(self, debate_id):
+        self.sess = self.service.get(debate_id)
+        try:
+            since = int(self.get_argument("since", "0"))
+        except ValueError:
+            self.close(1008, "'since' must be an integer")
+            return
+        self._pump = asyncio.get_running_loop().create_task(self._send_events(since))
+
+    async def _send_events(self, since: int):
+        try:
+            while True:
+                for ev in await self.sess.wait_events(since):
+                    await self.write_message(json.dumps(ev))
+                    since = ev["seq"] + 1
+        except tornado.websocket.WebSocketClosedError:
+            pass
+
+    async def on_message(self, message):
+        try:
+            msg = json.loads(message)
+        except json.JSONDecodeError:
+            await self.write_message(json.dumps({"event": "error", "data": {"error": "Invalid JSON"}}))
+            return
+        op = msg.get("op")
+        try:
+            if op == "advance":
+                self.sess.advance(_int(msg, "phases", 1))
+            elif op == "stop":
+                self.sess.stop()
+            elif op == "snapshot":
+                await self.write_message(json.dumps({"event": "snapshot", "data": self.sess.snapshot()}))
+            else:
+                raise RuntimeError(f"Unknown op '{op}'")
+        except (RuntimeError, ValueError) as e:
+            await self.write_message(json.dumps({"event": "error", "data": {"error": str(e)}}))
+
+    def on_close(self):
+        if self._pump:
+            self._pump.cancel()
+
+def make_app(service: Optional[DebateService] = None, origins=()) -> tornado.web.Application:
+    """``origins`` are the cross-origin pages (``scheme://host[:port]``) allowed to open WebSockets."""
+    args = {"service": service or DebateService()}
+    socket_args = {**args, "origins": tuple(o.rstrip("/") for o in origins)}
+    return tornado.web.Application([
+        (r"/debates", DebatesHandler, args),
+        (r"/debates/([0-9a-f]+)", DebateHandler, args),
+        (r"/debates/([0-9a-f]+)/advance", AdvanceHandler, args),
+        (r"/debates/([0-9a-f]+)/stop", StopHandler, args),
+        (r"/debates/([0-9a-f]+)/events", EventsHandler, args),
+        (r"/debates/([0-9a-f]+)/ws", DebateSocket, socket_args),
+    ])
+
+async def serve(host: str, port: int, origins=()):
+    app = make_app(origins=origins)
+    app.listen(port, address=host)
+    print(f"Debate server listening on http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await providers.aclose()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve debates over HTTP / SSE / WebSocket.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--allow-origin", action="append", default=[], metavar="ORIGIN",
+                    help="page origin allowed to open WebSockets besides same-origin (repeatable)")
+    profiling.add_arguments(ap)
+    args = ap.parse_args(argv)
+    profiling.configure(args)
+    asyncio.run(serve(args.host, args.port, args.allow_origin))
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,394 @@
-import json, datetime, os
+import json, datetime, os, struct, sys, tempfile, threading, weakref, zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import summaries, profiling
 
 def save_session(path: str, orchestrator):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(orchestrator.serialize(), f, indent=2)
+    # Streamed, so spilled turns are paged in one at a time
+    with open(path, "w", encoding="utf-8") as f, profiling.span("session.save"):
+        _dump(orchestrator.serialize(lazy=True), f)
 
 def load_session(path: str):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
+
+def _dump(obj, f, level: int = 0):
+    """``json.dump(obj, f, indent=2)`` that writes sequences item by item."""
+    pad = "\n" + "  " * (level + 1)
+    if isinstance(obj, dict) and obj:
+        f.write("{")
+        for i, (k, v) in enumerate(obj.items()):
+            f.write(("," if i else "") + pad + json.dumps(str(k)) + ": ")
+            _dump(v, f, level + 1)
+        f.write("\n" + "  " * level + "}")
+    elif isinstance(obj, (list, tuple, SpilledList)) and len(obj):
+        f.write("[")
+        for i, v in enumerate(obj):
+            f.write(("," if i else "") + pad)
+            _dump(v, f, level + 1)
+        f.write("\n" + "  " * level + "]")
+    else:
+        f.write(json.dumps(obj))
+
+# ---------------- Spilling old rounds ---------------
+# Long debates keep only recent rounds in memory: older turns / verdicts move
+# their text to an append-only file of zlib blobs and stay behind as light
+# stubs (round, phase, model, summary, scores...) holding the blob's offset.
+
+SPILLED = "_spilled"  # stub key → [offset, length]
+
+class SpillStore:
+    """Append-only spill file, removed when the store is closed or collected."""
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="debate_spill_", suffix=".bin", dir=os.getenv("SPILL_DIR"))
+            os.close(fd)
+        self.path = path
+        self._f = open(path, "a+b")
+        self._lock = threading.Lock()
+        self._close = weakref.finalize(self, _remove_spill, self._f, path)
+
+    def put(self, obj: Any) -> List[int]:
+        blob = zlib.compress(json.dumps(obj).encode("utf-8"), 6)
+        with self._lock:
+            self._f.seek(0, os.SEEK_END)
+            offset = self._f.tell()
+            self._f.write(blob)
+            self._f.flush()
+        return [offset, len(blob)]
+
+    def get(self, offset: int, length: int) -> Any:
+        with self._lock:
+            self._f.seek(offset)
+            blob = self._f.read(length)
+        return json.loads(zlib.decompress(blob))
+
+    def close(self):
+        self._close()
+
+def _remove_spill(f, path):
+    f.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class SpilledList(MutableSequence):
+    """List of dicts whose ``heavy`` keys can be moved to a ``SpillStore``.
+
+    Indexing, slicing and iteration return full dicts, paging spilled ones
+    back in (through a small LRU) one at a time; ``stubs()`` walks the light
+    fields without any I/O.  Items that are not spilled are returned as is,
+    so in-place updates to recent turns behave like a plain list.
+    """
+    def __init__(self, store: SpillStore, heavy: Iterable[str], items: Iterable[Dict[str, Any]] = (),
+                 cache_size: int = 32):
+        self.store = store
+        self.heavy = tuple(heavy)
+        self.cache_size = cache_size
+        self._items: List[Dict[str, Any]] = list(items)
+        self._cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+    def _load(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        ref = item.get(SPILLED)
+        if ref is None:
+            return item
+        full = self._cache.get(ref[0])
+        if full is None:
+            full = {k: v for k, v in item.items() if k != SPILLED}
+            full.update(self.store.get(*ref))
+            self._cache[ref[0]] = full
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(ref[0])
+        return full
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._load(item) for item in self._items[i]]
+        return self._load(self._items[i])
+
+    def __iter__(self):
+        for item in self._items:
+            yield self._load(item)
+
+    def __setitem__(self, i, value):
+        self._items[i] = value
+
+    def __delitem__(self, i):
+        del self._items[i]
+
+    def insert(self, i, value):
+        self._items.insert(i, value)
+
+    def __repr__(self):
+        spilled = sum(SPILLED in item for item in self._items)
+        return f"SpilledList({len(self)} items, {spilled} spilled)"
+
+    def stubs(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """``(index, item)`` pairs; spilled items lack their heavy keys."""
+        return enumerate(self._items)
+
+    def spill(self, predicate) -> int:
+        """Move the heavy keys of items matching ``predicate`` to disk."""
+        n = 0
+        for i, item in enumerate(self._items):
+            if SPILLED in item or not predicate(item):
+                continue
+            heavy = {k: item[k] for k in self.heavy if k in item}
+            if not heavy:
+                continue
+            stub = {k: v for k, v in item.items() if k not in heavy}
+            stub[SPILLED] = self.store.put(heavy)
+            self._items[i] = stub
+            n += 1
+        return n
+
+def stubs(items) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """``(index, item)`` pairs of a transcript / history without paging text in."""
+    return items.stubs() if isinstance(items, SpilledList) else enumerate(items)
+
+# ---------------- Debate archives ---------------
+# Many sessions in one file:
+#
+#   MAGIC | block 0 | block 1 | ... | string table | index | footer
+#
+# Each block is one zlib-compressed debate, so a debate is read with one seek
+# and one small decompress.  Agent names, models, providers, phases, topics and
+# whole configs are interned into the string table and blocks refer to them by
+# id.  The index holds one column per field (little-endian ``array`` data):
+# per debate its block offset/length and topic, per turn its
+# (debate, round, phase, agent) so corpus scans never touch the blocks.
+# Turn summaries are not stored; they are recomputed on load.
+
+ARCHIVE_MAGIC = b"DTARCH1\n"
+_FOOTER = struct.Struct("<QQQQ8s")
+_DEBATE_COLUMNS = {"offset": "Q", "length": "I", "topic": "I"}
+_TURN_COLUMNS = {"debate": "I", "round": "i", "phase": "I", "agent": "I", "agent_pos": "H", "turn_pos": "I"}
+_TURN_KEYS = ("round", "content", "model", "round_num", "summary")
+
+def _le(col: array) -> bytes:
+    if sys.byteorder == "big":
+        col = array(col.typecode, col)
+        col.byteswap()
+    return col.tobytes()
+
+def _from_le(typecode: str, data: bytes) -> array:
+    col = array(typecode)
+    col.frombytes(data)
+    if sys.byteorder == "big":
+        col.byteswap()
+    return col
+
+class ArchiveWriter:
+    """Append sessions (``orchestrator.serialize()`` dicts) to a new archive."""
+    def __init__(self, path: str, level: int = 9):
+        self.path = path
+        self.level = level
+        self._f = open(path, "wb")
+        self._f.write(ARCHIVE_MAGIC)
+        self._strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._debates = {k: array(t) for k, t in _DEBATE_COLUMNS.items()}
+        self._turns = {k: array(t) for k, t in _TURN_COLUMNS.items()}
+
+    def intern(self, s: Optional[str]) -> int:
+        """String id; 0 is reserved for None."""
+        if s is None:
+            return 0
+        if s not in self._ids:
+            self._strings.append(s)
+            self._ids[s] = len(self._strings)
+        return self._ids[s]
+
+    def add(self, session: Dict[str, Any]) -> int:
+        debate = len(self._debates["offset"])
+        agents = []
+        for pos, agent in enumerate(session.get("agents", [])):
+            turns = []
+            for i, turn in enumerate(agent.get("transcript", [])):
+                extra = {k: v for k, v in turn.items() if k not in _TURN_KEYS}
+                row = [self.intern(turn.get("round")), self.intern(turn.get("model")),
+                       turn.get("round_num", -1), turn.get("content", "")]
+                if extra:
+                    row.append(extra)
+                turns.append(row)
+                for col, value in (("debate", debate), ("round", turn.get("round_num", -1)),
+                                   ("phase", self.intern(turn.get("round"))),
+                                   ("agent", self.intern(agent.get("name"))),
+                                   ("agent_pos", pos), ("turn_pos", i)):
+                    self._turns[col].append(value)
+            agents.append({"name": self.intern(agent.get("name")),
+                           "provider": self.intern(agent.get("provider")), "turns": turns})
+        block = {
+            "topic": self.intern(session.get("topic")),
+            "config": self.intern(json.dumps(session.get("config"), sort_keys=True)),
+            "history": session.get("history", []),
+            "agents": agents,
+        }
+        extra = {k: v for k, v in session.items() if k not in ("topic", "config", "history", "agents")}
+        if extra:
+            block["extra"] = extra
+        data = zlib.compress(json.dumps(block, separators=(",", ":")).encode("utf-8"), self.level)
+        self._debates["offset"].append(self._f.tell())
+        self._debates["length"].append(len(data))
+        self._debates["topic"].append(block["topic"])
+        self._f.write(data)
+        return debate
+
+    def _write_section(self, payload: bytes) -> Tuple[int, int]:
+        data = zlib.compress(payload, self.level)
+        offset = self._f.tell()
+        self._f.write(data)
+        return offset, len(data)
+
+    def close(self):
+        if self._f.closed:
+            return
+        strings = self._write_section(json.dumps(self._strings, separators=(",", ":")).encode("utf-8"))
+        parts = []
+        for table in (self._debates, self._turns):
+            for name, col in table.items():
+                raw = _le(col)
+                parts.append(struct.pack("<H", len(name)) + name.encode() + col.typecode.encode()
+                             + struct.pack("<Q", len(raw)) + raw)
+        index = self._write_section(b"".join(parts))
+        self._f.write(_FOOTER.pack(*strings, *index, ARCHIVE_MAGIC))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Archive:
+    """Read-only view of an archive: ``len()``, ``archive[i]`` and index scans."""
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        if self._f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a debate archive")
+        self._f.seek(-_FOOTER.size, os.SEEK_END)
+        s_off, s_len, i_off, i_len, magic = _FOOTER.unpack(self._f.read(_FOOTER.size))
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is truncated (no footer)")
+        self.strings: List[Optional[str]] = [None] + json.loads(self._read(s_off, s_len))
+        self.columns: Dict[str, array] = {}
+        raw, pos = self._read(i_off, i_len), 0
+        while pos < len(raw):
+            (n,) = struct.unpack_from("<H", raw, pos)
+            name = raw[pos + 2:pos + 2 + n].decode()
+            typecode = chr(raw[pos + 2 + n])
+            (size,) = struct.unpack_from("<Q", raw, pos + 3 + n)
+            start = pos + 11 + n
+            self.columns[name] = _from_le(typecode, raw[start:start + size])
+            pos = start + size
+
+    def _read(self, offset: int, length: int) -> bytes:
+        self._f.seek(offset)
+        return zlib.decompress(self._f.read(length))
+
+    def __len__(self) -> int:
+        return len(self.columns["offset"])
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        """Decode debate ``i`` back into its ``serialize()`` form."""
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        block = json.loads(self._read(self.columns["offset"][i], self.columns["length"][i]))
+        s = self.strings
+        session = {
+            "topic": s[block["topic"]],
+            "config": json.loads(s[block["config"]]),
+            "history": block["history"],
+            "agents": [],
+        }
+        for agent in block["agents"]:
+            transcript = []
+            for row in agent["turns"]:
+                turn = {"round": s[row[0]], "content": row[3]}
+                if row[1]:
+                    turn["model"] = s[row[1]]
+                if row[2] != -1:
+                    turn["round_num"] = row[2]
+                turn["summary"] = summaries.summarize_turn(row[3])
+                if len(row) > 4:
+                    turn.update(row[4])
+                transcript.append(turn)
+            session["agents"].append({"name": s[agent["name"]], "provider": s[agent["provider"]],
+                                      "transcript": transcript})
+        session.update(block.get("extra", {}))
+        return session
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def topic(self, i: int) -> Optional[str]:
+        return self.strings[self.columns["topic"][i]]
+
+    def select(self, debate: Optional[int] = None, round: Optional[int] = None,
+               phase: Optional[str] = None, agent: Optional[str] = None) -> List[int]:
+        """Turn rows matching every given field, from the index alone."""
+        tests = []
+        for col, value in (("debate", debate), ("round", round),
+                           ("phase", self._sid(phase)), ("agent", self._sid(agent))):
+            if value is not None:
+                tests.append((self.columns[col], value))
+        rows = range(len(self.columns["debate"]))
+        for col, value in tests:
+            rows = [r for r in rows if col[r] == value]
+        return list(rows)
+
+    def _sid(self, s: Optional[str]) -> Optional[int]:
+        if s is None:
+            return None
+        if not hasattr(self, "_ids"):
+            self._ids = {v: i for i, v in enumerate(self.strings) if v is not None}
+        return self._ids.get(s, -1)
+
+    def turns(self, **filters) -> Iterator[Dict[str, Any]]:
+        """Matching turns with their debate index; each needed block is read once."""
+        current, session = None, None
+        for r in self.select(**filters):
+            d = self.columns["debate"][r]
+            if d != current:
+                current, session = d, self[d]
+            agent = session["agents"][self.columns["agent_pos"][r]]
+            yield dict(agent["transcript"][self.columns["turn_pos"][r]], debate=d, agent=agent["name"])
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def pack_sessions(paths: Iterable[str], archive_path: str) -> int:
+    """Pack saved ``debate_*.json`` sessions into one archive; returns the count."""
+    count = 0
+    with ArchiveWriter(archive_path) as w:
+        for path in paths:
+            w.add(load_session(path))
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    import argparse, glob
+    ap = argparse.ArgumentParser(description="Pack saved debate sessions into an archive")
+    ap.add_argument("archive")
+    ap.add_argument("sessions", nargs="*", help="session JSON files (default: debate_*.json)")
+    args = ap.parse_args()
+    paths = args.sessions or sorted(glob.glob("debate_*.json"))
+    n = pack_sessions(paths, args.archive)
+    before = sum(os.path.getsize(p) for p in paths)
+    print(f"Packed {n} sessions: {before} → {os.path.getsize(args.archive)} bytes")
@@ -1,10 +1,80 @@
-import asyncio, json, datetime, os, time  # Add time module here
+import asyncio, json, datetime, os, time, threading  # Add time module here
+import concurrent.futures
 import streamlit as st
+import providers, agents, summaries, profiling
 from orchestrator import DebateConfig, DebateOrchestrator
-from storage import save_session, load_session
+from phases import TOPOLOGIES
+from storage import save_session, load_session, stubs
+from search import SearchIndex
 
 st.set_page_config(page_title="Multi Agentic System Debate", layout="wide")
 
+# ------------- Process-wide resources (shared by all sessions) ----------------
+# One background event loop owns the HTTP connection pools and rate limiter
+# semaphores; every session submits its debate coroutines to it.  Only the
+# orchestrator itself lives in (per-session) st.session_state.
+@st.cache_resource
+def shared_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="debate-loop", daemon=True).start()
+    return loop
+
+@st.cache_resource
+def shared_embedder():
+    import embeddings
+    return embeddings.load()
+
+@st.cache_resource
+def shared_response_cache():
+    return providers.ResponseCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "2048")))
+
+@st.cache_resource
+def shared_rate_limiter():
+    return providers.RateLimiter(
+        max_concurrent=int(os.getenv("PROVIDER_CONCURRENCY", "8")),
+        min_interval=float(os.getenv("PROVIDER_MIN_INTERVAL", "0")),
+    )
+
+def gguf_models():
+    """Model files the embedded provider can load."""
+    folder = os.getenv("EMBEDDED_MODEL_DIR", "models")
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f for f in os.listdir(folder) if f.endswith(".gguf"))
+
+def run_round(orch, topic):
+    """Start ``orch``'s next round on the shared loop and wait for it."""
+    st.session_state.pending_round = asyncio.run_coroutine_threadsafe(orch.next_round(topic), shared_loop())
+    wait_round()
+
+def wait_round():
+    """Wait for the round in flight.  Ticking a placeholder while waiting lets
+    Streamlit deliver a click (Stop Debate) mid-round; the round keeps running
+    on the shared loop and is waited for again by the next script run."""
+    fut = st.session_state.get("pending_round")
+    if fut is None:
+        return
+    status, started = st.empty(), time.monotonic()
+    while not fut.done():
+        status.caption(f"⏳ Round in progress… {time.monotonic() - started:.0f}s")
+        concurrent.futures.wait([fut], timeout=0.25)
+    status.empty()
+    del st.session_state.pending_round
+    fut.result()
+
+providers.configure(cache=shared_response_cache(), limiter=shared_rate_limiter())
+agents.set_embedder(shared_embedder)
+
+KEEP_ROUNDS = 2  # rounds held in memory when "Keep only recent rounds" is ticked
+
+# Default judge model per provider
+JUDGE_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-haiku-20240307",
+    "mistral": "mistral-small",
+    "local": "llama3",
+}
+
 # ------------- Sidebar settings ----------------
 # Replace the header with an expander
 with st.sidebar.expander("Agent Config", expanded=True):
@@ -44,7 +114,7 @@ with st.sidebar.expander("Agent Config", expanded=True):
     for i in range(a_num):
         cfg = st.session_state.agent_cfgs[i]
         st.text_input(f"Agent {i+1} Name", value=cfg["name"], key=f"name{i}")
-        provider_options = ["openai", "anthropic", "mistral", "local"]
+        provider_options = ["openai", "anthropic", "mistral", "local", "embedded"]
         st.selectbox(
             "Provider", provider_options,
             index=provider_options.index(cfg["provider_name"]),
@@ -54,7 +124,8 @@ with st.sidebar.expander("Agent Config", expanded=True):
             "openai": ["gpt-4o-mini", "gpt-4", "gpt-3.5-turbo"],
             "anthropic": ["claude-3-sonnet-20240229", "claude-3-haiku-20240307", "claude-2.1"],
             "mistral": ["mistral-large-latest", "mistral-medium", "mistral-small"],
-            "local": ["llama3", "llama2", "mistral-7b", "custom"]
+            "local": ["llama3", "llama2", "mistral-7b", "custom"],
+            "embedded": gguf_models()
         }
         selected_provider = st.session_state.get(f"prov{i}", cfg["provider_name"])
         st.selectbox(
@@ -62,16 +133,113 @@ with st.sidebar.expander("Agent Config", expanded=True):
             index=model_options.get(selected_provider, [cfg["model"]]).index(cfg["model"]) if cfg["model"] in model_options.get(selected_provider, [cfg["model"]]) else 0,
             key=f"model{i}")
 
-    judge_model = st.text_input("Judge Model (OpenAI)", value="gpt-4o-mini")
+    st.checkbox(
+        "Incremental judging", value=False, key="incremental_judging",
+        help="Judge only each round's new turns (with cached per-turn checks) plus a "
+             "running scorecard, so judging cost stays flat as the debate grows")
+    judge_providers = st.multiselect(
+        "Judges", list(JUDGE_MODELS), default=["openai"], key="judge_providers",
+        help="Several judges are called in parallel and vote")
+    judge_models = {p: st.text_input(f"Judge model ({p})", value=JUDGE_MODELS[p], key=f"judge_model_{p}")
+                    for p in judge_providers}
+    if len(judge_providers) > 1:
+        st.selectbox("Combine verdicts by", ["median", "majority"], key="judge_aggregate",
+                     help="median: per-agent median score; majority: the agent most judges pick")
+        st.number_input("Quorum", min_value=1, max_value=len(judge_providers),
+                        value=len(judge_providers) // 2 + 1, key="judge_quorum",
+                        help="Return as soon as this many judges agree on the leader")
     auto_run = st.checkbox("Auto‑advance rounds", value=False)
+    cache_responses = st.checkbox(
+        "Reuse cached responses", value=False, key="cache_responses",
+        help="Answer repeated prompts from the response cache shared by all sessions")
+    cheap_critiques = st.checkbox(
+        "Cheap-first critiques", value=False, key="cheap_critiques",
+        help="Draft critiques with each provider's small model and escalate to the "
+             "agent's model only when the draft fails a quality check")
+    topology = st.selectbox(
+        "Critique topology", list(TOPOLOGIES), key="critique_topology",
+        help="Who critiques whom: all = every other agent; ring = the next agent; "
+             "round_robin / divergent (least similar positions) / random = k peers each, "
+             "with every position critiqued at least once")
+    if topology in ("round_robin", "divergent", "random"):
+        st.number_input("Critiques per agent (k)", min_value=1, max_value=max(1, a_num - 1),
+                        value=min(2, max(1, a_num - 1)), key="critique_k")
+    st.checkbox(
+        "Drop repeated arguments", value=False, key="drop_repeats",
+        help="Leave paragraphs that restate an agent's earlier turns out of later "
+             "critique / defense prompts and the judge's view (full text stays in the transcript)")
+    st.checkbox(
+        "Keep only recent rounds in memory", value=False, key="spill_rounds",
+        help=f"Move rounds older than the last {KEEP_ROUNDS} to a temporary file and page them "
+             "back in when viewed, so long debates don't keep growing in memory")
+    st.text_input(
+        "Bibliography file", value=os.getenv("CITATION_BIBLIOGRAPHY", ""), key="bibliography",
+        help="Optional .bib / .json / one-MLA-entry-per-line reference list that cited works are checked against")
+
+# Small model per provider for cheap-first critiques
+CHEAP_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-haiku-20240307",
+    "mistral": "mistral-small",
+}
+TOTAL_ROUNDS = 5  # Assume 5 rounds is a full debate
+SEARCH_DB = os.getenv("SEARCH_DB", "debates.db")
+REDUNDANCY_THRESHOLD = 0.9  # cosine similarity that counts as a restatement
 
 # Keep these sections outside the expander
 st.sidebar.markdown("---")
 if st.sidebar.button("Save Session") and "orch" in st.session_state:
     path = f"debate_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     save_session(path, st.session_state.orch)
+    try:
+        index = SearchIndex(SEARCH_DB)
+        try:
+            # Lazy, like the save: spilled turns are paged in one at a time
+            index.add_session(st.session_state.orch.serialize(lazy=True), path)
+        finally:
+            index.close()
+    except Exception as e:
+        print(f"Search indexing failed for {path}: {e}")
     st.sidebar.success(f"Saved → {path}")
 
+with st.sidebar.expander("Profiling"):
+    # Process-wide: spans and samples from every session go into one trace
+    spans_on = st.checkbox("Record timing spans", value=profiling.spans_enabled(), key="profile_spans",
+                           help="Time prompt building, judge state / parsing, embedding, provider calls and rendering")
+    sample_on = st.checkbox("Sampling profiler", value=profiling.sampling(), key="profile_sample",
+                            help="Snapshot every thread's stack every few ms (collapsed stacks for flame graphs)")
+    if spans_on != profiling.spans_enabled() or sample_on != profiling.sampling():
+        profiling.disable(spans=not spans_on, sample=not sample_on)
+        profiling.enable(spans=spans_on, sample=sample_on)
+    trace_path = st.text_input("Trace file", value=os.getenv("PROFILE_OUT", "trace.json"), key="profile_out",
+                               help="Chrome trace (chrome://tracing, Perfetto); name it *.otlp.json for OpenTelemetry")
+    if st.button("Export profile"):
+        st.success("Wrote " + ", ".join(profiling.export(trace_path)))
+        st.dataframe(profiling.summary(top=10), hide_index=True)
+        if profiling.top_samples(1):
+            st.dataframe(profiling.top_samples(10), hide_index=True)
+
+with st.sidebar.expander("Search saved debates"):
+    query = st.text_input("Full-text query", key="search_query",
+                          help="SQLite FTS5 syntax, e.g. carbon AND tax, \"exact phrase\", nucle*")
+    if query and os.path.exists(SEARCH_DB):
+        try:
+            index = SearchIndex(SEARCH_DB)
+            try:
+                hits = index.search(query, limit=10)
+            finally:
+                index.close()
+        except Exception as e:
+            hits = []
+            st.warning(f"Search failed: {e}")
+        for hit in hits:
+            st.markdown(f"**{hit['agent']}** · {hit['phase']} · _{hit['topic']}_  \n"
+                        f"`{hit['source']}` — {hit['snippet']}")
+        if not hits:
+            st.caption("No matches.")
+    elif query:
+        st.caption("No index yet — save a session or run `python search.py index`.")
+
 # Always show file uploader (not conditional on button click)
 uploaded = st.sidebar.file_uploader("Load Debate Session", type="json", key="debate_file")
 
@@ -97,7 +265,10 @@ if uploaded and st.sidebar.button("Load Selected File"):
             agents_cfg = data["config"]["agents_cfg"]
             judge_cfg = data["config"]["judge_cfg"]
             auto = data["config"]["auto"]
-            config = DebateConfig(agents_cfg, judge_cfg, auto)
+            config = DebateConfig(agents_cfg, judge_cfg, auto,
+                                  keep_rounds=data["config"].get("keep_rounds"),
+                                  critique_topology=data["config"].get("critique_topology", "all"),
+                                  critique_k=data["config"].get("critique_k", 2))
             
             # Create a new orchestrator with the config
             orch = DebateOrchestrator(config)
@@ -109,18 +280,16 @@ if uploaded and st.sidebar.button("Load Selected File"):
             # Determine current phase based on last agent transcript entry
             if data["agents"] and data["agents"][0]["transcript"]:
                 last_round_type = data["agents"][0]["transcript"][-1]["round"]
-                if last_round_type == "position":
-                    orch.phase = "critique"
-                elif last_round_type == "critique":
-                    orch.phase = "defense"
-                elif last_round_type == "defense":
-                    orch.phase = "position"
-                    orch.round_num += 1
+                if last_round_type in orch.graph.index:
+                    orch.phase, new_round = orch.graph.following(last_round_type)
+                    orch.round_num += new_round
             
             # Restore agent transcripts
             for i, agent_data in enumerate(data["agents"]):
                 if i < len(orch.agents):  # Make sure we don't go out of bounds
                     orch.agents[i].transcript = agent_data["transcript"]
+            orch.ensure_summaries()
+            orch.spill_old_rounds()
             
             # Save to session state
             st.session_state.orch = orch
@@ -162,6 +331,15 @@ def start_debate(topic):
             "model": st.session_state[f"model{i}"],
         }
         
+        # Critique on a cheaper sibling model first when one exists
+        cheap_model = CHEAP_MODELS.get(agent_cfg["provider_name"])
+        if st.session_state.get("cheap_critiques", False) and cheap_model and cheap_model != agent_cfg["model"]:
+            agent_cfg["cascade"] = {"critique": {
+                "models": [{"provider_name": agent_cfg["provider_name"], "model": cheap_model}],
+                "min_words": 80,
+                "require": ["Damage Assessment"],
+            }}
+        
         # Add position stance for opposition mode
         if st.session_state.get("opposition_mode", False):
             if str(i) in st.session_state.get("affirmative_agents", []):
@@ -173,7 +351,10 @@ def start_debate(topic):
         
         cfgs.append(agent_cfg)
     
-    judge_cfg = {"name": "Judge", "provider_name": "openai", "model": judge_model}
+    judge_cfg = [{"name": f"Judge ({p})", "provider_name": p, "model": m}
+                 for p, m in judge_models.items()] or [{"name": "Judge", "provider_name": "openai", "model": "gpt-4o-mini"}]
+    if len(judge_cfg) == 1:
+        judge_cfg = dict(judge_cfg[0], name="Judge")
     
     # Get settings from session state
     auto_run = st.session_state.get("auto_advance", False)
@@ -185,22 +366,24 @@ def start_debate(topic):
     # Create debate config with opposition mode settings
     conf = DebateConfig(
         cfgs, judge_cfg, auto_run, debate_type,
-        opposition_mode, affirmative_agents, negative_agents
+        opposition_mode, affirmative_agents, negative_agents,
+        st.session_state.get("cache_responses", False), None,
+        REDUNDANCY_THRESHOLD if st.session_state.get("drop_repeats", False) else None,
+        judge_aggregate=st.session_state.get("judge_aggregate", "median"),
+        judge_quorum=st.session_state.get("judge_quorum"),
+        incremental_judging=st.session_state.get("incremental_judging", False),
+        bibliography=st.session_state.get("bibliography") or None,
+        keep_rounds=KEEP_ROUNDS if st.session_state.get("spill_rounds", False) else None,
+        critique_topology=st.session_state.get("critique_topology", "all"),
+        critique_k=st.session_state.get("critique_k", 2)
     )
     st.session_state.orch = DebateOrchestrator(conf)
     st.session_state.topic = topic
     
     # Run the first round asynchronously
     try:
-        # Create and set the event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        # Run the first round and wait for it to complete
-        loop.run_until_complete(st.session_state.orch.next_round(topic))
-        
-        # Close the loop properly
-        loop.close()
+        # Run the first round on the shared loop and wait for it to complete
+        run_round(st.session_state.orch, topic)
         
         # Set timestamp for last update
         st.session_state.last_update = datetime.datetime.now().isoformat()
@@ -318,7 +501,8 @@ with button_col:
         if not is_stopped:
             # Stop debate button
             if st.button("Stop Debate", type="secondary", key="main_action"):
-                st.session_state.orch.stopped = True
+                # Cancels the round in flight; partial replies are kept
+                st.session_state.orch.stop()
                 st.session_state.orch.config.auto = False
                 st.session_state.auto_advance = False
                 st.rerun()
@@ -337,20 +521,21 @@ with button_col:
 # Advance Round button (only appears in manual mode, but in consistent position)
 advance_col = st.container()
 with advance_col:
-    if debate_in_progress and not is_auto_mode and not is_stopped:
+    if st.session_state.get("pending_round") is not None:
+        # A click interrupted the wait for a round: pick it up again
+        try:
+            wait_round()
+        except Exception as e:
+            st.error(f"Error advancing round: {e}")
+        else:
+            st.rerun()
+    elif debate_in_progress and not is_auto_mode and not is_stopped:
         orch = st.session_state.orch
         advance_key = f"advance_{orch.round_num}_{orch.phase}"
         if st.button("Advance Round", key=advance_key, type="primary"):
             try:
-                # Create and set the event loop
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                # Run the next round and wait for it to complete
-                loop.run_until_complete(orch.next_round(st.session_state.topic))
-                
-                # Close the loop properly
-                loop.close()
+                # Run the next round on the shared loop and wait for it to complete
+                run_round(orch, st.session_state.topic)
                 
                 # Store the orchestrator's state in session state
                 st.session_state.orch = orch
@@ -364,40 +549,24 @@ with advance_col:
         # Empty placeholder to maintain layout
         st.markdown("&nbsp;", unsafe_allow_html=True)
 
-# Process auto-advance if enabled
-if debate_in_progress and is_auto_mode and not is_stopped:
-    orch = st.session_state.orch
-    
-    # Create a placeholder for auto-advance status
-    auto_status = st.empty()
-    auto_status.info("Auto-advancing rounds...")
-    
-    try:
-        # Create and set the event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        # Run the next round
-        loop.run_until_complete(orch.next_round(st.session_state.topic))
-        
-        # Close the loop properly
-        loop.close()
-        
-        # Update session state
-        st.session_state.orch = orch
-        st.session_state.last_update = datetime.datetime.now().isoformat()
-        
-        # Add a short delay to prevent UI flashing too quickly
-        time.sleep(1)
-        
-        # Rerun to continue auto-advancing
-        st.rerun()
-    except Exception as e:
-        st.error(f"Auto-advance error: {e}")
-        # Turn off auto but don't stop the debate
-        orch.config.auto = False
-        st.session_state.auto_advance = False
-        st.session_state.orch = orch
+# Long transcripts are shown a page at a time
+TURNS_PER_PAGE = 6
+
+def paginate(items, key, per_page=TURNS_PER_PAGE):
+    """Return the slice of ``items`` for the page picked in a small pager.
+    Pages are in chronological order; the last (newest) one is selected by default."""
+    pages = max(1, -(-len(items) // per_page))
+    if pages == 1:
+        return items
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=pages, key=key)
+    start = (int(page) - 1) * per_page
+    return items[start:start + per_page]
+
+# Fragments rerun on their own, so paging a transcript doesn't redraw the page
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
+
+# Placeholder for the auto-advance status, filled at the end of the script
+auto_status = st.empty()
 
 # Async poll helper
 async def poll_loop():
@@ -429,26 +598,94 @@ if "orch" in st.session_state:
     agent_colors = get_agent_colors(len(orch.agents))
     judge_color = "rgb(200, 200, 220)"  # Light blue-gray for judge
     
+    # One pass over the transcripts instead of a scan per card.  Spilled
+    # turns stay on disk here (cards only need the summary); turn_pos lets
+    # the detail view page one back in
+    turn_index, turn_pos = {}, {}
+    for agent in orch.agents:
+        for pos, t in stubs(agent.transcript):
+            key = (agent.name, t.get("round_num", 0), t["round"])
+            turn_index[key], turn_pos[key] = t, pos
+    
+    def phase_cards_html(round_idx, phase):
+        """Card HTML for one round/phase column.
+
+        Turns never change once recorded, so a column is rebuilt only when a
+        new turn lands in it; finished rounds come straight from the cache.
+        """
+        entries = [turn_index.get((agent.name, round_idx, phase)) for agent in orch.agents]
+        key = (id(orch), round_idx, phase, sum(e is not None for e in entries))
+        cache = st.session_state.setdefault("card_html_cache", {})
+        if key in cache:
+            return cache[key]
+        if len(cache) > 512:
+            cache.clear()
+        
+        cards = []
+        for agent_idx, (agent, entry) in enumerate(zip(orch.agents, entries)):
+            color = agent_colors[agent_idx]
+            if entry:
+                agent_key = f"{agent.name}_{round_idx}_{phase}"
+                
+                # Preview precomputed with the turn
+                preview = entry.get("summary", {}).get("preview", "")
+                
+                # Compact, interactive agent contribution card
+                cards.append(f"""
+                <div style="
+                    background-color: {color}22; 
+                    border-left: 4px solid {color};
+                    border-radius: 4px;
+                    padding: 8px;
+                    margin-bottom: 8px;
+                    cursor: pointer;"
+                    onclick="window.parent.postMessage(
+                        {{type: 'streamlit:setComponentValue', value: '{agent_key}', key: 'view_agent'}}, '*')">
+                    <div style="font-weight: bold; color: {color};">{agent.name}</div>
+                    <div style="font-size: 0.85em; opacity: 0.9;">{preview}...</div>
+                </div>""")
+            else:
+                # Placeholder for future contributions
+                cards.append(f"""
+                <div style="
+                    background-color: #f0f0f0; 
+                    border-left: 4px solid #ddd;
+                    border-radius: 4px;
+                    padding: 8px;
+                    margin-bottom: 8px;
+                    opacity: 0.5;">
+                    <div style="font-weight: bold;">{agent.name}</div>
+                    <div style="font-size: 0.85em;">Pending...</div>
+                </div>""")
+        cache[key] = "".join(cards)
+        return cache[key]
+    
     # Create tabs for different views - add the Outcomes tab
     timeline_tab, current_tab, full_tab, outcomes_tab = st.tabs(["Timeline", "Current Round", "Full Transcript", "Outcomes"])
     
-    with timeline_tab:
+    with timeline_tab, profiling.span("render.timeline"):
         st.subheader("Debate Flow")
         
         # Use a tabbed navigation system for rounds
         max_round = orch.round_num
         phases = ["position", "critique", "defense"]
         
-        # Create round navigation
-        round_tabs = st.tabs([f"Round {i+1}" for i in range(max_round + 1)])
+        # Round navigation: only the selected round is rendered.  The widget
+        # has no key, so it jumps to the newest round whenever one is added.
+        round_labels = [f"Round {i+1}" for i in range(max_round + 1)]
+        if len(round_labels) > 1:
+            selected_round = st.select_slider("Round", round_labels, value=round_labels[-1],
+                                              label_visibility="collapsed")
+        else:
+            selected_round = round_labels[0]
         
         # Setup for agent viewing
         if "view_agent" not in st.session_state:
             st.session_state.view_agent = None
         
-        # Create content for each round tab
-        for round_idx, round_tab in enumerate(round_tabs):
-            with round_tab:
+        # Create content for the selected round
+        for round_idx in [round_labels.index(selected_round)]:
+            with st.container():
                 # Create a visual phase flow
                 cols = st.columns(3)
                 
@@ -466,56 +703,13 @@ if "orch" in st.session_state:
                         </div>
                         """, unsafe_allow_html=True)
                         
-                        # Add agent contributions for this phase
-                        for agent_idx, agent in enumerate(orch.agents):
-                            color = agent_colors[agent_idx]
-                            
-                            # Find matching transcript entry
-                            matching_entries = [t for t in agent.transcript 
-                                              if t["round"] == phase and 
-                                                 t.get("round_num", 0) == round_idx]
-                            
-                            if matching_entries:
-                                entry = matching_entries[-1]
-                                agent_key = f"{agent.name}_{round_idx}_{phase}"
-                                
-                                # Extract a preview (first sentence or first 40 chars)
-                                content = entry["content"]
-                                preview = (content.split('.')[0] if '.' in content[:100] else content[:40])
-                                preview = preview.replace('\n', ' ').strip()
-                                
-                                # Create a compact, interactive agent contribution card
-                                st.container().markdown(f"""
-                                <div style="
-                                    background-color: {color}22; 
-                                    border-left: 4px solid {color};
-                                    border-radius: 4px;
-                                    padding: 8px;
-                                    margin-bottom: 8px;
-                                    cursor: pointer;"
-                                    onclick="window.parent.postMessage(
-                                        {{type: 'streamlit:setComponentValue', value: '{agent_key}', key: 'view_agent'}}, '*')">
-                                    <div style="font-weight: bold; color: {color};">{agent.name}</div>
-                                    <div style="font-size: 0.85em; opacity: 0.9;">{preview}...</div>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            else:
-                                # Placeholder for future contributions
-                                st.container().markdown(f"""
-                                <div style="
-                                    background-color: #f0f0f0; 
-                                    border-left: 4px solid #ddd;
-                                    border-radius: 4px;
-                                    padding: 8px;
-                                    margin-bottom: 8px;
-                                    opacity: 0.5;">
-                                    <div style="font-weight: bold;">{agent.name}</div>
-                                    <div style="font-size: 0.85em;">Pending...</div>
-                                </div>
-                                """, unsafe_allow_html=True)
+                        # All agent cards for this phase in a single element
+                        st.markdown(phase_cards_html(round_idx, phase), unsafe_allow_html=True)
                 
                 # Add verdict for this round if available
-                round_verdict = next((item for item in orch.history if item['round'] == round_idx), None)
+                # Find the round's verdict on the light stubs, then page in only that one
+                pos = next((i for i, item in stubs(orch.history) if item['round'] == round_idx), None)
+                round_verdict = orch.history[pos] if pos is not None else None
                 if round_verdict:
                     verdict = round_verdict['verdict']
                     
@@ -529,28 +723,9 @@ if "orch" in st.session_state:
                         if isinstance(verdict, dict):
                             agreement = verdict.get("agreement", False)
                             
-                            # Get leading agent info
-                            leading_agent = None
-                            leading_score = 0
-                            
-                            # Determine score type based on debate type
-                            score_type = "correctness_scores" if st.session_state.get("debate_type", "non-binary") == "binary" else "exploration_scores"
-                            fallback_types = ["agent_scores", "scores"]
-                            
-                            # Try to get scores using the appropriate types
-                            scores = verdict.get(score_type, {})
-                            if not scores:
-                                for fallback in fallback_types:
-                                    scores = verdict.get(fallback, {})
-                                    if scores:
-                                        break
-                            
-                            # Find the leading agent
-                            if scores:
-                                for agent_name, score in scores.items():
-                                    if float(score) > leading_score:
-                                        leading_score = float(score)
-                                        leading_agent = agent_name
+                            # Normalized scores and leader were computed when the verdict landed
+                            scores = round_verdict.get("scores", {})
+                            leading_agent = round_verdict.get("leader")
                             
                             # Summary header with agreement status
                             status_icon = "✓" if agreement else "⟳"
@@ -613,32 +788,13 @@ if "orch" in st.session_state:
                                     """, unsafe_allow_html=True)
                                     
                                     # Find matching transcript entries for this round
-                                    position_entry = next((t for t in agent.transcript 
-                                                      if t["round"] == "position" and 
-                                                         t.get("round_num", 0) == round_idx), None)
+                                    position_entry = turn_index.get((agent.name, round_idx, "position"))
                                     
-                                    # Extract main points (first sentence of each paragraph or first 2 sentences)
+                                    # Display the main points precomputed with the turn
                                     if position_entry:
-                                        content = position_entry["content"]
-                                        
-                                        # Extract key points - first sentence of each paragraph or first couple sentences
-                                        paragraphs = content.split('\n\n')
-                                        key_points = []
-                                        
-                                        for para in paragraphs[:3]:  # Limit to first 3 paragraphs
-                                            if '.' in para[:100]:
-                                                first_sentence = para.split('.', 1)[0].strip() + '.'
-                                                if len(first_sentence) > 10:  # Only add substantial sentences
-                                                    key_points.append(first_sentence)
-                                        
-                                        # If we didn't get good points, use first 2 sentences of whole text
-                                        if not key_points and '.' in content:
-                                            sentences = content.split('.')
-                                            key_points = [s.strip() + '.' for s in sentences[:2] if len(s.strip()) > 10]
-                                        
-                                        # Display the key points
-                                        for point in key_points:
-                                            st.markdown(f"• {point}")
+                                        points = position_entry.get("summary", {}).get("key_points", [])
+                                        if points:
+                                            st.markdown("\n".join(f"• {point}" for point in points))
                                     else:
                                         st.markdown("*No position statement available*")
                             
@@ -708,10 +864,9 @@ if "orch" in st.session_state:
                 # Find the agent
                 agent = next((a for a in orch.agents if a.name == agent_name), None)
                 if agent:
-                    # Find the transcript entry
-                    entry = next((t for t in agent.transcript 
-                                 if t["round"] == phase and 
-                                    t.get("round_num", 0) == round_idx), None)
+                    # Find the transcript entry (full text, paged in if spilled)
+                    pos = turn_pos.get((agent_name, round_idx, phase))
+                    entry = agent.transcript[pos] if pos is not None else None
                     
                     if entry:
                         # Get agent color
@@ -760,7 +915,7 @@ if "orch" in st.session_state:
             except Exception as e:
                 st.error(f"Error displaying content: {e}")
     
-    with current_tab:
+    with current_tab, profiling.span("render.current"):
         st.subheader("Current Round")
         
         # Show compact view of current round responses
@@ -792,19 +947,18 @@ if "orch" in st.session_state:
             with st.expander("View verdict"):
                 st.json(latest_verdict)
     
-    with full_tab:
-        st.subheader("Full Transcript")
-        
+    @fragment
+    def full_transcript():
         # Create tabs for each agent
         agent_tabs = st.tabs([agent.name for agent in orch.agents] + ["Judge"])
         
-        # Display full transcript for each agent
+        # Display one page of each agent's transcript
         for agent_idx, tab in enumerate(agent_tabs[:-1]):  # All except Judge tab
             with tab:
                 agent = orch.agents[agent_idx]
                 color = agent_colors[agent_idx]
                 
-                for turn in agent.transcript:
+                for turn in paginate(agent.transcript, key=f"transcript_page_{agent_idx}"):
                     # Create timestamp
                     st.markdown(
                         f"""<div style="padding:5px; border-left:5px solid {color}; margin-bottom:5px;">
@@ -817,7 +971,8 @@ if "orch" in st.session_state:
         
         # Display judge verdicts in the Judge tab
         with agent_tabs[-1]:  # Judge tab
-            for item in orch.history:
+            last_round = max((item['round'] for _, item in stubs(orch.history)), default=None)
+            for item in paginate(orch.history, key="verdict_page"):
                 st.markdown(
                     f"""<div style="padding:5px; border-left:5px solid {judge_color}; 
                     background-color:#2E3C50; color: white; border-radius: 4px; margin-bottom:5px;">
@@ -825,14 +980,19 @@ if "orch" in st.session_state:
                     </div>""", 
                     unsafe_allow_html=True
                 )
-                st.json(item['verdict'])
+                with st.expander("Verdict data", expanded=item['round'] == last_round):
+                    st.json(item['verdict'])
                 st.markdown("---")
+    
+    with full_tab, profiling.span("render.transcript"):
+        st.subheader("Full Transcript")
+        full_transcript()
 
     # Round Counter and Winning Indicator - Keep this section but make more compact
     col1, col2 = st.columns(2)
     with col1:
         # Round counter with progress bar
-        total_rounds = 5  # Assume 5 rounds is a full debate
+        total_rounds = TOTAL_ROUNDS
         progress = min(orch.round_num / total_rounds, 1.0)
         st.markdown(f"**Round {orch.round_num}/{total_rounds}** • Phase: {orch.phase.capitalize()}")
         st.progress(progress)
@@ -840,35 +1000,8 @@ if "orch" in st.session_state:
     with col2:
         # Winning indicator based on judge verdicts
         if orch.history:
-            # Calculate scores for each agent based on judge verdicts
-            agent_scores = {ag.name: 0 for ag in orch.agents}
-            
-            for item in orch.history:
-                verdict = item['verdict']
-                
-                # Check if agent mentions exist in the verdict
-                if isinstance(verdict, dict):
-                    if 'agent_scores' in verdict:
-                        for agent_name, score in verdict['agent_scores'].items():
-                            if agent_name in agent_scores:
-                                agent_scores[agent_name] += float(score)
-                    elif 'explanation' in verdict:
-                        analysis = verdict['explanation'].lower()
-                        for agent_name in agent_scores:
-                            name_lower = agent_name.lower()
-                            if name_lower in analysis:
-                                # Find nearby positive sentiment words
-                                positive_words = ['strong', 'compelling', 'convincing', 'valid', 'sound', 'good']
-                                for word in positive_words:
-                                    if word in analysis and abs(analysis.find(name_lower) - analysis.find(word)) < 50:
-                                        agent_scores[agent_name] += 0.5
-            
-            # Normalize scores between 0 and 1
-            max_score = max(agent_scores.values()) if agent_scores.values() else 1
-            if max_score > 0:
-                normalized_scores = {name: score/max_score for name, score in agent_scores.items()}
-            else:
-                normalized_scores = agent_scores
+            # Cumulative standings from the per-round scores stored with each verdict
+            normalized_scores = summaries.standings([item for _, item in stubs(orch.history)])
             
             # Display compact standings
             sorted_agents = sorted(normalized_scores.items(), key=lambda x: x[1], reverse=True)
@@ -895,7 +1028,7 @@ if "orch" in st.session_state:
         st.success("Evidence added. It will be included in next round prompts.")
 
     # Add Outcomes tab content
-    with outcomes_tab:
+    with outcomes_tab, profiling.span("render.outcomes"):
         if "orch" in st.session_state and orch.history:
             latest_verdict = orch.history[-1]['verdict']
             
@@ -1012,84 +1145,14 @@ if "orch" in st.session_state:
             if len(orch.history) > 0:
                 st.markdown("## Judge Verdict Evolution")
                 
-                # Process verdict history into a format suitable for charting
-                verdict_data = {}
-                rounds = []
-                
-                # Determine score type based on debate type
-                score_type = "correctness_scores" if st.session_state.get("debate_type") == "binary" else "exploration_scores"
-                fallback_score_types = ["agent_scores", "scores"]
-                
-                # Initialize agent data series
-                for agent in orch.agents:
-                    verdict_data[agent.name] = []
-                
-                # Extract scores from each round's verdict
-                for item in orch.history:
-                    round_num = item['round']
-                    rounds.append(f"R{round_num}")
-                    verdict = item['verdict']
-                    
-                    if isinstance(verdict, dict):
-                        # Try to get scores using the primary score type
-                        scores = verdict.get(score_type, {})
-                        
-                        # If not found, try fallback score types
-                        if not scores:
-                            for fallback_type in fallback_score_types:
-                                scores = verdict.get(fallback_type, {})
-                                if scores:
-                                    break
-                        
-                        # If still no scores but there's a "most_correct_agent" or "most_insightful_agent"
-                        if not scores:
-                            top_agent_key = "most_correct_agent" if st.session_state.get("debate_type") == "binary" else "most_insightful_agent"
-                            top_agent = verdict.get(top_agent_key, None)
-                            
-                            # Assign a high score to the top agent if specified
-                            if top_agent:
-                                scores = {agent_name: 1.0 if agent_name == top_agent else 0.5 for agent_name in verdict_data.keys()}
-                        
-                        # Extract sentiment scores from explanation as a last resort
-                        if not scores and "explanation" in verdict:
-                            explanation = verdict["explanation"].lower()
-                            sentiment_scores = {}
-                            
-                            for agent_name in verdict_data.keys():
-                                name_lower = agent_name.lower()
-                                score = 0.5  # Default neutral score
-                                
-                                if name_lower in explanation:
-                                    # Find nearby sentiment words
-                                    positive_words = ['strong', 'compelling', 'convincing', 'valid', 'sound', 'good', 'excellent']
-                                    negative_words = ['weak', 'flawed', 'incorrect', 'inconsistent', 'problematic']
-                                    
-                                    for word in positive_words:
-                                        if word in explanation and abs(explanation.find(name_lower) - explanation.find(word)) < 50:
-                                            score += 0.1
-                                    
-                                    for word in negative_words:
-                                        if word in explanation and abs(explanation.find(name_lower) - explanation.find(word)) < 50:
-                                            score -= 0.1
-                                
-                                sentiment_scores[agent_name] = max(0, min(1, score))  # Clamp between 0 and 1
-                            
-                            scores = sentiment_scores
-                    
-                        # Assign scores to each agent (default to previous score or 0.5 if not mentioned)
-                        for agent_name in verdict_data.keys():
-                            if agent_name in scores:
-                                verdict_data[agent_name].append(float(scores[agent_name]))
-                            elif verdict_data[agent_name]:
-                                # Carry forward previous score if available
-                                verdict_data[agent_name].append(verdict_data[agent_name][-1])
-                            else:
-                                # Default score for first appearance
-                                verdict_data[agent_name].append(0.5)
-                    else:
-                        # Default scores if verdict is not in expected format
-                        for agent_name in verdict_data.keys():
-                            verdict_data[agent_name].append(0.5)
+                # Score series were normalized when each verdict landed; only
+                # the light stubs are read, so spilled verdicts stay on disk
+                items = [item for _, item in stubs(orch.history)]
+                rounds = [f"R{item['round']}" for item in items]
+                verdict_data = {
+                    agent.name: [item.get("scores", {}).get(agent.name, 0.5) for item in items]
+                    for agent in orch.agents
+                }
                 
                 # Create a DataFrame for charting
                 import pandas as pd
@@ -1115,5 +1178,41 @@ if "orch" in st.session_state:
                         agent_idx = next((idx for idx, ag in enumerate(orch.agents) if ag.name == agent_name), 0)
                         color = agent_colors[agent_idx]
                         st.markdown(f"{medal} **{agent_name}** ({score:.2f})", unsafe_allow_html=True)
+
+            cite_stats = orch.citations.stats()
+            if cite_stats:
+                st.markdown("## Citations")
+                import pandas as pd
+                rows = {name: {"Mentions": s["mentions"], "Unique works": s["unique"],
+                               "Shared with others": s["shared"], **s.get("verification", {})}
+                        for name, s in cite_stats.items()}
+                st.dataframe(pd.DataFrame(rows).T.fillna(0).astype(int))
+                with st.expander("Most-cited works"):
+                    for item in orch.citations.top(10):
+                        status = f" — {item['status']}" if item["status"] else ""
+                        st.markdown(f"- {item['citation']} ({item['uses']}× by {', '.join(item['agents'])}){status}")
         else:
-            st.info("Debate needs to progress before outcomes are available.")
\ No newline at end of file
+            st.info("Debate needs to progress before outcomes are available.")
+
+# Process auto-advance if enabled.  This runs after the page has been drawn, so
+# the current state stays visible while the next phase is in flight.
+if debate_in_progress and is_auto_mode and not is_stopped:
+    orch = st.session_state.orch
+    auto_status.info("Auto-advancing rounds...")
+    
+    try:
+        # Run the next round on the shared loop
+        run_round(orch, st.session_state.topic)
+        
+        # Update session state
+        st.session_state.orch = orch
+        st.session_state.last_update = datetime.datetime.now().isoformat()
+        
+        # Rerun to continue auto-advancing
+        st.rerun()
+    except Exception as e:
+        st.error(f"Auto-advance error: {e}")
+        # Turn off auto but don't stop the debate
+        orch.config.auto = False
+        st.session_state.auto_advance = False
+        st.session_state.orch = orch
@@ -0,0 +1,109 @@
+"""Turn and verdict digests computed once, when a turn or verdict lands.
+
+The UI only reads these (``turn["summary"]``, ``history[i]["scores"]``), so
+redraw cost no longer depends on transcript length.
+"""
+from __future__ import annotations
+from typing import List, Dict, Any, Optional
+
+SCORE_KEYS = {"binary": "correctness_scores", "non-binary": "exploration_scores"}
+FALLBACK_SCORE_KEYS = ["agent_scores", "scores"]
+TOP_AGENT_KEYS = {"binary": "most_correct_agent", "non-binary": "most_insightful_agent"}
+POSITIVE_WORDS = ['strong', 'compelling', 'convincing', 'valid', 'sound', 'good', 'excellent']
+NEGATIVE_WORDS = ['weak', 'flawed', 'incorrect', 'inconsistent', 'problematic']
+
+def preview(content: str) -> str:
+    """First sentence, or the first 40 chars when there is no early full stop."""
+    text = content.split('.')[0] if '.' in content[:100] else content[:40]
+    return text.replace('\n', ' ').strip()
+
+def key_points(content: str) -> List[str]:
+    """First sentence of each of the first 3 paragraphs, else the first 2 sentences."""
+    points = []
+    for para in content.split('\n\n')[:3]:
+        if '.' in para[:100]:
+            first_sentence = para.split('.', 1)[0].strip() + '.'
+            if len(first_sentence) > 10:  # Only add substantial sentences
+                points.append(first_sentence)
+
+    if not points and '.' in content:
+        sentences = content.split('.')
+        points = [s.strip() + '.' for s in sentences[:2] if len(s.strip()) > 10]
+    return points
+
+def summarize_turn(content: str) -> Dict[str, Any]:
+    return {"preview": preview(content), "key_points": key_points(content)}
+
+def _sentiment_scores(explanation: str, names: List[str]) -> Dict[str, float]:
+    """Last resort: nudge 0.5 by sentiment words near each agent's name."""
+    text = explanation.lower()
+    scores = {}
+    for name in names:
+        name_lower = name.lower()
+        score = 0.5
+        if name_lower in text:
+            pos = text.find(name_lower)
+            for word in POSITIVE_WORDS:
+                if word in text and abs(pos - text.find(word)) < 50:
+                    score += 0.1
+            for word in NEGATIVE_WORDS:
+                if word in text and abs(pos - text.find(word)) < 50:
+                    score -= 0.1
+        scores[name] = max(0.0, min(1.0, score))
+    return scores
+
+def has_scores(verdict: Any, debate_type: str = "non-binary") -> bool:
+    """Whether the verdict scores or names agents itself, rather than being a
+    fallback (an unparsed reply's explanation) that ``verdict_scores`` would guess from."""
+    if not isinstance(verdict, dict):
+        return False
+    keys = [SCORE_KEYS.get(debate_type, "exploration_scores")] + FALLBACK_SCORE_KEYS
+    return (any(isinstance(verdict.get(k), dict) and verdict[k] for k in keys)
+            or bool(verdict.get(TOP_AGENT_KEYS.get(debate_type, "most_insightful_agent"))))
+
+def verdict_scores(verdict: Any, names: List[str], debate_type: str = "non-binary",
+                   previous: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Normalize a verdict into one 0-1 score per agent.
+
+    Tries the debate type's score key, then generic keys, then the named top
+    agent, then explanation sentiment.  Agents the verdict doesn't mention keep
+    their previous score (or 0.5).
+    """
+    previous = previous or {}
+    scores: Dict[str, Any] = {}
+    if isinstance(verdict, dict):
+        for key in [SCORE_KEYS.get(debate_type, "exploration_scores")] + FALLBACK_SCORE_KEYS:
+            if isinstance(verdict.get(key), dict) and verdict[key]:
+                scores = verdict[key]
+                break
+        if not scores:
+            top_agent = verdict.get(TOP_AGENT_KEYS.get(debate_type, "most_insightful_agent"))
+            if top_agent:
+                scores = {name: 1.0 if name == top_agent else 0.5 for name in names}
+        if not scores and isinstance(verdict.get("explanation"), str):
+            scores = _sentiment_scores(verdict["explanation"], names)
+
+    result = {}
+    for name in names:
+        try:
+            result[name] = float(scores[name])
+        except (KeyError, TypeError, ValueError):
+            result[name] = previous.get(name, 0.5)
+    return result
+
+def leading_agent(scores: Dict[str, float]) -> Optional[str]:
+    """Highest-scoring agent, or None when nobody scores above zero."""
+    leader, best = None, 0.0
+    for name, score in scores.items():
+        if score > best:
+            leader, best = name, score
+    return leader
+
+def standings(history: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Cumulative per-round scores normalized so the leader is 1.0."""
+    totals: Dict[str, float] = {}
+    for item in history:
+        for name, score in item.get("scores", {}).items():
+            totals[name] = totals.get(name, 0.0) + score
+    top = max(totals.values(), default=0.0)
+    return {name: total / top for name, total in totals.items()} if top > 0 else totals
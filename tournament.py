@@ -0,0 +1,277 @@
+"""Tournament mode: pairwise debates between N models over M topics.
+
+All debates run as tasks on one event loop and share the process-wide
+provider instances / HTTP pools (see ``providers.get``), so hundreds of
+debates cost no more than their in-flight requests.  Finished matches are
+appended to a JSONL checkpoint and skipped when the tournament is resumed.
+
+    python tournament.py --models openai:gpt-4o-mini mistral:mistral-large-latest \
+        --topics topics.txt --rounds 2 --checkpoint runs/t1.jsonl
+"""
+from __future__ import annotations
+import argparse, asyncio, itertools, json, math, os
+from typing import List, Dict, Any
+import providers, profiling, summaries
+from orchestrator import DebateConfig, DebateOrchestrator
+
+class TournamentConfig:
+    def __init__(self, models, topics, judge_cfg, rounds=1, debate_type="binary",
+                 concurrency=8, checkpoint=None, both_sides=False, judge_aggregate="median",
+                 judge_quorum=None):
+        self.models = models            # agent cfg dicts: name / provider_name / model
+        self.topics = topics
+        self.judge_cfg = judge_cfg
+        self.rounds = rounds            # full Position→Critique→Defense rounds per debate
+        self.debate_type = debate_type
+        self.concurrency = concurrency  # debates in flight at once
+        self.checkpoint = checkpoint    # JSONL path, one finished match per line
+        self.both_sides = both_sides    # binary only: replay each pair with stances swapped
+        self.judge_aggregate = judge_aggregate  # judge_cfg list: how the panel combines verdicts
+        self.judge_quorum = judge_quorum
+
+class Tournament:
+    def __init__(self, config: TournamentConfig):
+        self.config = config
+        names = [m["name"] for m in config.models]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Model names must be unique: {names}")
+        self.results: List[Dict[str, Any]] = self._load_checkpoint()
+
+    # ------------------ Scheduling ------------------
+    def pairings(self) -> List[Dict[str, Any]]:
+        matches = []
+        for t_idx, topic in enumerate(self.config.topics):
+            for a, b in itertools.combinations(self.config.models, 2):
+                sides = [(a, b), (b, a)] if self.config.both_sides else [(a, b)]
+                for first, second in sides:
+                    matches.append({
+                        "id": f"{t_idx}:{first['name']}:{second['name']}",
+                        "topic": topic,
+                        "a": first,
+                        "b": second,
+                    })
+        return matches
+
+    def pending(self) -> List[Dict[str, Any]]:
+        done = {r["id"] for r in self.results}
+        return [m for m in self.pairings() if m["id"] not in done]
+
+    async def run(self, on_result=None) -> List[Dict[str, Any]]:
+        """Run every pending match; returns all results (including resumed ones)."""
+        sem = asyncio.Semaphore(self.config.concurrency)
+
+        async def _guarded(match):
+            async with sem:
+                try:
+                    result = await self._play(match)
+                except Exception as e:
+                    # Not checkpointed, so the match is retried on resume
+                    print(f"Match {match['id']} failed: {type(e).__name__}: {e}")
+                    return
+            self.results.append(result)
+            self._checkpoint(result)
+            if on_result:
+                on_result(result)
+
+        await asyncio.gather(*(_guarded(m) for m in self.pending()))
+        return self.results
+
+    async def _play(self, match) -> Dict[str, Any]:
+        a, b = dict(match["a"]), dict(match["b"])
+        opposition = self.config.debate_type == "binary" and self.config.both_sides
+        if opposition:
+            a["stance"], b["stance"] = "affirmative", "negative"
+        judge = self.config.judge_cfg
+        judge = [dict(j) for j in judge] if isinstance(judge, list) else dict(judge)
+        conf = DebateConfig([a, b], judge, False, self.config.debate_type, opposition,
+                            max_rounds=self.config.rounds, judge_aggregate=self.config.judge_aggregate,
+                            judge_quorum=self.config.judge_quorum)
+        orch = DebateOrchestrator(conf)
+        await orch.next_round(match["topic"], phases=self.config.rounds * len(orch.graph.phases))
+
+        last = orch.history[-1] if orch.history else {"verdict": {}, "scores": {}}
+        verdict = last["verdict"]
+        if not summaries.has_scores(verdict, self.config.debate_type):
+            # No judge scored it (all failed or unparsed): a 0.5 tie would be
+            # checkpointed for good, so fail the match and let resume replay it
+            raise RuntimeError(f"no judge scored the debate: {verdict.get('explanation', 'no verdict')}")
+        sa = last["scores"].get(a["name"], 0.0)
+        sb = last["scores"].get(b["name"], 0.0)
+        outcome = 1.0 if sa > sb else 0.0 if sa < sb else 0.5
+        return {
+            "id": match["id"],
+            "topic": match["topic"],
+            "a": a["name"],
+            "b": b["name"],
+            "scores": {a["name"]: sa, b["name"]: sb},
+            "outcome": outcome,  # from a's point of view
+            "rounds": orch.round_num,
+            "verdict": verdict,
+        }
+
+    # ------------------ Checkpointing ------------------
+    def _load_checkpoint(self) -> List[Dict[str, Any]]:
+        path = self.config.checkpoint
+        if not path or not os.path.exists(path):
+            return []
+        results = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves a truncated last line; replay that match
+                    continue
+        return results
+
+    def _checkpoint(self, result):
+        path = self.config.checkpoint
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+    # ------------------ Rankings ------------------
+    def standings(self) -> List[Dict[str, Any]]:
+        names = [m["name"] for m in self.config.models]
+        # Checkpoints may hold matches for models dropped from this run
+        results = [r for r in self.results if r["a"] in names and r["b"] in names]
+        elo = elo_ratings(results, names)
+        bt = bradley_terry(results, names)
+        played = {n: 0 for n in names}
+        wins = {n: 0.0 for n in names}
+        for r in results:
+            played[r["a"]] += 1
+            played[r["b"]] += 1
+            wins[r["a"]] += r["outcome"]
+            wins[r["b"]] += 1.0 - r["outcome"]
+        table = [
+            {"name": n, "elo": elo[n], "bt": bt[n], "played": played[n], "wins": wins[n]}
+            for n in names
+        ]
+        return sorted(table, key=lambda row: row["bt"], reverse=True)
+
+def elo_ratings(results, names, k: float = 32.0, base: float = 1500.0) -> Dict[str, float]:
+    """Sequential Elo over results in the order they finished."""
+    ratings = {n: base for n in names}
+    for r in results:
+        ra, rb = ratings[r["a"]], ratings[r["b"]]
+        expected = 1.0 / (1.0 + 10 ** ((rb - ra) / 400.0))
+        ratings[r["a"]] = ra + k * (r["outcome"] - expected)
+        ratings[r["b"]] = rb - k * (r["outcome"] - expected)
+    return ratings
+
+def bradley_terry(results, names, iters: int = 200, tol: float = 1e-9,
+                  base: float = 1500.0) -> Dict[str, float]:
+    """Order-independent Bradley-Terry strengths (MM updates, ties = half wins).
+
+    Returned on the Elo scale so both columns read the same way.
+    """
+    wins = {n: 0.0 for n in names}
+    games: Dict[tuple, float] = {}
+    for r in results:
+        wins[r["a"]] += r["outcome"]
+        wins[r["b"]] += 1.0 - r["outcome"]
+        pair = tuple(sorted((r["a"], r["b"])))
+        games[pair] = games.get(pair, 0.0) + 1.0
+
+    # A small prior game against a virtual average player keeps strengths
+    # finite for models that won or lost everything.
+    prior = 0.5
+    p = {n: 1.0 for n in names}
+    for _ in range(iters):
+        new = {}
+        for n in names:
+            denom = 2 * prior / (p[n] + 1.0)
+            for (x, y), count in games.items():
+                if n == x:
+                    denom += count / (p[n] + p[y])
+                elif n == y:
+                    denom += count / (p[n] + p[x])
+            new[n] = (wins[n] + prior) / denom if denom else p[n]
+        # Normalise to geometric mean 1
+        g = math.exp(sum(math.log(v) for v in new.values()) / len(new))
+        new = {n: v / g for n, v in new.items()}
+        delta = max(abs(new[n] - p[n]) for n in names)
+        p = new
+        if delta < tol:
+            break
+    return {n: base + 400.0 * math.log10(p[n]) for n in names}
+
+# ------------------ CLI ------------------
+def _parse_model(spec: str) -> Dict[str, str]:
+    """``provider:model[=name]`` → agent cfg dict."""
+    spec, _, name = spec.partition("=")
+    provider_name, _, model = spec.partition(":")
+    if not model:
+        raise argparse.ArgumentTypeError(f"Expected provider:model, got '{spec}'")
+    return {"name": name or f"{provider_name}:{model}", "provider_name": provider_name, "model": model}
+
+def _read_topics(values: List[str]) -> List[str]:
+    topics = []
+    for v in values:
+        if os.path.isfile(v):
+            with open(v, "r", encoding="utf-8") as f:
+                topics.extend(line.strip() for line in f if line.strip())
+        else:
+            topics.append(v)
+    return topics
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run a pairwise debate tournament.")
+    ap.add_argument("--models", nargs="+", type=_parse_model, required=True,
+                    help="provider:model[=display name], at least two")
+    ap.add_argument("--topics", nargs="+", required=True, help="topics, or files with one topic per line")
+    ap.add_argument("--judge", nargs="+", type=_parse_model, default=[_parse_model("openai:gpt-4o-mini=Judge")],
+                    help="one judge, or several to vote as a panel")
+    ap.add_argument("--judge-aggregate", choices=["median", "majority"], default="median")
+    ap.add_argument("--judge-quorum", type=int, default=None,
+                    help="panel returns once this many judges agree on the leader")
+    ap.add_argument("--rounds", type=int, default=1)
+    ap.add_argument("--debate-type", choices=["binary", "non-binary"], default="binary")
+    ap.add_argument("--concurrency", type=int, default=8, help="debates in flight at once (all of them with --batch)")
+    ap.add_argument("--both-sides", action="store_true", help="binary: play each pair on both sides")
+    ap.add_argument("--checkpoint", default=None, help="JSONL file to append results to / resume from")
+    ap.add_argument("--batch", action="store_true",
+                    help="send prompts through the providers' offline batch APIs (slow, cheap)")
+    profiling.add_arguments(ap)
+    args = ap.parse_args(argv)
+    profiling.configure(args)
+
+    if args.batch:
+        for cfg in args.models + args.judge:
+            cfg["provider_name"] = f"batch:{cfg['provider_name']}"
+
+    judge = args.judge[0] if len(args.judge) == 1 else args.judge
+    conf = TournamentConfig(args.models, _read_topics(args.topics), judge, args.rounds,
+                            args.debate_type, args.concurrency, args.checkpoint, args.both_sides,
+                            args.judge_aggregate, args.judge_quorum)
+    tour = Tournament(conf)
+    if args.batch:
+        # Every pending debate in flight at once, so each phase is one batch job
+        # instead of one round-trip per ``--concurrency`` debates
+        conf.concurrency = max(1, len(tour.pending()))
+    total = len(tour.pairings())
+    print(f"{total} matches, {total - len(tour.pending())} already checkpointed")
+
+    def _progress(result):
+        print(f"[{len(tour.results)}/{total}] {result['a']} vs {result['b']}: {result['outcome']}")
+
+    async def _run():
+        try:
+            await tour.run(on_result=_progress)
+        finally:
+            await providers.aclose()
+
+    asyncio.run(_run())
+
+    print(f"\n{'Model':<40} {'BT':>8} {'Elo':>8} {'W':>6} {'P':>4}")
+    for row in tour.standings():
+        print(f"{row['name']:<40} {row['bt']:>8.1f} {row['elo']:>8.1f} {row['wins']:>6.1f} {row['played']:>4}")
+
+if __name__ == "__main__":
+    main()